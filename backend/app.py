@@ -8,6 +8,8 @@ from src.service.pdf_service import PDFService
 from src.service.search_service import SearchService
 from src.service.chat_service import ChatService
 from src.utils.llm_utils import get_first_model_key
+from src.infrastructure.embedding_registry import warm_up_embedding_model
+from src.infrastructure.reranker import RERANK_DEFAULT, warm_up_reranker
 
 app = Flask(__name__)
 CORS(app)
@@ -25,6 +27,12 @@ pdf_service = PDFService(BASE_DIR,current_model_name)
 search_service = SearchService(PROCESSED_DIR)
 chat_service = ChatService()
 
+# 启动时预热向量模型，避免首个搜索请求承担模型加载开销
+warm_up_embedding_model()
+# 默认启用重排时同样预热重排模型，模型加载不占用请求的重排时间预算
+if RERANK_DEFAULT:
+    warm_up_reranker()
+
 # PDF文件服务接口
 @app.route('/pdfs/<path:filename>')
 def serve_pdf(filename):
@@ -43,7 +51,17 @@ def search_endpoint():
     if request.method == 'GET':
         try:
             query = request.args.get('query', '')
-            results = search_service.search(query,model_name= current_model_name)
+            # 可选：按来源文件/年份过滤，如 ?sourceFiles=a.pdf&sourceFiles=b.pdf&years=2012
+            source_files = request.args.getlist('sourceFiles')
+            years = request.args.getlist('years')
+            # 可选：按请求指定查询参数配置，如 ?searchProfile=hnsw_accurate
+            search_profile = request.args.get('searchProfile')
+            # 可选：?rerank=true 使用交叉编码器重排，不传时使用服务端默认配置
+            rerank = request.args.get('rerank')
+            rerank = None if rerank is None else rerank.lower() in ('1', 'true', 'yes')
+            results = search_service.search(query,model_name= current_model_name,
+                                            source_files=source_files, years=years, search_profile=search_profile,
+                                            rerank=rerank)
             return jsonify({'results': results})
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
@@ -58,17 +76,53 @@ def search_endpoint():
             filter_type = data.get('filterType', 'topN')
             top_n = data.get('topN', 10)
             threshold = data.get('threshold', 0.7)
+            source_files = data.get('sourceFiles', [])
+            years = data.get('years', [])
+            search_profile = data.get('searchProfile')
+            rerank = data.get('rerank')
             
             if not query:
                 return jsonify({'error': 'Query parameter is required'}), 400
             
-            results = search_service.search_with_settings(query, current_model_name, keywords, filter_type, top_n, threshold)
+            results = search_service.search_with_settings(query, current_model_name, keywords, filter_type, top_n, threshold,
+                                                          source_files=source_files, years=years,
+                                                          search_profile=search_profile, rerank=rerank)
             return jsonify({'results': results})
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'搜索失败: {str(e)}'}), 500
 
+# 渐进式搜索接口
+@app.route('/search/stream', methods=['GET'])
+def search_stream_endpoint():
+    """
+    渐进式搜索接口（SSE）：先返回原始查询的结果，关键词扩展完成后返回更新后的排序
+    参数与 GET /search 相同，每个事件为 {'stage': ..., 'results': [...]}，最后一个结果事件为最终结果
+    """
+    query = request.args.get('query', '')
+    if not query:
+        return jsonify({'error': '查询参数不能为空'}), 400
+    source_files = request.args.getlist('sourceFiles')
+    years = request.args.getlist('years')
+    search_profile = request.args.get('searchProfile')
+    rerank = request.args.get('rerank')
+    rerank = None if rerank is None else rerank.lower() in ('1', 'true', 'yes')
+    model_name = current_model_name
+
+    def generate_events():
+        try:
+            for stage, results in search_service.search_progressive(query, model_name=model_name,
+                                                                    source_files=source_files, years=years,
+                                                                    search_profile=search_profile, rerank=rerank):
+                yield f"data: {json.dumps({'stage': stage, 'results': results}, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'error': f'搜索失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+
+    return Response(generate_events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # 获取关键词拆分结果接口
 @app.route('/keywords/extract', methods=['GET'])
 def extract_keywords_endpoint():
@@ -93,11 +147,17 @@ def keyword_search_endpoint():
         filter_type = data.get('filterType', 'topN')
         top_n = data.get('topN', 10)
         threshold = data.get('threshold', 0.7)
+        source_files = data.get('sourceFiles', [])
+        years = data.get('years', [])
+        search_profile = data.get('searchProfile')
+        rerank = data.get('rerank')
         
         if not selected_keywords:
             return jsonify({'error': '请选择至少一个关键词'}), 400
         
-        results = search_service.search_by_keywords(selected_keywords, filter_type, top_n, threshold)
+        results = search_service.search_by_keywords(selected_keywords, filter_type, top_n, threshold,
+                                                    source_files=source_files, years=years,
+                                                    search_profile=search_profile, rerank=rerank)
         return jsonify({'results': results})
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -227,12 +287,20 @@ def chat_stream_endpoint():
         return jsonify({'error': f'请求处理失败: {str(e)}'}), 500
 
 # 配置管理接口
+def _on_model_config_changed(config_path, model_key):
+    """模型配置被修改或删除后，丢弃缓存的配置和该模型的LLM客户端"""
+    from src.utils.llm_utils import invalidate_config_cache
+    from src.infrastructure.envoke_llm import invalidate_llm_clients
+
+    invalidate_config_cache(config_path)
+    invalidate_llm_clients(model_key)
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """获取当前配置"""
     global current_model_name
     try:
-        from backend.src.utils.llm_utils import get_all_models, get_model_config_by_key
+        from src.utils.llm_utils import get_all_models, get_model_config_by_key
         
         config_path = os.path.join(BASE_DIR, 'config', 'llm_config.yaml')
         
@@ -294,6 +362,7 @@ def delete_config(model_key):
         # 保存更新后的配置
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.dump(config_data, f, default_flow_style=False, allow_unicode=True)
+        _on_model_config_changed(config_path, model_key)
         
         return jsonify({
             'success': True,
@@ -352,6 +421,7 @@ def save_config():
         # 保存配置文件
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.dump(config_data, f, default_flow_style=False, allow_unicode=True)
+        _on_model_config_changed(config_path, model_key)
         
         # 如果需要设置为活跃配置，则设置全局变量
         if set_as_active:
@@ -373,7 +443,7 @@ def set_active_config(model_key):
     """设置活跃的模型配置"""
     global current_model_name
     try:
-        from backend.src.utils.llm_utils import get_model_config_by_key
+        from src.utils.llm_utils import get_model_config_by_key
         
         config_path = os.path.join(BASE_DIR, 'config', 'llm_config.yaml')
         
@@ -0,0 +1,64 @@
+"""
+单元测试公共fixture：用确定性的假向量模型替代真实模型，向量库、词法索引等数据写入临时目录
+"""
+import hashlib
+
+import numpy as np
+import pytest
+
+from src.infrastructure import dedup_index, embedding_registry, lexical_index
+from src.infrastructure.milvus_db import EmbeddingModelWrapper, VECTOR_STORAGE_DIM
+
+
+class FakeEmbeddingModel:
+    """按文本哈希生成固定的随机向量，相同文本得到相同向量"""
+    def encode(self, texts, batch_size=32, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+            vectors.append(np.random.default_rng(seed).normal(size=VECTOR_STORAGE_DIM).astype(np.float32))
+        return np.asarray(vectors)
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    key = (
+        embedding_registry.EMBEDDING_MODEL_PATH, embedding_registry.EMBEDDING_DEVICE,
+        embedding_registry.EMBEDDING_BACKEND
+    )
+    monkeypatch.setitem(embedding_registry._registry._models, key, FakeEmbeddingModel())
+    wrapper = EmbeddingModelWrapper(dim=VECTOR_STORAGE_DIM, use_cache=False)
+    monkeypatch.setitem(EmbeddingModelWrapper._shared, key[:2] + (VECTOR_STORAGE_DIM, key[2]), wrapper)
+    return wrapper
+
+
+@pytest.fixture
+def isolated_indexes(tmp_path, monkeypatch):
+    """词法索引、去重索引写入tmp_path，并清空进程内的索引实例"""
+    monkeypatch.setattr(lexical_index, "LEXICAL_INDEX_DIR", str(tmp_path / "lexical"))
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    monkeypatch.setattr(dedup_index, "DEDUP_INDEX_DIR", str(tmp_path / "dedup"))
+    monkeypatch.setattr(dedup_index, "_indexes", {})
+
+
+@pytest.fixture
+def local_store(tmp_path, isolated_indexes, fake_embeddings):
+    """返回创建LocalVectorStore的函数，数据目录和词法索引目录均在tmp_path下"""
+    from src.infrastructure.local_vector_store import LocalVectorStore
+
+    def make(collection_name="test", **kwargs):
+        store = LocalVectorStore(collection_name, root_dir=str(tmp_path / "store"), **kwargs)
+        store.initialize()
+        return store
+    return make
+
+
+def make_chunks(n, source_file="a.pdf", start=0):
+    return [
+        {
+            "title": f"标题{i}", "section": "", "content": f"第{i}条 混凝土保温砂浆内容{i}",
+            "question1": f"问题{i}", "question2": "", "tags": "保温" if i % 2 else "",
+            "source_file": source_file, "year": "2012",
+        }
+        for i in range(start, start + n)
+    ]
@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from src.infrastructure.embedding_cache import normalize_text
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_INDEX_DIR = os.getenv("DEDUP_INDEX_DIR", "./data/dedup_index")
+# 海明距离不超过该值视为近似重复。条文chunk较短，改动一两个字距离即可达到4~6，无关文本的距离约为32
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "6"))
+# 过短的内容（标题、单句）容易误判，不参与去重
+SIMHASH_MIN_CHARS = int(os.getenv("SIMHASH_MIN_CHARS", "40"))
+# 分为 距离+1 段：距离不超过阈值时至少有一段完全相同，只需比较同桶候选
+SIMHASH_BANDS = SIMHASH_MAX_DISTANCE + 1
+_BAND_BITS = 64 // SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+# SimHash相近只是候选：数值、单位及否定/情态/比较词不同的条文意思不同（300mm与500mm、不应小于与不应大于、应能与不应），
+# 这些关键词序列完全一致才确认为重复
+_KEY_TOKEN_RE = re.compile(
+    r"\d+(?:\.\d+)*|[a-z%‰°℃]+|严禁|禁止|不得|必须|不|非|无|未|应|宜|可|"
+    r"大于|小于|高于|低于|超过|少于|多于|以上|以下|以内|至少|至多"
+)
+
+
+def _mix64(values):
+    """splitmix64 终混，使相邻n-gram的哈希位均匀分布"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def simhash(text):
+    """
+    64位SimHash：特征为去空白后的字符三元组，哈希与按位投票均为数组运算
+    内容过短时返回None
+    """
+    text = "".join(normalize_text(text or "").split())
+    if len(text) < SIMHASH_MIN_CHARS:
+        return None
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    grams = codes[:-2] * np.uint64(0x100000001B3) ^ codes[1:-1] * np.uint64(0x9E3779B97F4A7C15) ^ codes[2:]
+    hashes = _mix64(grams)
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(np.packbits((votes > 0)[::-1].astype(np.uint8)).view(">u8")[0])
+
+
+def key_tokens(text):
+    """内容中的数值、单位及否定/情态/比较词，按出现顺序以空格连接"""
+    text = "".join(normalize_text(text or "").lower().split())
+    return " ".join(_KEY_TOKEN_RE.findall(text))
+
+
+def _bands(fingerprint):
+    return [(band, (fingerprint >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(SIMHASH_BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    近似重复chunk索引，与collection并行维护：
+    - 每个规范chunk记录 SimHash、关键词序列、collection中的主键、来源文件，以及链接到它的其他来源文件
+    - SimHash距离不超过阈值且关键词序列相同才视为重复
+    - 新文档入库前先查重，重复chunk不再生成问题、编码和写入，只链接到规范chunk
+    - 按来源文件/年份过滤的检索通过 linked 找到引用方链接的规范chunk，重复内容在引用方的过滤条件下仍可检索到
+    - 删除来源文件时返回仍被其他来源引用的规范chunk，调用方需为引用方重新入库
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._buckets = {}
+        # 引用方来源文件 -> 其链接的规范chunk主键
+        self._referred = {}
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add_entry(self, chunk_id, fingerprint, source_file, referrers=None, tokens=None):
+        """referrers: {引用方来源文件: 年份}"""
+        self._entries[chunk_id] = {
+            "fingerprint": fingerprint, "tokens": tokens, "source_file": source_file, "referrers": {}
+        }
+        for band in _bands(fingerprint):
+            self._buckets.setdefault(band, set()).add(chunk_id)
+        for referrer, year in (referrers or {}).items():
+            self._add_referrer(chunk_id, referrer, year)
+
+    def _add_referrer(self, chunk_id, referrer, year):
+        self._entries[chunk_id]["referrers"][referrer] = year
+        self._referred.setdefault(referrer, set()).add(chunk_id)
+
+    def _remove_referrer(self, chunk_id, referrer):
+        self._entries[chunk_id]["referrers"].pop(referrer, None)
+        referred = self._referred.get(referrer)
+        if referred is not None:
+            referred.discard(chunk_id)
+            if not referred:
+                del self._referred[referrer]
+
+    def _remove_entry(self, chunk_id):
+        for referrer in list(self._entries[chunk_id]["referrers"]):
+            self._remove_referrer(chunk_id, referrer)
+        entry = self._entries.pop(chunk_id)
+        for band in _bands(entry["fingerprint"]):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(chunk_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def find(self, fingerprint, tokens=None):
+        """
+        返回海明距离最近且不超过阈值的规范chunk主键，没有则返回None
+        tokens不为None时只确认关键词序列与之相同的候选（未记录关键词序列的旧条目不会被确认）
+        """
+        if fingerprint is None:
+            return None
+        with self._lock:
+            best_id, best_distance = None, SIMHASH_MAX_DISTANCE + 1
+            candidates = set()
+            for band in _bands(fingerprint):
+                candidates |= self._buckets.get(band, set())
+            for chunk_id in candidates:
+                entry = self._entries[chunk_id]
+                if tokens is not None and entry["tokens"] != tokens:
+                    continue
+                distance = bin(entry["fingerprint"] ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best_id, best_distance = chunk_id, distance
+            return best_id
+
+    def mark_duplicates(self, chunks):
+        """
+        为chunks标记重复关系：与已入库chunk重复的设置 duplicate_of=规范chunk主键；
+        与同一文档中更早的chunk重复的设置 duplicate_of_chunk=该chunk下标，入库后再解析为主键
+        返回重复chunk数量
+        """
+        # 本文档内部的查重用一个不落盘的临时索引
+        batch = NearDuplicateIndex(None)
+
+        duplicates = 0
+        for i, chunk in enumerate(chunks):
+            chunk.pop("duplicate_of", None)
+            chunk.pop("duplicate_of_chunk", None)
+            fingerprint = simhash(chunk.get("content"))
+            if fingerprint is None:
+                continue
+            tokens = key_tokens(chunk.get("content"))
+            canonical_id = self.find(fingerprint, tokens)
+            if canonical_id is not None:
+                chunk["duplicate_of"] = canonical_id
+                duplicates += 1
+                continue
+            earlier = batch.find(fingerprint, tokens)
+            if earlier is not None:
+                chunk["duplicate_of_chunk"] = earlier
+                duplicates += 1
+                continue
+            batch._add_entry(i, fingerprint, "", tokens=tokens)
+        return duplicates
+
+    def register(self, ids, chunks, source_file):
+        """登记新写入的规范chunk，ids与chunks一一对应"""
+        with self._lock:
+            for chunk_id, chunk in zip(ids, chunks):
+                fingerprint = simhash(chunk.get("content"))
+                if fingerprint is not None:
+                    self._add_entry(int(chunk_id), fingerprint, source_file, tokens=key_tokens(chunk.get("content")))
+
+    def link(self, canonical_id, source_file, year=""):
+        with self._lock:
+            entry = self._entries.get(canonical_id)
+            if entry is not None and entry["source_file"] != source_file:
+                self._add_referrer(canonical_id, source_file, year)
+
+    def linked(self, source_files=None, years=None):
+        """
+        满足来源文件/年份过滤条件的引用方所链接的规范chunk，返回 {规范chunk主键: 规范chunk的来源文件}
+        两个条件都为空时返回空字典（不过滤时规范chunk本身即可检索到）
+        """
+        if not source_files and not years:
+            return {}
+        years = {str(year) for year in years} if years else None
+        with self._lock:
+            referrers = self._referred.keys() if not source_files else set(source_files) & self._referred.keys()
+            result = {}
+            for referrer in referrers:
+                for chunk_id in self._referred[referrer]:
+                    entry = self._entries[chunk_id]
+                    if years is None or entry["referrers"][referrer] in years:
+                        result[chunk_id] = entry["source_file"]
+            return result
+
+    def delete_source(self, source_files):
+        """
+        删除来源文件的规范chunk并移除其对其他chunk的引用
+        返回 {仍引用被删规范chunk的来源文件: 被删规范chunk主键集合}
+        """
+        source_files = set(source_files)
+        orphans = {}
+        with self._lock:
+            for chunk_id in [cid for cid, entry in self._entries.items() if entry["source_file"] in source_files]:
+                for referrer in self._entries[chunk_id]["referrers"].keys() - source_files:
+                    orphans.setdefault(referrer, set()).add(chunk_id)
+                self._remove_entry(chunk_id)
+            for referrer in source_files & self._referred.keys():
+                for chunk_id in list(self._referred[referrer]):
+                    self._remove_referrer(chunk_id, referrer)
+        return orphans
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._referred.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def save(self):
+        with self._lock:
+            data = [
+                [chunk_id, entry["fingerprint"], entry["source_file"], sorted(entry["referrers"].items()), entry["tokens"]]
+                for chunk_id, entry in self._entries.items()
+            ]
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            # 早期的条目没有关键词序列，只保留用于删除时的引用关系，不再作为重复确认的依据；
+            # 引用方早期只记录来源文件，没有年份
+            for chunk_id, fingerprint, source_file, referrers, *rest in json.load(f):
+                referrers = dict((referrer, "") if isinstance(referrer, str) else referrer for referrer in referrers)
+                self._add_entry(chunk_id, fingerprint, source_file, referrers, rest[0] if rest else None)
+        print(f"已加载去重索引 {self.path} ({len(self._entries)} 个规范chunk)")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dedup_index(collection_name) -> NearDuplicateIndex:
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = NearDuplicateIndex(os.path.join(DEDUP_INDEX_DIR, f"{collection_name}.json"))
+        return _indexes[collection_name]
@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+
+
+class EmbeddingBatcher:
+    """
+    在线查询的动态微批编码器
+    各请求线程提交待编码文本后拿到Future，后台线程在max_wait_ms内聚合所有在途请求，
+    合并成一次批量前向计算后再按请求拆分结果
+    """
+    def __init__(self, encoder, max_batch_size=EMBEDDING_MAX_BATCH, max_wait_ms=EMBEDDING_BATCH_WAIT_MS):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts) -> Future:
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts, timeout=None):
+        if not texts:
+            return []
+        return self.submit(texts).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+
+            while count < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += len(item[0])
+
+            self._process(batch)
+
+    def _process(self, batch):
+        batch = [(texts, future) for texts, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        all_texts = [text for texts, _ in batch for text in texts]
+        try:
+            vectors = self.encoder.encode_batch(all_texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if len(batch) > 1:
+            print(f"Embedding batcher merged {len(batch)} requests ({len(all_texts)} texts)")
+        offset = 0
+        for texts, future in batch:
+            future.set_result(vectors[offset:offset + len(texts)])
+            offset += len(texts)
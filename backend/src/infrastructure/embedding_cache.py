@@ -0,0 +1,155 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+# 命中时的最近访问时间先记在内存中，积累到该数量或写入新向量时再批量写回
+EMBEDDING_CACHE_TOUCH_BATCH = int(os.getenv("EMBEDDING_CACHE_TOUCH_BATCH", "1000"))
+# 命中率等统计的输出间隔（秒），0表示不输出
+EMBEDDING_CACHE_STATS_INTERVAL = float(os.getenv("EMBEDDING_CACHE_STATS_INTERVAL", "600"))
+
+
+def normalize_text(text):
+    """NFKC归一化并压缩空白，作为缓存键的文本部分"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    基于SQLite的向量缓存，键为(模型路径, 维度, 归一化文本哈希)，值为float32二进制
+    超出max_entries时按最近访问时间淘汰最旧的条目；条目数在内存中维护，只在越过上限时重新计数
+    命中统计每隔stats_interval秒输出一次
+    """
+    def __init__(self, model_name, dim, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                 touch_batch=EMBEDDING_CACHE_TOUCH_BATCH, stats_interval=EMBEDDING_CACHE_STATS_INTERVAL):
+        self.model_name = model_name
+        self.dim = dim
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.stats_interval = stats_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 命中但尚未写回的最近访问时间 {key: 时间}
+        self._touched = {}
+        self._last_stats = time.time()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text):
+        raw = f"{self.model_name}\0{self.dim}\0{normalize_text(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """返回 {texts中的下标: 向量}，未命中的下标不出现在结果中"""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = list(set(keys[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key in found)
+                if len(self._touched) >= self.touch_batch:
+                    self._flush_touched()
+                    self._conn.commit()
+
+            result = {}
+            for i, key in enumerate(keys):
+                if key in found:
+                    result[i] = np.frombuffer(found[key], dtype=np.float32)
+            self.hits += len(result)
+            self.misses += len(keys) - len(result)
+        self._maybe_log_stats()
+        return result
+
+    def put_many(self, texts, vectors):
+        now = time.time()
+        rows = [
+            (self._key(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            # 相同键的向量相同，已存在（如其他进程刚写入）时不覆盖，只统计新增条数
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._count += max(cursor.rowcount, 0)
+            self._flush_touched()
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """写回命中的最近访问时间，由调用方提交"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        # 其他进程也可能写入同一文件，淘汰前重新计数
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if self._count <= self.max_entries:
+            return
+        # 一次淘汰到上限的90%，避免每次写入都触发淘汰
+        to_delete = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (to_delete,)
+        )
+        self._count -= to_delete
+        print(f"Embedding cache evicted {to_delete} entries")
+
+    def _maybe_log_stats(self):
+        if not self.stats_interval or time.time() - self._last_stats < self.stats_interval:
+            return
+        self._last_stats = time.time()
+        stats = self.stats()
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.1%}), {stats['entries']}/{stats['max_entries']} entries")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._count,
+                "max_entries": self.max_entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "./models/Qwen3-Embedding-0.6B")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+# torch: PyTorch fp32；onnx: ONNX Runtime fp32；onnx-int8: ONNX Runtime 动态int8量化
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_QUANT_CONFIG = os.getenv("EMBEDDING_ONNX_QUANT_CONFIG", "avx2")
+# ONNX导出结果的存放目录，每个模型一个子目录；不写入原模型目录（部署时可能只读）
+EMBEDDING_ONNX_CACHE_DIR = os.getenv("EMBEDDING_ONNX_CACHE_DIR", "./models/onnx_cache")
+SUPPORTED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class EmbeddingModelRegistry:
+    """
+    进程级向量模型注册表，按(模型路径, 设备, 后端)懒加载并共享模型实例
+    同一个键只会被加载一次，并发请求会等待首次加载完成
+    """
+    def __init__(self):
+        self._models = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, backend=EMBEDDING_BACKEND):
+        key = (model_name, device, backend)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(model_name, device, backend)
+                self._models[key] = model
+        return model
+
+    @staticmethod
+    def _load(model_name, device, backend):
+        from sentence_transformers import SentenceTransformer
+
+        if backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"不支持的向量模型后端: {backend}")
+
+        start = time.time()
+        if backend == "torch":
+            model = SentenceTransformer(model_name, device=device)
+        else:
+            model = _load_onnx_model(model_name, device, quantize=backend == "onnx-int8")
+        print(f"Loaded embedding model {model_name} ({backend}) on {device} in {time.time() - start:.1f}s")
+        return model
+
+    def warm_up(self, model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, backend=EMBEDDING_BACKEND):
+        """加载模型并执行一次前向计算，避免首个请求承担初始化开销"""
+        model = self.get(model_name, device, backend)
+        model.encode(["预热"])
+        return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+
+
+def _onnx_export_dir(model_name):
+    """模型的ONNX导出目录：{EMBEDDING_ONNX_CACHE_DIR}/{模型目录名或hub模型名}"""
+    name = os.path.basename(os.path.normpath(model_name)) if os.path.isdir(model_name) else model_name
+    return os.path.join(EMBEDDING_ONNX_CACHE_DIR, name.replace("/", "__"))
+
+
+def _load_onnx_model(model_name, device, quantize=False):
+    """
+    以ONNX Runtime后端加载模型；首次使用时导出到独立的缓存目录并复用，原模型目录保持不变
+    quantize=True 时额外导出动态int8量化模型
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    export_dir = _onnx_export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, "onnx", "model.onnx")):
+        print(f"Exporting {model_name} to ONNX ({export_dir}) ...")
+        model = SentenceTransformer(model_name, device=device, backend="onnx")
+        os.makedirs(export_dir, exist_ok=True)
+        model.save_pretrained(export_dir)
+        if not quantize:
+            return model
+
+    if not quantize:
+        return SentenceTransformer(export_dir, device=device, backend="onnx")
+
+    quantized_file = os.path.join("onnx", f"model_qint8_{EMBEDDING_ONNX_QUANT_CONFIG}.onnx")
+    if not os.path.exists(os.path.join(export_dir, quantized_file)):
+        print(f"Quantizing {model_name} to int8 ({EMBEDDING_ONNX_QUANT_CONFIG}) ...")
+        fp32_model = SentenceTransformer(export_dir, device=device, backend="onnx")
+        export_dynamic_quantized_onnx_model(fp32_model, EMBEDDING_ONNX_QUANT_CONFIG, export_dir)
+
+    return SentenceTransformer(
+        export_dir, device=device, backend="onnx", model_kwargs={"file_name": quantized_file}
+    )
+
+
+_registry = EmbeddingModelRegistry()
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, backend=EMBEDDING_BACKEND):
+    return _registry.get(model_name, device, backend)
+
+
+def warm_up_embedding_model(model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, backend=EMBEDDING_BACKEND):
+    return _registry.warm_up(model_name, device, backend)
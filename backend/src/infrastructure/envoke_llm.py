@@ -1,9 +1,27 @@
 import json
+import os
+import threading
 
+import httpx
 import requests
 from openai import OpenAI
 
-from backend.src.utils.llm_utils import get_current_model_config, collect_stream, load_template_and_fill
+from src.utils.llm_utils import get_current_model_config, collect_stream, load_template_and_fill, \
+    resolve_model_config
+
+try:
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+# 服务端支持时使用HTTP/2，多个并发请求复用同一连接
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1" and _H2_AVAILABLE
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "32"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "16"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
 
 
 def revoke_llm_deployment_by_vllm(message, base_url, model_path, incremental=True):
@@ -57,9 +75,89 @@ def revoke_llm_deployment_by_vllm(message, base_url, model_path, incremental=Tru
                         context += message_chunk
                         yield context
 
+class _PooledHttpClient(httpx.Client):
+    """从池中移除的客户端不再被引用、被回收时关闭连接"""
+    def __del__(self):
+        try:
+            if not self.is_closed:
+                self.close()
+        except Exception:
+            pass
+
+
+class LLMClientPool:
+    """
+    OpenAI客户端池，按 (模型键值, base_url, api_key) 复用：
+    - 每个条目持有一个长连接的httpx连接池，避免每次调用重新建连和TLS握手
+    - OpenAI客户端本身无会话状态、线程安全，对话历史保存在每次创建的LLM_API对象中
+    - 模型配置变化后旧条目只从池中移除、不主动关闭：其他线程可能仍在用它进行请求，
+      请求结束、不再被引用后客户端被回收，连接随之关闭
+    """
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_key, base_url, api_key):
+        key = (model_key, base_url, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+            # 同一模型的配置已被修改，旧的base_url/api_key不会再使用
+            for old in [old for old in self._clients if old[0] == model_key]:
+                del self._clients[old]
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=LLM_MAX_RETRIES,
+                http_client=_PooledHttpClient(
+                    http2=LLM_HTTP2,
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=LLM_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+                    ),
+                ),
+            )
+            self._clients[key] = client
+            print(f"新建LLM客户端 [{model_key}] {base_url} (http2={LLM_HTTP2})")
+            return client
+
+    def invalidate(self, model_key=None):
+        """移除指定模型的客户端；model_key为空时移除全部"""
+        with self._lock:
+            keys = [key for key in self._clients if model_key is None or key[0] == model_key]
+            for key in keys:
+                del self._clients[key]
+            return len(keys)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_llm_client_pool() -> LLMClientPool:
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = LLMClientPool()
+        return _client_pool
+
+
+def invalidate_llm_clients(model_key=None):
+    """/api/config 修改或删除模型配置后调用"""
+    return get_llm_client_pool().invalidate(model_key)
+
+
 class LLM_API:
-    def __init__(self, api_key, base_url, model_type, temperature=0.3, max_token=2048, top_p=0.8, max_history=20):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    def __init__(self, api_key, base_url, model_type, temperature=0.3, max_token=2048, top_p=0.8, max_history=20,
+                 client=None):
+        self.client = client if client is not None else OpenAI(api_key=api_key, base_url=base_url)
         self.model_type = model_type
         self.temperature = float(temperature)
         self.max_token = int(max_token)
@@ -118,20 +216,22 @@ class LLM_API:
         self.conversation_history = []
 
 class RagLLMAPI(LLM_API):
-    def __init__(self, api_key, base_url, model_type, temperature=0.6, max_token=4096, top_p=0.8, max_history=20):
-        super().__init__(api_key, base_url, model_type, temperature, max_token, top_p, max_history)
+    def __init__(self, api_key, base_url, model_type, temperature=0.6, max_token=4096, top_p=0.8, max_history=20,
+                 client=None):
+        super().__init__(api_key, base_url, model_type, temperature, max_token, top_p, max_history, client)
 
 class LLMAPIFactory:
     @staticmethod
     def create_api(situation='rag', model_name=None):
-        print(f"active model is {model_name}")
-        api_key, base_url, model_type = get_current_model_config(model_name)
-        print(f"model is {model_type}, base_url is {base_url}")
+        """每次调用返回新的LLM_API（对话历史互不影响），底层客户端和连接来自客户端池"""
+        model_config = resolve_model_config(model_name)
+        api_key, base_url, model_type = model_config['api_key'], model_config['base_url'], model_config['model_type']
         if not all([api_key, base_url, model_type]):
             raise ValueError('LLM配置不完整，请检查配置文件')
-        
+        client = get_llm_client_pool().get(model_config['key'], base_url, api_key)
+
         if situation == 'rag':
-            return RagLLMAPI(api_key=api_key, base_url=base_url, model_type=model_type)
+            return RagLLMAPI(api_key=api_key, base_url=base_url, model_type=model_type, client=client)
         else:
             raise ValueError(f'situation {situation} not supported')
 
@@ -0,0 +1,53 @@
+import os
+
+# 命名索引配置：build为建索引参数，search为查询参数
+INDEX_PROFILES = {
+    "hnsw_default": {"index_type": "HNSW", "build": {"M": 16, "efConstruction": 100}, "search": {"ef": 128}},
+    "hnsw_fast": {"index_type": "HNSW", "build": {"M": 8, "efConstruction": 64}, "search": {"ef": 48}},
+    "hnsw_accurate": {"index_type": "HNSW", "build": {"M": 32, "efConstruction": 200}, "search": {"ef": 256}},
+    "ivf_flat": {"index_type": "IVF_FLAT", "build": {"nlist": 1024}, "search": {"nprobe": 16}},
+    "ivf_pq": {"index_type": "IVF_PQ", "build": {"nlist": 1024, "m": 64, "nbits": 8}, "search": {"nprobe": 32}},
+    "diskann": {"index_type": "DISKANN", "build": {}, "search": {"search_list": 100}},
+}
+
+MILVUS_INDEX_PROFILE = os.getenv("MILVUS_INDEX_PROFILE", "hnsw_default")
+# 按字段覆盖默认配置，如 "content_vector=ivf_pq,tags_vector=hnsw_fast"
+MILVUS_FIELD_INDEX_PROFILES = os.getenv("MILVUS_FIELD_INDEX_PROFILES", "")
+
+
+def get_index_profile(name):
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"未知的索引配置: {name}，可选: {', '.join(INDEX_PROFILES)}")
+    return INDEX_PROFILES[name]
+
+
+def resolve_field_profiles(fields, default=MILVUS_INDEX_PROFILE, overrides=MILVUS_FIELD_INDEX_PROFILES):
+    """返回 {向量字段: 索引配置名}"""
+    profiles = {field: default for field in fields}
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        field, _, name = item.partition("=")
+        if field.strip() not in profiles:
+            raise ValueError(f"索引配置中的字段不存在: {field}")
+        profiles[field.strip()] = name.strip()
+    for name in profiles.values():
+        get_index_profile(name)
+    return profiles
+
+
+def build_search_param(name, metric_type="COSINE"):
+    return {"metric_type": metric_type, "params": dict(get_index_profile(name)["search"])}
+
+
+def estimate_index_bytes(name, num_vectors, dim):
+    """粗略估算单个向量字段索引的内存占用，用于对比不同配置"""
+    profile = get_index_profile(name)
+    build = profile["build"]
+    raw = num_vectors * dim * 4
+    if profile["index_type"] == "HNSW":
+        return raw + num_vectors * build["M"] * 2 * 4
+    if profile["index_type"] == "IVF_FLAT":
+        return raw + build["nlist"] * dim * 4
+    if profile["index_type"] == "IVF_PQ":
+        return num_vectors * build["m"] * build["nbits"] // 8 + build["nlist"] * dim * 4
+    # DISKANN 的原始向量和图在磁盘上，内存中主要是PQ编码
+    return num_vectors * dim // 8
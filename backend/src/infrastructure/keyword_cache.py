@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.infrastructure.embedding_cache import normalize_text
+
+KEYWORD_CACHE_ENABLED = os.getenv("KEYWORD_CACHE_ENABLED", "1") == "1"
+KEYWORD_CACHE_PATH = os.getenv("KEYWORD_CACHE_PATH", "./cache/keyword_cache.sqlite")
+KEYWORD_CACHE_TTL_SECONDS = float(os.getenv("KEYWORD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+KEYWORD_CACHE_MAX_ENTRIES = int(os.getenv("KEYWORD_CACHE_MAX_ENTRIES", "100000"))
+
+# 查询末尾的标点不影响关键词扩展结果
+_TRAILING_PUNCTUATION = "?？!！。.,，;；:： "
+
+
+def normalize_query(query):
+    """NFKC归一化、压缩空白、转小写并去掉末尾标点，格式上的差异映射到同一个缓存键"""
+    return normalize_text(query or "").lower().rstrip(_TRAILING_PUNCTUATION)
+
+
+def template_hash(template):
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()
+
+
+class KeywordExpansionCache:
+    """
+    关键词扩展结果缓存，键为(模型, prompt模板内容哈希, 归一化查询)的哈希，值为扩展结果JSON
+    - 模板修改后哈希变化，旧结果自然失效
+    - 超过TTL的条目视为未命中，超出max_entries时按最近访问时间淘汰
+    """
+    def __init__(self, path=KEYWORD_CACHE_PATH, ttl=KEYWORD_CACHE_TTL_SECONDS, max_entries=KEYWORD_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keywords ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_keywords_last_access ON keywords(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_key, prompt_hash, query):
+        raw = f"{model_key}\0{prompt_hash}\0{normalize_query(query)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """命中返回扩展结果，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM keywords WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE keywords SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO keywords (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM keywords WHERE expires_at <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # 一次淘汰到上限的90%，避免每次写入都触发淘汰
+        to_delete = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM keywords WHERE key IN "
+            "(SELECT key FROM keywords ORDER BY last_access ASC LIMIT ?)", (to_delete,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM keywords")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+
+_keyword_cache = None
+_keyword_cache_lock = threading.Lock()
+
+
+def get_keyword_cache() -> KeywordExpansionCache:
+    global _keyword_cache
+    with _keyword_cache_lock:
+        if _keyword_cache is None:
+            _keyword_cache = KeywordExpansionCache()
+        return _keyword_cache
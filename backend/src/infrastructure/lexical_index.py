@@ -0,0 +1,298 @@
+import json
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+from src.infrastructure.embedding_cache import normalize_text
+from src.infrastructure.score_fusion import top_k_indices
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "1") == "1"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "./data/lexical_index")
+# ngram: 中文按字二元组切分；jieba: 使用jieba搜索引擎模式分词（需安装jieba）
+LEXICAL_TOKENIZER = os.getenv("LEXICAL_TOKENIZER", "ngram")
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 删除标记占比超过该值时重建倒排表
+COMPACT_DELETED_RATIO = 0.25
+# 参与倒排索引的chunk字段
+LEXICAL_TEXT_FIELDS = ["title", "section", "tags", "content"]
+
+# 标准编号（JGJ289-2012、GB 50016-2014、GB/T 50001）和条文编号（5.2.3）作为整体词项
+_CODE_RE = re.compile(r"[a-z]{1,8}(?:/[a-z])?\s?\d+(?:[.\-]\d+)*")
+_CLAUSE_RE = re.compile(r"\d+(?:\.\d+)+")
+_CJK_RE = re.compile(r"[一-鿿]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def structured_tokens(text):
+    """标准编号和条文编号词项；标准编号同时产出去掉年份的形式，便于省略年份的查询命中"""
+    tokens = []
+    for match in _CODE_RE.findall(text):
+        code = match.replace(" ", "")
+        tokens.append(code)
+        if "-" in code:
+            tokens.append(code.split("-", 1)[0])
+    tokens.extend(_CLAUSE_RE.findall(_CODE_RE.sub(" ", text)))
+    return tokens
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = normalize_text(text).lower()
+    tokens = structured_tokens(text)
+    rest = _CLAUSE_RE.sub(" ", _CODE_RE.sub(" ", text))
+    for run in _CJK_RE.findall(rest):
+        if LEXICAL_TOKENIZER == "jieba" and jieba is not None:
+            tokens.extend(word for word in jieba.lcut_for_search(run) if word.strip())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_WORD_RE.findall(_CJK_RE.sub(" ", rest)))
+    return tokens
+
+
+def _encode_values(values):
+    """字符串列表编码为 (整数编码数组, {值: 编码})，过滤时只比较整数"""
+    codes = {}
+    encoded = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int32, count=len(values))
+    return encoded, codes
+
+
+def _filter_mask(encoded, allowed):
+    codes, mapping = encoded
+    return np.isin(codes, [mapping[value] for value in allowed if value in mapping])
+
+
+class LexicalHit:
+    """与向量检索命中一致的最小接口，payload由两阶段检索回填"""
+    __slots__ = ("id", "distance", "entity")
+
+    def __init__(self, id, distance):
+        self.id = id
+        self.distance = distance
+        self.entity = {}
+
+
+class LexicalIndex:
+    """
+    BM25倒排索引：
+    - 文档号按写入顺序递增，每个词项的倒排表为 (文档号差值 uint32, 词频 uint16) 两个数组，追加写入
+    - 删除只打标记，删除占比过高时重建
+    - 检索时按词项解码倒排表并向量化累加BM25分数
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._last_doc = {}
+        self._doc_ids = []
+        self._doc_len = []
+        self._alive = []
+        self._doc_source = []
+        self._doc_year = []
+        self._arrays = None
+        self._load()
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._alive)
+
+    def _doc_arrays(self):
+        if self._arrays is None:
+            doc_len = np.asarray(self._doc_len, dtype=np.float32)
+            alive = np.asarray(self._alive, dtype=bool)
+            avgdl = max(float(doc_len[alive].mean()), 1.0) if alive.any() else 1.0
+            self._arrays = (
+                np.asarray(self._doc_ids, dtype=np.int64),
+                alive,
+                # BM25分母中与词频无关的部分，按文档预先算好
+                BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avgdl),
+                _encode_values(self._doc_source),
+                _encode_values(self._doc_year),
+            )
+        return self._arrays
+
+    def add_documents(self, ids, chunks):
+        """ids为向量库返回的主键，与chunks一一对应"""
+        with self._lock:
+            new_postings = {}
+            for chunk_id, chunk in zip(ids, chunks):
+                doc = len(self._doc_ids)
+                tokens = tokenize(" ".join(str(chunk.get(field) or "") for field in LEXICAL_TEXT_FIELDS))
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    new_postings.setdefault(token, ([], []))
+                    new_postings[token][0].append(doc)
+                    new_postings[token][1].append(min(tf, 65535))
+                self._doc_ids.append(int(chunk_id))
+                self._doc_len.append(len(tokens))
+                self._alive.append(True)
+                self._doc_source.append(chunk.get("source_file") or "")
+                self._doc_year.append(str(chunk.get("year") or ""))
+
+            for token, (docs, tfs) in new_postings.items():
+                docs = np.asarray(docs, dtype=np.int64)
+                deltas = np.diff(docs, prepend=self._last_doc.get(token, 0)).astype(np.uint32)
+                self._last_doc[token] = int(docs[-1])
+                tfs = np.asarray(tfs, dtype=np.uint16)
+                if token in self._postings:
+                    old_deltas, old_tfs = self._postings[token]
+                    deltas, tfs = np.concatenate([old_deltas, deltas]), np.concatenate([old_tfs, tfs])
+                self._postings[token] = (deltas, tfs)
+            self._arrays = None
+
+    def delete_source(self, source_files):
+        source_files = set(source_files)
+        with self._lock:
+            deleted = 0
+            for doc, source_file in enumerate(self._doc_source):
+                if self._alive[doc] and source_file in source_files:
+                    self._alive[doc] = False
+                    deleted += 1
+            self._arrays = None
+            if self._alive and 1 - sum(self._alive) / len(self._alive) > COMPACT_DELETED_RATIO:
+                self._compact()
+            return deleted
+
+    def clear(self):
+        with self._lock:
+            self._postings, self._last_doc = {}, {}
+            self._doc_ids, self._doc_len, self._alive, self._doc_source, self._doc_year = [], [], [], [], []
+            self._arrays = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _compact(self):
+        """丢弃已删除文档并重新编号"""
+        alive = np.asarray(self._alive, dtype=bool)
+        remap = np.cumsum(alive) - 1
+        postings, last_doc = {}, {}
+        for token, (deltas, tfs) in self._postings.items():
+            docs = np.cumsum(deltas, dtype=np.int64)
+            keep = alive[docs]
+            if not keep.any():
+                continue
+            docs = remap[docs[keep]]
+            postings[token] = (np.diff(docs, prepend=0).astype(np.uint32), tfs[keep])
+            last_doc[token] = int(docs[-1])
+        keep_docs = np.flatnonzero(alive)
+        self._postings, self._last_doc = postings, last_doc
+        self._doc_ids = [self._doc_ids[i] for i in keep_docs]
+        self._doc_len = [self._doc_len[i] for i in keep_docs]
+        self._doc_source = [self._doc_source[i] for i in keep_docs]
+        self._doc_year = [self._doc_year[i] for i in keep_docs]
+        self._alive = [True] * len(keep_docs)
+        self._arrays = None
+
+    def search(self, query, limit=10, source_files=None, years=None, ids=None):
+        """
+        返回 [(主键, BM25分数)]，按分数从高到低
+        ids: 不受来源文件/年份过滤限制的主键（其他来源链接到的近似重复规范chunk）
+        """
+        query_terms = {}
+        for token in tokenize(query):
+            query_terms[token] = query_terms.get(token, 0) + 1
+
+        with self._lock:
+            if not self._doc_ids or not query_terms:
+                return []
+            doc_ids, alive, norm, doc_source, doc_year = self._doc_arrays()
+            n_docs = len(self._doc_ids)
+
+            all_docs, all_scores = [], []
+            for token, query_tf in query_terms.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    continue
+                deltas, tfs = posting
+                docs = np.cumsum(deltas, dtype=np.int64)
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                tf = tfs.astype(np.float32)
+                all_docs.append(docs)
+                all_scores.append(query_tf * idf * tf * (BM25_K1 + 1) / (tf + norm[docs]))
+            if not all_docs:
+                return []
+
+            scores = np.bincount(np.concatenate(all_docs), weights=np.concatenate(all_scores), minlength=n_docs)
+            allowed = np.ones(n_docs, dtype=bool)
+            if source_files:
+                allowed &= _filter_mask(doc_source, source_files)
+            if years:
+                allowed &= _filter_mask(doc_year, [str(year) for year in years])
+            if ids:
+                allowed |= np.isin(doc_ids, list(ids))
+            docs = np.flatnonzero(alive & (scores > 0) & allowed)
+            selected = docs[top_k_indices(scores[docs], limit)]
+            return [(int(doc_ids[doc]), float(scores[doc])) for doc in selected]
+
+    def search_hits(self, query, limit=10, source_files=None, years=None, ids=None):
+        """检索结果转为命中对象，分数按该查询的最高分归一化到(0, 1]，便于与相似度融合"""
+        results = self.search(query, limit, source_files, years, ids)
+        if not results:
+            return []
+        top = results[0][1]
+        return [LexicalHit(chunk_id, score / top) for chunk_id, score in results]
+
+    def save(self):
+        with self._lock:
+            tokens = list(self._postings)
+            lengths = np.asarray([len(self._postings[t][0]) for t in tokens], dtype=np.int64)
+            empty = (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16))
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                tokens=np.frombuffer(json.dumps(tokens, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                lengths=lengths,
+                deltas=np.concatenate([self._postings[t][0] for t in tokens] or [empty[0]]),
+                tfs=np.concatenate([self._postings[t][1] for t in tokens] or [empty[1]]),
+                doc_ids=np.asarray(self._doc_ids, dtype=np.int64),
+                doc_len=np.asarray(self._doc_len, dtype=np.int32),
+                alive=np.asarray(self._alive, dtype=bool),
+                doc_meta=np.frombuffer(
+                    json.dumps([self._doc_source, self._doc_year], ensure_ascii=False).encode("utf-8"), dtype=np.uint8
+                ),
+            )
+            os.replace(tmp_path, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            tokens = json.loads(data["tokens"].tobytes().decode("utf-8"))
+            offsets = np.concatenate([[0], np.cumsum(data["lengths"])])
+            deltas, tfs = data["deltas"], data["tfs"]
+            for i, token in enumerate(tokens):
+                token_deltas = deltas[offsets[i]:offsets[i + 1]]
+                self._postings[token] = (token_deltas, tfs[offsets[i]:offsets[i + 1]])
+                self._last_doc[token] = int(token_deltas.sum(dtype=np.int64))
+            self._doc_ids = data["doc_ids"].tolist()
+            self._doc_len = data["doc_len"].tolist()
+            self._alive = data["alive"].tolist()
+            self._doc_source, self._doc_year = json.loads(data["doc_meta"].tobytes().decode("utf-8"))
+        print(f"已加载词法索引 {self.path} ({len(self._doc_ids)} 个文档, {len(tokens)} 个词项)")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name) -> LexicalIndex:
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = LexicalIndex(os.path.join(LEXICAL_INDEX_DIR, f"{collection_name}.npz"))
+        return _indexes[collection_name]
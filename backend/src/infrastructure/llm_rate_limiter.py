@@ -0,0 +1,120 @@
+import os
+import random
+import threading
+import time
+
+# 每个模型同时进行中的请求数上限
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# 每个模型每秒请求数上限，0表示不限速；BURST为令牌桶容量
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "0"))
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "16"))
+# 被限流(429)时的指数退避
+LLM_BACKOFF_MAX_RETRIES = int(os.getenv("LLM_BACKOFF_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+# 等待令牌或并发名额时检查取消信号的间隔
+_WAIT_SLICE_SECONDS = 0.2
+
+
+class RateLimitWaitCancelled(Exception):
+    """等待限流期间收到取消信号"""
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    """服务端在Retry-After头中给出的等待秒数，没有时返回None"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error):
+    return _status_code(error) == 429
+
+
+def _wait(seconds, stop_event):
+    """可被取消的等待"""
+    if stop_event is None:
+        time.sleep(seconds)
+    elif stop_event.wait(seconds):
+        raise RateLimitWaitCancelled()
+
+
+class ModelRateLimiter:
+    """
+    单个模型的请求限制：
+    - 信号量限制并发数，令牌桶限制请求速率
+    - 任一请求被限流时，该模型所有新请求一起暂停到退避结束，避免并发请求继续撞限流
+    """
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, rate=LLM_RATE_LIMIT_RPS, burst=LLM_RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._semaphore = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _acquire_token(self, stop_event):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            _wait(min(delay, _WAIT_SLICE_SECONDS), stop_event)
+
+    def _acquire_slot(self, stop_event):
+        while not self._semaphore.acquire(timeout=_WAIT_SLICE_SECONDS):
+            if stop_event is not None and stop_event.is_set():
+                raise RateLimitWaitCancelled()
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def call(self, func, stop_event=None):
+        """在并发和速率限制下调用func；被限流时退避重试，其他异常直接抛出"""
+        for attempt in range(LLM_BACKOFF_MAX_RETRIES + 1):
+            self._acquire_token(stop_event)
+            self._acquire_slot(stop_event)
+            try:
+                return func()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == LLM_BACKOFF_MAX_RETRIES:
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.0)
+                print(f"LLM请求被限流，{delay:.1f}s后第{attempt + 1}次重试")
+                self._pause(delay)
+            finally:
+                self._semaphore.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_model_limiter(model_name) -> ModelRateLimiter:
+    with _limiters_lock:
+        if model_name not in _limiters:
+            _limiters[model_name] = ModelRateLimiter()
+        return _limiters[model_name]
@@ -0,0 +1,460 @@
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+
+import numpy as np
+
+from src.infrastructure.milvus_db import (
+    MilvusDbManager, EMBEDDING_TEXT_FIELDS, VECTOR_STORAGE_DIM, VECTOR_STORAGE_DTYPE, _in_expr
+)
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", "./data/local_vector_store")
+# flat: 分块矩阵乘精确检索；hnsw: 进程内HNSW图（需安装hnswlib）
+LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "flat")
+VECTOR_FIELDS = [f"{field}_vector" for field in EMBEDDING_TEXT_FIELDS]
+SEARCH_BLOCK_ROWS = 65536
+INITIAL_CAPACITY = 1024
+# 有独立列的字段，其余字段从payload JSON中提取
+INDEXED_COLUMNS = {"id", "source_file", "year"}
+
+
+class _LocalHit:
+    """与pymilvus Hit保持一致的最小接口：id、distance、entity.get()"""
+    __slots__ = ("id", "distance", "entity")
+
+    def __init__(self, id, distance, entity):
+        self.id = id
+        self.distance = distance
+        self.entity = entity
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _merge_topk(scores, ids, k):
+    """对每行保留分数最高的k个候选，scores/ids形状均为(nq, n)"""
+    if scores.shape[1] <= k:
+        return scores, ids
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, idx, axis=1), np.take_along_axis(ids, idx, axis=1)
+
+
+def _parse_expr(expr):
+    """
+    解析Milvus过滤表达式的常用子集：以 or 连接的若干组、每组以 and 连接的 `field == value` / `field in [...]`
+    返回SQL条件与参数
+    """
+    groups, params = [], []
+    for group in re.split(r"\s+or\s+", expr.strip()):
+        conditions = []
+        for clause in re.split(r"\s+and\s+", group):
+            match = re.match(r"^\(?\s*(\w+)\s*(==|in)\s*(.+?)\s*\)?$", clause)
+            if not match:
+                raise ValueError(f"本地向量库不支持的过滤表达式: {expr}")
+            field, op, raw_value = match.groups()
+            value = json.loads(raw_value)
+            values = value if op == "in" else [value]
+            column = field if field in INDEXED_COLUMNS else f"json_extract(payload, '$.{field}')"
+            if not values:
+                conditions.append("0")
+                continue
+            conditions.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        groups.append(" AND ".join(conditions))
+    if len(groups) == 1:
+        return groups[0], params
+    return " OR ".join(f"({group})" for group in groups), params
+
+
+class LocalVectorStore(MilvusDbManager):
+    """
+    嵌入式本地向量库，对外接口与MilvusDbManager一致，用于开发、CI、边缘部署及无网络开销的检索基准
+    - 每个向量字段存为一个float32内存映射文件，行号即id
+    - 文本字段存于SQLite，删除只打标记
+    - 默认分块矩阵乘精确检索；LOCAL_VECTOR_INDEX=hnsw 且安装了hnswlib时使用进程内HNSW图
+    重新打开时只映射文件、不做全量读取；上次未flush就退出时，按SQLite中的行数补齐容量和HNSW图
+    """
+    def __init__(self, collection_name, dim=VECTOR_STORAGE_DIM, vector_dtype=VECTOR_STORAGE_DTYPE,
+                 root_dir=LOCAL_VECTOR_STORE_DIR, index_type=LOCAL_VECTOR_INDEX):
+        super().__init__(collection_name, dim=dim, vector_dtype=vector_dtype)
+        self.connection = None
+        self.search_mode = "multi"
+        self.partition_mode = "none"
+        self.two_phase = False
+        self.path = os.path.join(root_dir, collection_name)
+        if index_type == "hnsw" and hnswlib is None:
+            print("未安装hnswlib，本地向量库退回精确检索")
+            index_type = "flat"
+        self.index_type = index_type
+
+        # 同一目录的实例共用一把锁；正常情况下经由get_local_vector_store共享同一个实例
+        self._lock = _path_lock(self.path)
+        self._conn = None
+        self._vectors = {}
+        self._alive = None
+        self._hnsw = {}
+        self._count = 0
+        self._capacity = 0
+
+    @property
+    def client(self):
+        raise RuntimeError("LocalVectorStore 不使用 MilvusClient")
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _file_path(self, name):
+        return os.path.join(self.path, name)
+
+    def initialize(self):
+        if os.path.exists(self._meta_path()):
+            print(f"Collection '{self.collection_name}' already exists.")
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._meta_path(), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "count": 0, "capacity": 0, "index_type": self.index_type}, f)
+        self._ensure_open()
+
+    def _ensure_open(self):
+        if self._conn is not None:
+            return
+        if not os.path.exists(self._meta_path()):
+            raise ValueError(f"本地collection '{self.collection_name}' 不存在，请先调用initialize()")
+
+        with open(self._meta_path(), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"本地collection维度为 {meta['dim']}，与当前配置 {self.dim} 不一致")
+
+        conn = sqlite3.connect(self._file_path("rows.sqlite"), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "id INTEGER PRIMARY KEY, source_file TEXT, year TEXT, payload TEXT NOT NULL, "
+            "deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_source_file ON rows(source_file)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_year ON rows(year)")
+        conn.commit()
+        max_id = conn.execute("SELECT MAX(id) FROM rows").fetchone()[0]
+
+        # meta只在flush时写入；文件在flush前已扩容时以文件大小为准
+        alive_path = self._file_path("alive.u8")
+        file_capacity = os.path.getsize(alive_path) if os.path.exists(alive_path) else 0
+        self._capacity = max(meta["capacity"], file_capacity)
+        self._count = max(meta["count"], max_id + 1 if max_id is not None else 0)
+        if self._count > self._capacity:
+            raise ValueError(
+                f"本地collection '{self.collection_name}' 的向量文件不完整：{self._count} 行，容量 {self._capacity}"
+            )
+        recovered = False
+        if self._capacity:
+            self._map_files(self._capacity)
+            if self.index_type == "hnsw":
+                for field in VECTOR_FIELDS:
+                    index = hnswlib.Index(space="cosine", dim=self.dim)
+                    index_path = self._file_path(f"{field}.hnsw")
+                    # HNSW图只在flush时落盘，覆盖到meta中记录的行数
+                    graph_rows = 0
+                    if os.path.exists(index_path):
+                        index.load_index(index_path, max_elements=self._capacity)
+                        graph_rows = meta["count"]
+                    else:
+                        index.init_index(max_elements=self._capacity, ef_construction=100, M=16)
+                    index.set_ef(128)
+                    self._hnsw[field] = index
+                    recovered |= self._recover_hnsw(field, graph_rows, self._count)
+        self._conn = conn
+        if recovered:
+            self._flush()
+
+    def _recover_hnsw(self, field, start, end):
+        """
+        把 [start, end) 行补入HNSW图：写入后、flush前退出时，向量与payload已写入但图中缺少这些行
+        返回是否补入了数据
+        """
+        if start >= end:
+            return False
+        index = self._hnsw[field]
+        for block_start in range(start, end, SEARCH_BLOCK_ROWS):
+            block_end = min(end, block_start + SEARCH_BLOCK_ROWS)
+            matrix = np.asarray(self._vectors[field][block_start:block_end])
+            keep = np.asarray(self._alive[block_start:block_end], dtype=bool) & (np.linalg.norm(matrix, axis=1) > 0)
+            if keep.any():
+                index.add_items(matrix[keep], np.arange(block_start, block_end)[keep])
+        print(f"HNSW索引 {field} 缺少第 {start}-{end - 1} 行，已从向量文件补入")
+        return True
+
+    @staticmethod
+    def _grow_file(path, size):
+        """文件不足size字节时扩展，已有数据不截断"""
+        open(path, "ab").close()
+        if os.path.getsize(path) < size:
+            os.truncate(path, size)
+
+    def _map_files(self, capacity):
+        for field in VECTOR_FIELDS:
+            path = self._file_path(f"{field}.f32")
+            self._grow_file(path, capacity * self.dim * 4)
+            self._vectors[field] = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        alive_path = self._file_path("alive.u8")
+        self._grow_file(alive_path, capacity)
+        self._alive = np.memmap(alive_path, dtype=np.uint8, mode="r+", shape=(capacity,))
+
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+        capacity = max(self._capacity, INITIAL_CAPACITY)
+        while capacity < size:
+            capacity *= 2
+        self._map_files(capacity)
+        if self.index_type == "hnsw":
+            for field in VECTOR_FIELDS:
+                if field not in self._hnsw:
+                    index = hnswlib.Index(space="cosine", dim=self.dim)
+                    index.init_index(max_elements=capacity, ef_construction=100, M=16)
+                    index.set_ef(128)
+                    self._hnsw[field] = index
+                else:
+                    self._hnsw[field].resize_index(capacity)
+        self._capacity = capacity
+
+    def _insert_rows(self, rows: list) -> list:
+        with self._lock:
+            self._ensure_open()
+            # 以SQLite中的最大主键为准分配，避免与同一目录的其他实例写入的行冲突
+            max_id = self._conn.execute("SELECT MAX(id) FROM rows").fetchone()[0]
+            start = max(self._count, max_id + 1 if max_id is not None else 0)
+            ids = list(range(start, start + len(rows)))
+
+            # 先写SQLite（主键冲突等错误在此抛出），向量写入成功后再提交
+            try:
+                self._conn.executemany(
+                    "INSERT INTO rows (id, source_file, year, payload) VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            row_id, row.get("source_file", ""), str(row.get("year", "")),
+                            json.dumps({k: v for k, v in row.items() if k not in VECTOR_FIELDS}, ensure_ascii=False)
+                        )
+                        for row_id, row in zip(ids, rows)
+                    ]
+                )
+                self._reserve(start + len(rows))
+                for field in VECTOR_FIELDS:
+                    matrix = _normalize(np.asarray([row[field] for row in rows], dtype=np.float32))
+                    self._vectors[field][start:start + len(rows)] = matrix
+                    if self.index_type == "hnsw":
+                        # 空文本对应零向量，余弦相似度无定义，不加入图索引
+                        nonzero = np.linalg.norm(matrix, axis=1) > 0
+                        if nonzero.any():
+                            self._hnsw[field].add_items(matrix[nonzero], np.asarray(ids)[nonzero])
+                self._alive[start:start + len(rows)] = 1
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._count = start + len(rows)
+            return ids
+
+    def _flush(self):
+        with self._lock:
+            self._ensure_open()
+            for vectors in self._vectors.values():
+                vectors.flush()
+            if self._alive is not None:
+                self._alive.flush()
+            for field, index in self._hnsw.items():
+                index.save_index(self._file_path(f"{field}.hnsw"))
+            with open(self._meta_path(), "w", encoding="utf-8") as f:
+                json.dump({
+                    "dim": self.dim, "count": self._count,
+                    "capacity": self._capacity, "index_type": self.index_type
+                }, f)
+
+    def _expr_ids(self, expr):
+        where, params = _parse_expr(expr)
+        rows = self._conn.execute(f"SELECT id FROM rows WHERE deleted = 0 AND ({where})", params).fetchall()
+        return np.asarray([row[0] for row in rows], dtype=np.int64)
+
+    def _ann_search(self, anns_field, data, limit, output_fields, param=None, expr=None, partition_names=None):
+        with self._lock:
+            self._ensure_open()
+            count = self._count
+            if count == 0:
+                return [[] for _ in data]
+            vectors = self._vectors[anns_field]
+            mask = np.asarray(self._alive[:count], dtype=bool)
+            if expr:
+                allowed = np.zeros(count, dtype=bool)
+                allowed[self._expr_ids(expr)] = True
+                mask &= allowed
+
+        # 与Milvus一致：offset用于翻页，radius/range_filter表示范围检索 radius < 相似度 <= range_filter
+        param = param or {}
+        offset = param.get("offset", 0)
+        radius = param.get("params", {}).get("radius")
+        range_filter = param.get("params", {}).get("range_filter")
+
+        queries = _normalize(np.asarray(data, dtype=np.float32))
+        if self.index_type == "hnsw" and not expr:
+            scores, ids = self._hnsw_search(anns_field, queries, offset + limit, int(mask.sum()))
+        else:
+            scores, ids = self._flat_search(vectors, count, mask, queries, offset + limit)
+        scores = [np.asarray(row)[offset:] for row in scores]
+        ids = [np.asarray(row)[offset:] for row in ids]
+        if radius is not None or range_filter is not None:
+            keep = [
+                (row > (radius if radius is not None else -np.inf))
+                & (row <= (range_filter if range_filter is not None else np.inf))
+                for row in scores
+            ]
+            scores = [row[k] for row, k in zip(scores, keep)]
+            ids = [row[k] for row, k in zip(ids, keep)]
+
+        payloads = self._load_payloads({int(i) for row in ids for i in row}) if output_fields else {}
+        return [
+            [_LocalHit(int(i), float(score), payloads.get(int(i), {})) for score, i in zip(row_scores, row_ids)]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    def _flat_search(self, vectors, count, mask, queries, limit):
+        """分块矩阵乘精确检索，每块只保留top-k候选后与全局候选合并"""
+        nq = queries.shape[0]
+        best_scores = np.empty((nq, 0), dtype=np.float32)
+        best_ids = np.empty((nq, 0), dtype=np.int64)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(count, start + SEARCH_BLOCK_ROWS)
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            scores = queries @ np.asarray(vectors[start:end]).T
+            scores[:, ~block_mask] = -np.inf
+            ids = np.broadcast_to(np.arange(start, end, dtype=np.int64), scores.shape)
+            scores, ids = _merge_topk(scores, ids, limit)
+            best_scores, best_ids = _merge_topk(
+                np.concatenate([best_scores, scores], axis=1), np.concatenate([best_ids, ids], axis=1), limit
+            )
+
+        results_scores, results_ids = [], []
+        for row_scores, row_ids in zip(best_scores, best_ids):
+            order = np.argsort(-row_scores)
+            keep = order[np.isfinite(row_scores[order])]
+            results_scores.append(row_scores[keep])
+            results_ids.append(row_ids[keep])
+        return results_scores, results_ids
+
+    def _hnsw_search(self, anns_field, queries, limit, alive_count):
+        index = self._hnsw[anns_field]
+        k = min(limit, alive_count, index.get_current_count())
+        if k == 0:
+            return [[] for _ in queries], [[] for _ in queries]
+        labels, distances = index.knn_query(queries, k=k)
+        # hnswlib的cosine空间返回 1 - cos
+        return list(1.0 - distances), list(labels.astype(np.int64))
+
+    def _load_payloads(self, ids):
+        if not ids:
+            return {}
+        ids = list(ids)
+        payloads = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, payload FROM rows WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                payloads.update((row_id, json.loads(payload)) for row_id, payload in rows)
+        return payloads
+
+    def _search_hybrid(self, keywords, query_vectors, field_weights, limit, filter_type, threshold, search_filter,
+                       field_params):
+        raise ValueError("本地向量库不支持hybrid检索模式，请使用multi模式")
+
+    def delete_by_expr(self, expr):
+        """根据表达式删除数据（仅打删除标记）"""
+        try:
+            with self._lock:
+                self._ensure_open()
+                ids = self._expr_ids(expr)
+                self._alive[ids] = 0
+                for index in self._hnsw.values():
+                    for row_id in ids:
+                        try:
+                            index.mark_deleted(int(row_id))
+                        except RuntimeError:
+                            # 零向量未加入图索引
+                            pass
+                self._conn.executemany("UPDATE rows SET deleted = 1 WHERE id = ?", [(int(i),) for i in ids])
+                self._conn.commit()
+                self._flush()
+            print(f"已删除数据 {expr} ({len(ids)} 条)")
+            return True
+        except Exception as e:
+            print(f"删除数据失败: {e}")
+            return False
+
+    def rebuild_lexical_index(self, batch_size=1000):
+        if self.lexical is None:
+            return 0
+        self.lexical.clear()
+        with self._lock:
+            self._ensure_open()
+            rows = self._conn.execute("SELECT id, payload FROM rows WHERE deleted = 0 ORDER BY id").fetchall()
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            self.lexical.add_documents([row_id for row_id, _ in batch], [json.loads(payload) for _, payload in batch])
+        self.lexical.save()
+        print(f"词法索引重建完成，共 {len(rows)} 条")
+        return len(rows)
+
+    def delete_source(self, source_files):
+        self._delete_lexical(source_files)
+        return self.delete_by_expr(_in_expr("source_file", source_files))
+
+    def delete_collection(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._vectors = {}
+            self._alive = None
+            self._hnsw = {}
+            self._count = 0
+            self._capacity = 0
+            shutil.rmtree(self.path, ignore_errors=True)
+        if self.lexical is not None:
+            self.lexical.clear()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+_path_locks = {}
+
+
+def _path_lock(path):
+    with _stores_lock:
+        return _path_locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+def get_local_vector_store(collection_name, root_dir=LOCAL_VECTOR_STORE_DIR, **kwargs) -> LocalVectorStore:
+    """
+    按数据目录复用同一个LocalVectorStore实例：主键计数、内存映射和HNSW图都是实例状态，
+    多个实例同时写入同一目录会分配重复主键、互相覆盖索引文件
+    """
+    key = os.path.abspath(os.path.join(root_dir, collection_name))
+    with _stores_lock:
+        store = _stores.get(key)
+    if store is None:
+        store = LocalVectorStore(collection_name, root_dir=root_dir, **kwargs)
+        with _stores_lock:
+            store = _stores.setdefault(key, store)
+    return store
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import grpc
+from pymilvus import MilvusClient, Collection, connections, utility
+from pymilvus.client.types import LoadState
+from pymilvus.exceptions import ConnectionNotExistException, MilvusException, MilvusUnavailableException
+
+MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
+MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+MILVUS_USER = os.getenv("MILVUS_USER", "")
+MILVUS_PASSWORD = os.getenv("MILVUS_PASSWORD", "")
+MILVUS_TOKEN = os.getenv("MILVUS_TOKEN", "")
+MILVUS_ALIAS = os.getenv("MILVUS_ALIAS", "buildgen")
+
+# 这些异常说明连接已失效，需要重连后重试
+RECONNECT_ERRORS = (MilvusUnavailableException, ConnectionNotExistException, grpc.RpcError)
+
+
+class MilvusConnectionManager:
+    """
+    进程级Milvus连接管理：
+    - 每个进程只维护一个带认证的连接别名和一个MilvusClient
+    - 缓存Collection句柄并记录加载状态，只在需要时调用load()
+    - 缓存各collection的分区列表，本进程增删分区后失效
+    - 连接失效时自动重连并重试一次
+    """
+    def __init__(self, host=MILVUS_HOST, port=MILVUS_PORT, alias=MILVUS_ALIAS,
+                 user=MILVUS_USER, password=MILVUS_PASSWORD, token=MILVUS_TOKEN):
+        self.host = host
+        self.port = port
+        self.alias = alias
+        self.user = user
+        self.password = password
+        self.token = token
+        self._client = None
+        self._collections = {}
+        self._loaded = set()
+        self._partitions = {}
+        self._lock = threading.RLock()
+
+    @property
+    def uri(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _auth_kwargs(self):
+        if self.token:
+            return {"token": self.token}
+        if self.user:
+            return {"user": self.user, "password": self.password}
+        return {}
+
+    def get_client(self) -> MilvusClient:
+        with self._lock:
+            if self._client is None:
+                self._client = MilvusClient(uri=self.uri, **self._auth_kwargs())
+            return self._client
+
+    def connect(self):
+        with self._lock:
+            if not connections.has_connection(self.alias):
+                connections.connect(alias=self.alias, host=self.host, port=self.port, **self._auth_kwargs())
+
+    def get_collection(self, name, load=True) -> Collection:
+        with self._lock:
+            self.connect()
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = Collection(name=name, using=self.alias)
+                self._collections[name] = collection
+            if load and name not in self._loaded:
+                if utility.load_state(name, using=self.alias) != LoadState.Loaded:
+                    collection.load()
+                self._loaded.add(name)
+            return collection
+
+    def list_partitions(self, name, refresh=False):
+        """collection的分区名集合；refresh为True时重新从服务端读取"""
+        with self._lock:
+            if refresh or name not in self._partitions:
+                self._partitions[name] = set(self.get_client().list_partitions(name))
+            return set(self._partitions[name])
+
+    def invalidate_partitions(self, name):
+        with self._lock:
+            self._partitions.pop(name, None)
+
+    def run(self, name, operation, load=True):
+        """
+        在缓存的Collection句柄上执行operation(collection)
+        连接失效或collection被释放时重置状态并重试一次
+        """
+        try:
+            return operation(self.get_collection(name, load=load))
+        except RECONNECT_ERRORS as e:
+            print(f"Milvus连接失效，正在重连: {e}")
+            self.reset()
+        except MilvusException as e:
+            if "not loaded" not in str(e).lower():
+                raise
+            print(f"Collection '{name}' 未加载，重新加载后重试")
+            self.invalidate(name)
+        return operation(self.get_collection(name, load=load))
+
+    def invalidate(self, name=None):
+        """丢弃缓存的Collection句柄、加载状态和分区列表；name为空时清空全部"""
+        with self._lock:
+            if name is None:
+                self._collections.clear()
+                self._loaded.clear()
+                self._partitions.clear()
+            else:
+                self._collections.pop(name, None)
+                self._loaded.discard(name)
+                self._partitions.pop(name, None)
+
+    def reset(self):
+        with self._lock:
+            self.invalidate()
+            try:
+                connections.disconnect(self.alias)
+            except Exception as e:
+                print(f"断开Milvus连接失败: {e}")
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception as e:
+                    print(f"关闭MilvusClient失败: {e}")
+                self._client = None
+
+
+_connection_manager = None
+_connection_lock = threading.Lock()
+
+
+def get_milvus_connection() -> MilvusConnectionManager:
+    global _connection_manager
+    with _connection_lock:
+        if _connection_manager is None:
+            _connection_manager = MilvusConnectionManager()
+        return _connection_manager
@@ -1,76 +1,221 @@
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
-from pymilvus import MilvusClient, DataType, connections, Collection
-from sentence_transformers import SentenceTransformer
+from pymilvus import AnnSearchRequest, DataType, RRFRanker, WeightedRanker
 from src.service.keyword_generator import generate_keyword_for_query
+from src.infrastructure.embedding_cache import EmbeddingCache
+from src.infrastructure.dedup_index import DEDUP_ENABLED, get_dedup_index
+from src.infrastructure.embedding_batcher import EmbeddingBatcher
+from src.infrastructure.milvus_connection import get_milvus_connection
+from src.infrastructure.search_fanout import SearchDeadlineExceeded, get_search_fanout
+from src.infrastructure.score_fusion import FUSION_STRATEGY, ScoreFusion
+from src.infrastructure.lexical_index import (
+    LEXICAL_INDEX_ENABLED, LEXICAL_TEXT_FIELDS, get_lexical_index, structured_tokens
+)
+from src.infrastructure.index_profiles import (
+    build_search_param, get_index_profile, resolve_field_profiles
+)
+from src.infrastructure.embedding_registry import (
+    EMBEDDING_MODEL_PATH, EMBEDDING_DEVICE, EMBEDDING_BACKEND, get_embedding_model
+)
 
 DEFAULT_QWEN_DIM = 1024
-MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
-
-
-def _deduplicate_and_rank_results(results, limit):
-    content_map = {}
-    for r in results:
-        key = r["content"]
-        if key not in content_map or r["score"] > content_map[key]["score"]:
-            content_map[key] = r
-    return sorted(content_map.values(), key=lambda x: x["score"], reverse=True)[:limit]
-
-def _deduplicate_by_id_and_rank_results(results):
-    "按照id去重并排序结"
-    id_map = {}
-    for r in results:
-        key = r["id"]
-        if key not in id_map or r["score"] < id_map[key]["score"]:
-            id_map[key] = r
-    return sorted(id_map.values(), key=lambda x: x["score"])
-
-def get_topN_data_for_keyword(top_n,results):
-    """
-    按matched_keyword分组，对每个关键词对应的数据取top数据
-    Args:
-        results: 搜索结果列表
-        top_n: 每个关键词组取的top数量
-    Returns:
-        按关键词分组后取top的结果列表
-    """
-    # 按matched_keyword分组
-    keyword_groups = {}
-    for result in results:
-        keyword = result.get('matched_keyword', '')
-        if keyword not in keyword_groups:
-            keyword_groups[keyword] = []
-        keyword_groups[keyword].append(result)
-    # 对每个关键词组取top_n数据
-    final_results = []
-    for keyword, group_results in keyword_groups.items():
-        # 按score排序（score越小越好）
-        sorted_group = sorted(group_results, key=lambda x: x.get('score', float('inf')))
-        # 取每个关键词的top_n结果
-        final_results.extend(sorted_group[:top_n])
-
-    # 最终结果按score排序
-    return sorted(final_results, key=lambda x: x.get('score', float('inf')))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1"
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "64"))
+# 向量存储模式：维度小于模型输出时按Matryoshka方式截断并重新归一化；dtype可选float32/float16
+# 仅在创建collection时生效，已有collection需保持与建表时一致
+VECTOR_STORAGE_DIM = int(os.getenv("VECTOR_STORAGE_DIM", str(DEFAULT_QWEN_DIM)))
+VECTOR_STORAGE_DTYPE = os.getenv("VECTOR_STORAGE_DTYPE", "float32")
+VECTOR_DATA_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+}
+
+# 各向量字段的检索权重
+FIELD_WEIGHTS = {
+    "tags_vector": 1.8,
+    "question1_vector": 1.2,
+    "question2_vector": 1.0,
+    "content_vector": 1.5,
+}
+SEARCH_OUTPUT_FIELDS = [
+    "content", "title", "section", "tags",
+    "question1", "question2", "source_file",
+    "text_role"
+]
+# multi: 逐关键词逐字段并发检索后在本地合并；hybrid: Milvus原生hybrid_search服务端融合
+MILVUS_SEARCH_MODE = os.getenv("MILVUS_SEARCH_MODE", "multi")
+# 分区方式：none 不分区；source 按source_file哈希分到MILVUS_SOURCE_PARTITIONS个显式分区，按来源过滤时只检索对应分区；
+# key 以source_file作为partition key，由Milvus按过滤条件自动裁剪分区。仅在创建collection时生效
+MILVUS_PARTITION_MODE = os.getenv("MILVUS_PARTITION_MODE", "none")
+# source分区模式的分区数，需小于Milvus的分区数上限（默认1024），来源文件再多也不会超出
+MILVUS_SOURCE_PARTITIONS = int(os.getenv("MILVUS_SOURCE_PARTITIONS", "64"))
+# 两阶段检索：ANN阶段只返回id和距离，去重排序后再一次性按id取回最终结果的payload
+TWO_PHASE_RETRIEVAL = os.getenv("TWO_PHASE_RETRIEVAL", "1") == "1"
+HYDRATE_BATCH_SIZE = 1000
+# hybrid模式下的融合方式：weighted 按字段权重加权；rrf 倒数排名融合
+HYBRID_RANKER = os.getenv("MILVUS_HYBRID_RANKER", "weighted")
+# 阈值模式使用范围检索，每页返回的条数；Milvus要求 offset + limit 不超过16384
+RANGE_SEARCH_PAGE_SIZE = int(os.getenv("RANGE_SEARCH_PAGE_SIZE", "100"))
+RANGE_SEARCH_MAX_HITS = 16384
+# 大于0时融合前每个关键词只保留前N个结果，避免宽泛的扩展关键词挤占结果
+FUSION_PER_KEYWORD_TOP_N = int(os.getenv("SEARCH_FUSION_PER_KEYWORD_TOP_N", "0"))
+# 词法(BM25)检索结果参与融合时的权重，其分数按每个关键词的最高分归一化到(0, 1]
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "1.0"))
+# 查询含标准编号/条文编号且词法索引已有命中时跳过LLM关键词扩展
+LEXICAL_SKIP_EXPANSION = os.getenv("LEXICAL_SKIP_EXPANSION", "1") == "1"
+# 关键词扩展（LLM调用）在独立线程池中执行，渐进式检索可在等待扩展时先用原始查询检索
+KEYWORD_EXPANSION_WORKERS = int(os.getenv("KEYWORD_EXPANSION_WORKERS", "8"))
+_expansion_executor = ThreadPoolExecutor(max_workers=KEYWORD_EXPANSION_WORKERS, thread_name_prefix="keyword-expansion")
+
+# 需要向量化的文本字段，对应的向量字段为 f"{field}_vector"
+EMBEDDING_TEXT_FIELDS = ["content", "question1", "question2", "tags"]
+
+
+def _payload_fields(get):
+    """从hit实体或query结果行中提取返回给前端的文本字段"""
+    return {
+        "content": get("content"),
+        "title": get("title"),
+        "section": get("section"),
+        "tag": get("tags"),
+        "question1": get("question1"),
+        "question2": get("question2"),
+        "source_file": get("source_file"),
+        "text_role": get("text_role")
+    }
 
+def _partition_name(source_file):
+    """source_file按哈希分到MILVUS_SOURCE_PARTITIONS个分区之一，分区名只允许字母数字下划线"""
+    bucket = int(hashlib.md5(source_file.encode("utf-8")).hexdigest(), 16) % MILVUS_SOURCE_PARTITIONS
+    return f"src_bucket_{bucket:04d}"
+
+def _legacy_partition_name(source_file):
+    """早期每个source_file一个分区时的分区名，检索和删除时兼容这些分区中已有的数据"""
+    return "src_" + hashlib.md5(source_file.encode("utf-8")).hexdigest()[:16]
+
+def _in_expr(field, values):
+    return f"{field} in {json.dumps(list(values), ensure_ascii=False)}"
+
+def _hit_to_result(hit, field, score, keyword):
+    return {
+        "id": hit.id,
+        **_payload_fields(hit.entity.get),
+        "field": field,
+        "page_num": 5,
+        "score": score,
+        "matched_keyword": keyword  # 记录匹配的关键词
+    }
 
 class EmbeddingModelWrapper:
-    def __init__(self, model_name="./models/Qwen3-Embedding-0.6B", device="cpu", dim=DEFAULT_QWEN_DIM):
-        self.model = SentenceTransformer(model_name, device=device)
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, dim=DEFAULT_QWEN_DIM,
+                 batch_size=EMBEDDING_BATCH_SIZE, use_cache=EMBEDDING_CACHE_ENABLED, backend=EMBEDDING_BACKEND):
+        self.model = get_embedding_model(model_name, device, backend)
         self.dim = dim
+        self.batch_size = batch_size
+        self.backend = backend
+        # 量化后端的向量与fp32存在细微差异，缓存键需区分后端
+        self.cache = EmbeddingCache(f"{model_name}#{backend}", dim) if use_cache else None
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE, dim=DEFAULT_QWEN_DIM,
+               backend=EMBEDDING_BACKEND):
+        """按(模型, 设备, 维度, 后端)复用同一个实例，模型和缓存连接在进程内只创建一次"""
+        key = (model_name, device, dim, backend)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(model_name=model_name, device=device, dim=dim, backend=backend)
+            return cls._shared[key]
 
     def encode(self, text, label=None):
         if label:
             print(f"Encoding: {label} ...")
-        return self.model.encode([text])[0] if text else [0.0] * self.dim
+        return self.encode_batch([text])[0]
+
+    def encode_queries(self, texts):
+        """
+        在线查询编码：经由微批编码器与其他在途请求合并前向计算
+        """
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = EmbeddingBatcher(self)
+        return self._batcher.encode(texts)
+
+    def encode_batch(self, texts, batch_size=None):
+        """
+        批量编码文本，返回与texts一一对应的向量列表
+        空文本直接返回零向量；非空文本按长度排序后分批前向，减少padding浪费
+        """
+        batch_size = batch_size or self.batch_size
+        vectors = [None] * len(texts)
+        pending = [i for i, text in enumerate(texts) if text]
+
+        if self.cache and pending:
+            cached = self.cache.get_many([texts[i] for i in pending])
+            for j, vector in cached.items():
+                vectors[pending[j]] = vector
+            pending = [i for i in pending if vectors[i] is None]
+
+        order = sorted(pending, key=lambda i: len(texts[i]), reverse=True)
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            embeddings = self._truncate(self.model.encode([texts[i] for i in batch_idx], batch_size=len(batch_idx)))
+            for i, embedding in zip(batch_idx, embeddings):
+                vectors[i] = embedding
+            if self.cache:
+                self.cache.put_many([texts[i] for i in batch_idx], embeddings)
+
+        zero_vector = [0.0] * self.dim
+        return [vector if vector is not None else zero_vector for vector in vectors]
+
+    def _truncate(self, embeddings):
+        """模型输出维度大于dim时截取前dim维并重新归一化（Matryoshka表示）"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.shape[1] <= self.dim:
+            return embeddings
+        embeddings = embeddings[:, :self.dim]
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
 
 
 class MilvusDbManager:
-    def __init__(self, collection_name, dim=DEFAULT_QWEN_DIM):
+    def __init__(self, collection_name, dim=VECTOR_STORAGE_DIM, vector_dtype=VECTOR_STORAGE_DTYPE):
+        if vector_dtype not in VECTOR_DATA_TYPES:
+            raise ValueError(f"不支持的向量存储类型: {vector_dtype}")
         self.collection_name = collection_name
         self.dim = dim
-        self.client = MilvusClient(uri=f"http://{MILVUS_HOST}:19530")
-        self.encoder = EmbeddingModelWrapper(dim=dim)
+        self.vector_dtype = vector_dtype
+        self.connection = get_milvus_connection()
+        self.search_mode = MILVUS_SEARCH_MODE
+        self.fanout = get_search_fanout()
+        self.two_phase = TWO_PHASE_RETRIEVAL
+        self.partition_mode = MILVUS_PARTITION_MODE
+        self.fusion_strategy = FUSION_STRATEGY
+        self.per_keyword_top_n = FUSION_PER_KEYWORD_TOP_N
+        self.lexical = get_lexical_index(collection_name) if LEXICAL_INDEX_ENABLED else None
+        # 各向量字段的索引配置，建表与查询参数均由此决定
+        self.field_index_profiles = resolve_field_profiles([f"{field}_vector" for field in EMBEDDING_TEXT_FIELDS])
+        self.encoder = EmbeddingModelWrapper.shared(dim=dim)
+
+    @property
+    def client(self):
+        return self.connection.get_client()
 
     def initialize(self):
         if self.client.has_collection(self.collection_name):
@@ -93,20 +238,25 @@ class MilvusDbManager:
         self.schema.add_field("question2", DataType.VARCHAR, max_length=65535)
         self.schema.add_field("tags", DataType.VARCHAR, max_length=256)
         self.schema.add_field("year", DataType.VARCHAR, max_length=256)
-        self.schema.add_field("source_file", DataType.VARCHAR, max_length=256)
+        self.schema.add_field("source_file", DataType.VARCHAR, max_length=256,
+                              is_partition_key=self.partition_mode == "key")
         self.schema.add_field("text_role", DataType.VARCHAR, max_length=256)
         self.schema.add_field("is_material_chunk", DataType.BOOL)
 
-        self.schema.add_field("content_vector", DataType.FLOAT_VECTOR, dim=self.dim)
-        self.schema.add_field("question1_vector", DataType.FLOAT_VECTOR, dim=self.dim)
-        self.schema.add_field("question2_vector", DataType.FLOAT_VECTOR, dim=self.dim)
-        self.schema.add_field("tags_vector", DataType.FLOAT_VECTOR, dim=self.dim)
+        vector_type = VECTOR_DATA_TYPES[self.vector_dtype]
+        self.schema.add_field("content_vector", vector_type, dim=self.dim)
+        self.schema.add_field("question1_vector", vector_type, dim=self.dim)
+        self.schema.add_field("question2_vector", vector_type, dim=self.dim)
+        self.schema.add_field("tags_vector", vector_type, dim=self.dim)
 
     def _prepare_index_params(self):
         self.index_params = self.client.prepare_index_params()
         self.index_params.add_index("id", index_type="STL_SORT")
-        for field in ["question1_vector", "question2_vector", "content_vector", "tags_vector"]:
-            self.index_params.add_index(field, index_type="HNSW", metric_type="COSINE", params={"M": 16, "efConstruction": 100})
+        for field, profile_name in self.field_index_profiles.items():
+            profile = get_index_profile(profile_name)
+            self.index_params.add_index(
+                field, index_type=profile["index_type"], metric_type="COSINE", params=dict(profile["build"])
+            )
 
     def _create_collection(self):
         self.client.create_collection(
@@ -114,243 +264,620 @@ class MilvusDbManager:
             schema=self.schema,
             index_params=self.index_params
         )
+        self.connection.invalidate(self.collection_name)
 
     def encode_fields(self, chunk: dict) -> dict:
-        return {
-            "content_vector": self.encoder.encode(chunk.get("content"), "content"),
-            "question1_vector": self.encoder.encode(chunk.get("question1"), "question1"),
-            "question2_vector": self.encoder.encode(chunk.get("question2"), "question2"),
-            "tags_vector": self.encoder.encode(chunk.get("tags"), "tags"),
-        }
+        return self.encode_fields_batch([chunk])[0]
+
+    def encode_fields_batch(self, chunks: list, batch_size=None) -> list:
+        """
+        一次性收集所有chunk的各字段文本并批量编码，再按(chunk, 字段)映射回向量
+        """
+        texts = [chunk.get(field) for chunk in chunks for field in EMBEDDING_TEXT_FIELDS]
+        print(f"Encoding {len(chunks)} chunks ({len(texts)} texts) ...")
+        vectors = self.encoder.encode_batch(texts, batch_size=batch_size)
+
+        n_fields = len(EMBEDDING_TEXT_FIELDS)
+        return [
+            {
+                f"{field}_vector": self._to_storage(vectors[i * n_fields + j])
+                for j, field in enumerate(EMBEDDING_TEXT_FIELDS)
+            }
+            for i in range(len(chunks))
+        ]
+
+    def _to_storage(self, vector):
+        """转换为collection向量字段对应的数据类型（float16字段需要np.float16数组）"""
+        if self.vector_dtype == "float16":
+            return np.asarray(vector, dtype=np.float16)
+        return vector
+
+    def _encode_queries(self, keywords):
+        return [self._to_storage(vector) for vector in self.encoder.encode_queries(keywords)]
 
     def build_insert_data(self, chunk: dict) -> dict:
-        vectors = self.encode_fields(chunk)
-        return {
-            **chunk,
-            **vectors
-        }
+        return self.build_insert_data_batch([chunk])[0]
+
+    def build_insert_data_batch(self, chunks: list, batch_size=None) -> list:
+        vectors_list = self.encode_fields_batch(chunks, batch_size=batch_size)
+        return [
+            {
+                **chunk,
+                **vectors
+            }
+            for chunk, vectors in zip(chunks, vectors_list)
+        ]
 
-    def insert_chunk(self, chunk: dict):
+    def insert_chunk(self, chunk: dict) -> list:
+        """写入单个chunk并同步更新词法索引，返回主键；批量写入请使用bulk_insert"""
         print(f"Inserting chunk: {chunk.get('title', '')}")
         data = [self.build_insert_data(chunk)]
-        self.client.insert(collection_name=self.collection_name, data=data)
+        ids = self._insert_rows(data)
+        self._add_lexical(ids, [chunk])
+        return ids
+
+    def _insert_rows(self, rows: list) -> list:
+        """写入一批行并返回主键；source分区模式下按source_file所在分区分组写入"""
+        if self.partition_mode != "source":
+            return list(self.client.insert(collection_name=self.collection_name, data=rows)["ids"])
+
+        # 按分区分组写入，返回的主键按输入行的顺序重排，调用方依赖主键与行一一对应
+        groups = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(_partition_name(row.get("source_file", "")), []).append(i)
+        ids = [None] * len(rows)
+        for partition_name, positions in groups.items():
+            self._ensure_partition(partition_name)
+            result = self.client.insert(
+                collection_name=self.collection_name, data=[rows[i] for i in positions], partition_name=partition_name
+            )
+            for i, chunk_id in zip(positions, result["ids"]):
+                ids[i] = chunk_id
+        return ids
 
-    def search(self, query_text, model_name=None,limit=10):
-        # 首先使用关键词扩展
-        try:
-            expanded_keywords = generate_keyword_for_query(model_name,query=query_text)
-            print(f"关键词扩展结果 {expanded_keywords}")
-        except Exception as e:
-            print(f"关键词扩展失败，使用原始查询: {e}")
-            expanded_keywords = {}
-        
-        # 收集所有扩展的关键�?
+    def _flush(self):
+        self.client.flush(collection_name=self.collection_name)
+
+    def _ensure_partition(self, partition_name):
+        if partition_name in self.connection.list_partitions(self.collection_name):
+            return
+        if not self.client.has_partition(self.collection_name, partition_name):
+            self.client.create_partition(self.collection_name, partition_name)
+            print(f"Created partition {partition_name}")
+        self.connection.invalidate_partitions(self.collection_name)
+
+    def _source_partitions(self, source_files):
+        """
+        来源文件所在的已存在分区（含早期每个来源一个分区的旧分区）
+        分区列表按collection缓存，有来源文件的分区不在缓存中时重新读取一次，以发现其他进程新建的分区
+        """
+        buckets = {_partition_name(source_file) for source_file in source_files}
+        legacy = {_legacy_partition_name(source_file) for source_file in source_files}
+        existing = self.connection.list_partitions(self.collection_name)
+        if not buckets <= existing:
+            existing = self.connection.list_partitions(self.collection_name, refresh=True)
+        return sorted((buckets | legacy) & existing)
+
+    def bulk_insert(self, chunks: list, batch_size=BULK_INSERT_BATCH_SIZE) -> dict:
+        """
+        分批编码并批量写入：后台线程写入当前批的同时编码下一批，全部写完后只flush一次
+        返回写入条数、主键列表与吞吐统计
+        """
+        start = time.time()
+        ids = []
+        pending = None
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for offset in range(0, len(chunks), batch_size):
+                rows = self.build_insert_data_batch(chunks[offset:offset + batch_size])
+                if pending is not None:
+                    ids.extend(pending.result())
+                print(f"Inserting chunks {offset + 1}-{offset + len(rows)}/{len(chunks)}")
+                pending = executor.submit(self._insert_rows, rows)
+            if pending is not None:
+                ids.extend(pending.result())
+
+        self._flush()
+        self._add_lexical(ids, chunks)
+
+        elapsed = time.time() - start
+        rows_per_second = len(ids) / elapsed if elapsed > 0 else 0.0
+        print(f"Bulk inserted {len(ids)} rows in {elapsed:.1f}s ({rows_per_second:.1f} rows/s)")
+        return {
+            "inserted": len(ids),
+            "ids": list(ids),
+            "seconds": elapsed,
+            "rows_per_second": rows_per_second,
+        }
+
+    def _ann_search(self, anns_field, data, limit, output_fields, param=None, expr=None, partition_names=None):
+        """在缓存的Collection句柄上执行一次ANN检索"""
+        param = param or self._search_param(anns_field)
+        return self.connection.run(
+            self.collection_name,
+            lambda collection: collection.search(
+                data=data, anns_field=anns_field, param=param,
+                limit=limit, output_fields=output_fields,
+                expr=expr, partition_names=partition_names
+            )
+        )
+
+    def _range_search(self, anns_field, data, radius, page_size, output_fields, param=None, expr=None,
+                      partition_names=None):
+        """
+        范围检索：只返回相似度大于radius的结果，不受单页条数截断；
+        某个查询向量的结果满一页时只对该查询继续翻页
+        """
+        param = param or self._search_param(anns_field)
+        results = [[] for _ in data]
+        pending = list(range(len(data)))
+        offset = 0
+        while pending and offset < RANGE_SEARCH_MAX_HITS:
+            limit = min(page_size, RANGE_SEARCH_MAX_HITS - offset)
+            page_param = {**param, "offset": offset, "params": {**param["params"], "radius": radius}}
+            raw = self._ann_search(
+                anns_field, [data[i] for i in pending], limit, output_fields, param=page_param,
+                expr=expr, partition_names=partition_names
+            )
+            next_pending = []
+            for i, hits in zip(pending, raw):
+                results[i].extend(hits)
+                if len(hits) == limit:
+                    next_pending.append(i)
+            pending = next_pending
+            offset += limit
+        return results
+
+    def _search_param(self, field, search_profile=None):
+        """
+        字段的查询参数；search_profile可按请求指定同类索引的另一组查询参数（如hnsw_fast/hnsw_accurate）
+        """
+        field_profile = self.field_index_profiles[field]
+        if not search_profile:
+            return build_search_param(field_profile)
+        if get_index_profile(search_profile)["index_type"] != get_index_profile(field_profile)["index_type"]:
+            raise ValueError(f"字段 {field} 的索引为 {field_profile}，不能使用查询配置 {search_profile}")
+        return build_search_param(search_profile)
+
+    def _linked_duplicates(self, source_files=None, years=None):
+        """
+        近似重复chunk入库时不写入，只链接到其他来源的规范chunk；按来源文件/年份过滤时，
+        满足条件的来源所链接的规范chunk同样应被检索到。返回 {规范chunk主键: 规范chunk的来源文件}
+        """
+        if not DEDUP_ENABLED:
+            return {}
+        return get_dedup_index(self.collection_name).linked(source_files, years)
+
+    def _build_search_filter(self, source_files=None, years=None):
+        """
+        根据来源文件/年份构造 _ann_search 的过滤参数
+        source分区模式下只检索来源文件所在的分区，返回None表示没有可检索的分区；
+        一个分区包含多个来源文件，仍需按source_file过滤。key分区模式下Milvus会根据该条件自动裁剪分区
+        满足条件的来源链接到的近似重复规范chunk按主键并入过滤条件，其所在分区一并检索
+        """
+        search_filter = {}
+        exprs = []
+        linked = self._linked_duplicates(source_files, years)
+        if source_files:
+            if self.partition_mode == "source":
+                partition_names = self._source_partitions(set(source_files) | set(linked.values()))
+                if not partition_names:
+                    return None
+                search_filter["partition_names"] = partition_names
+            exprs.append(_in_expr("source_file", source_files))
+        if years:
+            exprs.append(_in_expr("year", [str(year) for year in years]))
+        if exprs:
+            search_filter["expr"] = " and ".join(exprs)
+        if linked:
+            search_filter["expr"] = f"({search_filter['expr']}) or {_in_expr('id', sorted(linked))}"
+        return search_filter
+
+    def search(self, query_text, model_name=None, limit=10, search_mode=None, source_files=None, years=None,
+               search_profile=None, top_k=None):
+        """返回 (结果, 是否完整)，见 _search_keywords"""
+        # 首先使用关键词扩展；精确编号类查询由词法检索直接命中，不再调用LLM
+        all_keywords = self._expanded_keywords(
+            query_text, self._start_expansion(query_text, model_name, source_files, years)
+        )
+        print(f"总共查询关键词数量 {len(all_keywords)}")
+
+        return self._search_keywords(
+            all_keywords, FIELD_WEIGHTS, limit,
+            search_mode=search_mode, source_files=source_files, years=years, search_profile=search_profile,
+            top_k=top_k
+        )
+
+    def search_progressive(self, query_text, model_name=None, limit=10, search_mode=None, source_files=None,
+                           years=None, search_profile=None, top_k=None):
+        """
+        渐进式检索：关键词扩展在后台进行，同时先用原始查询检索
+        依次产出 (阶段, 结果, 是否完整)：initial 原始查询的结果；expanded 加入扩展关键词后的结果，与search的结果一致
+        无需扩展或扩展失败时只产出initial
+        """
+        expansion = self._start_expansion(query_text, model_name, source_files, years)
+        search_mode = search_mode or self.search_mode
+        if search_mode != "multi":
+            # hybrid模式由服务端融合，扩展关键词到达后整体重新检索
+            yield ("initial",) + self._search_keywords(
+                [query_text], FIELD_WEIGHTS, limit,
+                search_mode=search_mode, source_files=source_files, years=years, search_profile=search_profile,
+                top_k=top_k
+            )
+            all_keywords = self._expanded_keywords(query_text, expansion)
+            if len(all_keywords) > 1:
+                yield ("expanded",) + self._search_keywords(
+                    all_keywords, FIELD_WEIGHTS, limit,
+                    search_mode=search_mode, source_files=source_files, years=years, search_profile=search_profile,
+                    top_k=top_k
+                )
+            return
+
+        search_filter = self._build_search_filter(source_files, years)
+        if search_filter is None:
+            yield "initial", [], True
+            return
+        field_params = {field: self._search_param(field, search_profile) for field in FIELD_WEIGHTS}
+        # 原始查询与扩展关键词的命中进入同一个融合器，扩展阶段只检索新增的关键词
+        fusion = self._new_fusion(FIELD_WEIGHTS, 'topN', [query_text])
+        search_into = partial(
+            self._search_into, fusion, field_weights=FIELD_WEIGHTS, limit=limit, filter_type='topN', threshold=None,
+            search_filter=search_filter, field_params=field_params, source_files=source_files, years=years
+        )
+        per_keyword_top_n = self._per_keyword_limit('topN', limit)
+        complete = search_into([query_text])
+        results = self._hydrate(self._fused_results(fusion, top_k=top_k, per_keyword_top_n=per_keyword_top_n))
+        yield "initial", results, complete
+
+        all_keywords = self._expanded_keywords(query_text, expansion)
+        if len(all_keywords) > 1:
+            print(f"总共查询关键词数量 {len(all_keywords)}")
+            complete = search_into(all_keywords[1:]) and complete
+            results = self._hydrate(self._fused_results(fusion, top_k=top_k, per_keyword_top_n=per_keyword_top_n))
+            yield "expanded", results, complete
+
+    def _start_expansion(self, query_text, model_name, source_files=None, years=None):
+        """在后台线程中开始关键词扩展，返回Future；无需扩展时返回None"""
+        if self._lexical_covers(query_text, source_files, years):
+            print("查询包含标准/条文编号且词法索引已命中，跳过关键词扩展")
+            return None
+        return _expansion_executor.submit(generate_keyword_for_query, model_name, query=query_text)
+
+    @staticmethod
+    def _expanded_keywords(query_text, expansion):
+        """等待关键词扩展完成，返回 [原始查询, 扩展关键词...]；扩展失败时只返回原始查询"""
+        expanded_keywords = {}
+        if expansion is not None:
+            try:
+                expanded_keywords = expansion.result()
+                print(f"关键词扩展结果 {expanded_keywords}")
+            except Exception as e:
+                print(f"关键词扩展失败，使用原始查询: {e}")
+
+        # 收集所有扩展的关键词
         all_keywords = [query_text]  # 包含原始查询
-        
-        if expanded_keywords:
+        if isinstance(expanded_keywords, dict):
             for keyword_type, keywords in expanded_keywords.items():
                 if isinstance(keywords, list):
                     all_keywords.extend(keywords)
-        
-        print(f"总共查询关键词数量 {len(all_keywords)}")
-        
-        connections.connect(host=MILVUS_HOST)
-        Collection(name=self.collection_name).load()
-        
-        all_results = []
-        # 在search方法中修改output_fields
-        output_fields = [
-            "content", "title", "section", "tags",
-            "question1", "question2", "source_file",
-            "text_role"  # 添加text_role字段
-        ]
-        
-        # 遍历所有关键词进行查询
-        for keyword in all_keywords:
-            if not keyword or not keyword.strip():
-                continue
-                
-            query_vector = self.encoder.encode(keyword, label=f"keyword: {keyword}")
-            
-            for field, weight in zip([
-                "tags_vector",
-                "question1_vector", "question2_vector",
-                "content_vector"
-            ], [1.8, 1.2, 1.0, 1.5]):
-                raw = Collection(self.collection_name).search(
-                    data=[query_vector], anns_field=field,
-                    param={"metric_type": "COSINE", "params": {"ef": 128}},
-                    limit=limit, output_fields=output_fields
-                )
-                for hits in raw:
-                    for hit in hits:
-                        all_results.append({
-                            "id": hit.entity.get("id"),
-                            "content": hit.entity.get("content"),
-                            "title": hit.entity.get("title"),
-                            "section": hit.entity.get("section"),
-                            "tag": hit.entity.get("tags"),
-                            "question1": hit.entity.get("question1"),
-                            "question2": hit.entity.get("question2"),
-                            "source_file": hit.entity.get("source_file"),
-                            "field": field,
-                            "page_num": 5,
-                            "score": hit.distance * weight,
-                            "matched_keyword": keyword,
-                            "text_role": hit.entity.get("text_role") # 记录匹配的关键词
-                        })
-        
-        # 按照id去重并排序
-        return _deduplicate_by_id_and_rank_results(all_results)
+        return all_keywords
     
-    def search_by_keywords_tags_only(self, keywords, filter_type='topN', top_n=10, threshold=0.7):
-        """基于关键词列表进行检索，只使用tags_vector进行匹配"""
-        connections.connect(host=MILVUS_HOST)
-        Collection(name=self.collection_name).load()
-        
-        all_results = []
-        output_fields = [
-            "content", "title", "section", "tags",
-            "question1", "question2", "source_file",
-            "text_role"
-        ]
-        
-        # 设置搜索限制
-        limit = top_n if filter_type == 'topN' else 100
-        
-        # 遍历所有关键词，只在tags_vector中搜索
-        for keyword in keywords:
-            if not keyword or not keyword.strip():
-                continue
-            query_vector = self.encoder.encode(keyword, label=f"keyword: {keyword}")
-            
-            # 只在tags_vector中搜索，权重设为1.0
-            raw = Collection(self.collection_name).search(
-                data=[query_vector], anns_field="tags_vector",
-                param={"metric_type": "COSINE", "params": {"ef": 128}},
-                limit=limit, output_fields=output_fields
-            )
-            
-            for hits in raw:
-                for hit in hits:
-                    # 应用阈值筛选
-                    if filter_type == 'threshold' and hit.distance > threshold:
-                        continue
-                        
-                    all_results.append({
-                        "id": hit.entity.get("id"),
-                        "content": hit.entity.get("content"),
-                        "title": hit.entity.get("title"),
-                        "section": hit.entity.get("section"),
-                        "tag": hit.entity.get("tags"),
-                        "question1": hit.entity.get("question1"),
-                        "question2": hit.entity.get("question2"),
-                        "source_file": hit.entity.get("source_file"),
-                        "field": "tags_vector",
-                        "page_num": 5,
-                        "score": hit.distance,
-                        "matched_keyword": keyword,
-                        "text_role": hit.entity.get("text_role")
-                    })
-        
-        # 按照id去重并排序
-        deduplicated_results = _deduplicate_by_id_and_rank_results(all_results)
-            
-        return deduplicated_results
+    def _lexical_covers(self, query_text, source_files=None, years=None):
+        if self.lexical is None or not LEXICAL_SKIP_EXPANSION:
+            return False
+        tokens = structured_tokens(query_text.lower())
+        linked = self._linked_duplicates(source_files, years)
+        return bool(tokens) and bool(self.lexical.search(" ".join(tokens), 1, source_files, years, linked))
+
+    def search_by_keywords_tags_only(self, keywords, filter_type='topN', top_n=10, threshold=0.7, search_mode=None,
+                                     source_files=None, years=None, search_profile=None, top_k=None):
+        """基于关键词列表进行检索，只使用tags_vector进行匹配；返回 (结果, 是否完整)"""
+        # 设置搜索限制，阈值模式下为范围检索的每页条数
+        limit = top_n if filter_type == 'topN' else RANGE_SEARCH_PAGE_SIZE
+
+        # 只在tags_vector中搜索，权重设为1.0；词法检索覆盖正文等字段，不参与
+        return self._search_keywords(
+            keywords, {"tags_vector": 1.0}, limit,
+            filter_type=filter_type, threshold=threshold, search_mode=search_mode,
+            source_files=source_files, years=years, search_profile=search_profile, use_lexical=False, top_k=top_k
+        )
 
-    def search_with_keywords(self, query, keywords, filter_type='topN', top_n=10, threshold=0.7):
+    def search_with_keywords(self, query, keywords, filter_type='topN', top_n=10, threshold=0.7, search_mode=None,
+                             source_files=None, years=None, search_profile=None, top_k=None):
         """
         混合检索：结合查询文本和指定关键词进行搜索
         参考search方法的实现逻辑，使用关键词扩展和多字段权重搜索
+        单个关键词检索失败时跳过，返回 (结果, 是否完整)
         """
         # 收集所有扩展的关键词
-        all_keywords = [query]
-
-        for keyword in keywords:
-            if not keyword or not keyword.strip():
-                continue
-            all_keywords.append(keyword)
-        
+        all_keywords = [query] + list(keywords)
         print(f"总共查询关键词数量 {len(all_keywords)}")
         
-        connections.connect(host=MILVUS_HOST)
-        Collection(name=self.collection_name).load()
-        
-        all_results = []
-        # 在search方法中修改output_fields
-        output_fields = [
-            "content", "title", "section", "tags",
-            "question1", "question2", "source_file",
-            "text_role"  # 添加text_role字段
-        ]
-        
-        # 设置搜索限制
-        limit = top_n if filter_type == 'topN' else 100
-        
-        # 遍历所有关键词进行查询
-        for keyword in all_keywords:
-            if not keyword or not keyword.strip():
-                continue
-                
-            query_vector = self.encoder.encode(keyword, label=f"keyword: {keyword}")
-            
-            for field, weight in zip([
-                "tags_vector",
-                "question1_vector", "question2_vector",
-                "content_vector"
-            ], [1.8, 1.2, 1.0, 1.5]):
-                try:
-                    raw = Collection(self.collection_name).search(
-                        data=[query_vector], anns_field=field,
-                        param={"metric_type": "COSINE", "params": {"ef": 128}},
-                        limit=limit, output_fields=output_fields
-                    )
-                    for hits in raw:
-                        for hit in hits:
-                            # 应用阈值筛选
-                            if filter_type == 'threshold' and hit.distance * weight > threshold:
-                                continue
-                                
-                            all_results.append({
-                                "id": hit.entity.get("id"),
-                                "content": hit.entity.get("content"),
-                                "title": hit.entity.get("title"),
-                                "section": hit.entity.get("section"),
-                                "tag": hit.entity.get("tags"),
-                                "question1": hit.entity.get("question1"),
-                                "question2": hit.entity.get("question2"),
-                                "source_file": hit.entity.get("source_file"),
-                                "field": field,
-                                "page_num": 5,
-                                "score": hit.distance * weight,
-                                "matched_keyword": keyword,
-                                "text_role": hit.entity.get("text_role")  # 记录匹配的关键词
-                            })
-                except Exception as e:
-                    print(f"在字段 {field} 中搜索关键词 '{keyword}' 失败: {e}")
+        # 设置搜索限制，阈值模式下为范围检索的每页条数
+        limit = top_n if filter_type == 'topN' else RANGE_SEARCH_PAGE_SIZE
+
+        return self._search_keywords(
+            all_keywords, FIELD_WEIGHTS, limit,
+            filter_type=filter_type, threshold=threshold, search_mode=search_mode, ignore_errors=True,
+            source_files=source_files, years=years, search_profile=search_profile, top_k=top_k
+        )
+
+    def _search_keywords(self, keywords, field_weights, limit, filter_type='topN', threshold=0.7,
+                         search_mode=None, ignore_errors=False, source_files=None, years=None, search_profile=None,
+                         use_lexical=True, top_k=None):
+        """
+        对关键词列表在指定字段上检索并按id去重排序，返回 (结果, 是否完整)
+        有检索超过截止时间被放弃、或在ignore_errors时失败被跳过，结果不完整，调用方不应缓存
+        search_mode: multi 逐关键词逐字段并发检索；hybrid 使用原生多向量混合检索，一次请求携带全部关键词向量
+        source_files/years: 只检索指定来源文件/年份的数据
+        search_profile: 按请求指定的查询参数配置，见 index_profiles.INDEX_PROFILES
+        use_lexical: topN模式下是否融合BM25词法检索结果（词法索引覆盖title/section/tags/content）
+        top_k: 融合后最多返回的结果数（如重排的候选数），None表示不截断
+        threshold模式：加权分数（相似度*字段权重）不低于threshold的结果，下推为各字段 radius=threshold/权重 的范围检索
+        """
+        search_filter = self._build_search_filter(source_files, years)
+        if search_filter is None:
+            return [], True
+        field_params = {field: self._search_param(field, search_profile) for field in field_weights}
+
+        keywords = [keyword for keyword in keywords if keyword and keyword.strip()]
+
+        search_mode = search_mode or self.search_mode
+        if search_mode == "hybrid":
+            # 服务端对每个关键词返回前limit个结果，融合后即为各关键词前N个结果的并集
+            results = self._search_hybrid(
+                keywords, self._encode_queries(keywords), field_weights, limit, filter_type, threshold,
+                search_filter, field_params
+            )
+            return self._hydrate(results[:top_k]), True
+        if search_mode != "multi":
+            raise ValueError(f"不支持的检索模式: {search_mode}")
+
+        fusion = self._new_fusion(field_weights, filter_type, keywords, use_lexical)
+        complete = self._search_into(
+            fusion, keywords, field_weights, limit, filter_type, threshold, search_filter, field_params,
+            source_files, years, ignore_errors
+        )
+
+        # 按照id融合并排序；topN模式只取回各关键词前N个结果的payload
+        per_keyword_top_n = self._per_keyword_limit(filter_type, limit)
+        results = self._hydrate(self._fused_results(fusion, top_k=top_k, per_keyword_top_n=per_keyword_top_n))
+        return results, complete
+
+    def _per_keyword_limit(self, filter_type, limit):
+        """
+        topN模式的语义是每个关键词取前N个结果（跨字段按id去重），返回各关键词结果的并集；
+        配置了更小的FUSION_PER_KEYWORD_TOP_N时以其为准。阈值模式由阈值截断，只受配置限制
+        """
+        if filter_type != 'topN':
+            return self.per_keyword_top_n
+        if self.per_keyword_top_n:
+            return min(limit, self.per_keyword_top_n)
+        return limit
+
+    def _new_fusion(self, field_weights, filter_type, keywords, use_lexical=True):
+        # 阈值是相似度语义，词法检索只参与topN模式
+        use_lexical = use_lexical and self.lexical is not None and filter_type != 'threshold'
+        fields = list(field_weights) + (["lexical"] if use_lexical else [])
+        return ScoreFusion(fields, {**field_weights, "lexical": LEXICAL_WEIGHT}, keywords)
+
+    def _search_into(self, fusion, keywords, field_weights, limit, filter_type, threshold, search_filter,
+                     field_params, source_files=None, years=None, ignore_errors=False):
+        """对关键词逐字段并发检索，命中加入fusion；有检索被放弃或跳过时返回False"""
+        keywords = [keyword for keyword in keywords if keyword and keyword.strip()]
+        # 所有关键词一次性批量编码
+        query_vectors = self._encode_queries(keywords)
+
+        # 所有关键词、字段的检索并发扇出，按完成顺序合并
+        tasks = []
+        for keyword, query_vector in zip(keywords, query_vectors):
+            for field, weight in field_weights.items():
+                if filter_type != 'threshold':
+                    search = partial(self._ann_search, field, [query_vector], limit)
+                elif threshold / weight < 1.0:
+                    search = partial(self._range_search, field, [query_vector], threshold / weight, limit)
+                else:
+                    # 该字段的相似度乘以权重不可能达到阈值
                     continue
-        
-        # 按照id去重并排序
-        deduplicated_results = _deduplicate_by_id_and_rank_results(all_results)
-            
-        return deduplicated_results
+                tasks.append(((keyword, field), partial(
+                    search, self._ann_output_fields(), param=field_params[field], **search_filter
+                )))
+        complete = True
+        for (keyword, field), raw, error in self.fanout.run(tasks):
+            if error is not None:
+                # 超过截止时间的检索直接放弃，返回已完成部分的结果
+                if isinstance(error, SearchDeadlineExceeded):
+                    complete = False
+                    continue
+                if not ignore_errors:
+                    raise error
+                print(f"在字段 {field} 中搜索关键词 '{keyword}' 失败: {error}")
+                complete = False
+                continue
+            fusion.add(keyword, field, raw[0])
+        if "lexical" in fusion.fields:
+            linked = self._linked_duplicates(source_files, years)
+            for keyword in keywords:
+                fusion.add(keyword, "lexical", self.lexical.search_hits(keyword, limit, source_files, years, linked))
+        return complete
+
+    def _fused_results(self, fusion, strategy=None, top_k=None, per_keyword_top_n=None):
+        """
+        按融合分数从高到低生成前top_k个结果，每个id保留加权分数最高的那次命中的字段和关键词
+        per_keyword_top_n为None时使用FUSION_PER_KEYWORD_TOP_N配置
+        """
+        if per_keyword_top_n is None:
+            per_keyword_top_n = self.per_keyword_top_n
+        results = []
+        for _, score, row in fusion.fuse(strategy or self.fusion_strategy, top_k=top_k,
+                                         per_keyword_top_n=per_keyword_top_n):
+            hit, field, keyword = fusion.describe(row)
+            results.append(_hit_to_result(hit, field, score, keyword))
+        return results
+
+    def _ann_output_fields(self):
+        return [] if self.two_phase else SEARCH_OUTPUT_FIELDS
+
+    def _hydrate(self, results):
+        """
+        两阶段检索的第二阶段：对去重排序后的最终结果按id一次性query取回payload
+        非两阶段模式下只回填没有payload的结果（如词法检索命中）
+        """
+        if not self.two_phase:
+            results_to_fill = [result for result in results if result.get("content") is None]
+        else:
+            results_to_fill = results
+        if not results_to_fill:
+            return results
+
+        rows = self._load_payloads([result["id"] for result in results_to_fill])
+        for result in results_to_fill:
+            result.update(_payload_fields(rows.get(result["id"], {}).get))
+        return results
+
+    def _load_payloads(self, ids):
+        """按id批量取回payload，返回 {id: 行}"""
+        ids = list(ids)
+        rows = {}
+        for start in range(0, len(ids), HYDRATE_BATCH_SIZE):
+            expr = f"id in [{', '.join(str(i) for i in ids[start:start + HYDRATE_BATCH_SIZE])}]"
+            batch_rows = self.connection.run(
+                self.collection_name,
+                lambda collection: collection.query(expr=expr, output_fields=SEARCH_OUTPUT_FIELDS)
+            )
+            rows.update((row["id"], row) for row in batch_rows)
+        return rows
+
+    def _search_hybrid(self, keywords, query_vectors, field_weights, limit, filter_type, threshold, search_filter,
+                       field_params):
+        """
+        原生多向量混合检索：每个向量字段一个AnnSearchRequest，全部关键词向量作为同一请求的多个查询，
+        由服务端按字段权重融合排序。与multi模式一致，分数越高越相关：
+        - 单字段：分数为 相似度*权重，阈值模式保留分数不低于阈值的结果
+        - 多字段：分数为服务端融合分数，阈值模式保留融合分数不低于阈值的结果；rrf融合分数由排名决定，不宜使用阈值模式
+        """
+        if not keywords:
+            return []
+
+        if len(field_weights) == 1:
+            # 单字段无需融合，全部关键词合并为一次批量检索
+            field, weight = next(iter(field_weights.items()))
+            if filter_type != 'threshold':
+                raw = self._ann_search(
+                    field, query_vectors, limit, self._ann_output_fields(), param=field_params[field], **search_filter
+                )
+            elif threshold / weight < 1.0:
+                raw = self._range_search(
+                    field, query_vectors, threshold / weight, limit, self._ann_output_fields(),
+                    param=field_params[field], **search_filter
+                )
+            else:
+                return []
+            fusion = ScoreFusion([field], field_weights, keywords)
+            for keyword, hits in zip(keywords, raw):
+                fusion.add(keyword, field, hits)
+            return self._fused_results(fusion)
+
+        requests = [
+            AnnSearchRequest(
+                data=query_vectors, anns_field=field, param=field_params[field], limit=limit,
+                expr=search_filter.get("expr")
+            )
+            for field in field_weights
+        ]
+        if HYBRID_RANKER == "rrf":
+            ranker = RRFRanker()
+        else:
+            # WeightedRanker要求权重位于[0, 1]，按最大权重等比缩放，不改变相对权重
+            max_weight = max(field_weights.values())
+            ranker = WeightedRanker(*[weight / max_weight for weight in field_weights.values()])
+
+        raw = self.connection.run(
+            self.collection_name,
+            lambda collection: collection.hybrid_search(
+                reqs=requests, rerank=ranker, limit=limit, output_fields=self._ann_output_fields(),
+                partition_names=search_filter.get("partition_names")
+            )
+        )
+        # 服务端已按字段融合，这里只需在关键词之间按id取最高分
+        fusion = ScoreFusion(["hybrid"], {"hybrid": 1.0}, keywords)
+        for keyword, hits in zip(keywords, raw):
+            if filter_type == 'threshold':
+                hits = [hit for hit in hits if hit.distance >= threshold]
+            fusion.add(keyword, "hybrid", hits)
+        return self._fused_results(fusion, strategy="max")
 
     def delete_by_expr(self, expr):
         """根据表达式删除数"""
         try:
-            connections.connect(host=MILVUS_HOST)
-            collection = Collection(self.collection_name)
-            collection.delete(expr)
-            collection.flush()
+            def _delete(collection):
+                collection.delete(expr)
+                collection.flush()
+
+            self.connection.run(self.collection_name, _delete, load=False)
             print(f"已删除数据 {expr}")
             return True
         except Exception as e:
             print(f"删除数据失败: {e}")
             return False
 
+    def delete_source(self, source_files):
+        """
+        删除指定来源文件的全部数据
+        分区由多个来源文件共用，按表达式删除；早期每个来源一个分区时写入的旧分区直接drop
+        """
+        if self.partition_mode == "source":
+            existing = self.connection.list_partitions(self.collection_name, refresh=True)
+            for source_file in source_files:
+                partition_name = _legacy_partition_name(source_file)
+                if partition_name in existing:
+                    self.client.release_partitions(self.collection_name, [partition_name])
+                    self.client.drop_partition(self.collection_name, partition_name)
+                    print(f"已删除分区 {partition_name} ({source_file})")
+            self.connection.invalidate_partitions(self.collection_name)
+        self._delete_lexical(source_files)
+        return self.delete_by_expr(_in_expr("source_file", list(source_files)))
+
+    def rebuild_lexical_index(self, batch_size=HYDRATE_BATCH_SIZE):
+        """从collection中已有的数据重建词法索引，用于启用词法检索前已入库的数据"""
+        if self.lexical is None:
+            return 0
+        output_fields = LEXICAL_TEXT_FIELDS + ["source_file", "year"]
+        self.lexical.clear()
+
+        def _rebuild(collection):
+            iterator = collection.query_iterator(batch_size=batch_size, expr="id >= 0", output_fields=output_fields)
+            total = 0
+            try:
+                while True:
+                    rows = iterator.next()
+                    if not rows:
+                        return total
+                    self.lexical.add_documents([row["id"] for row in rows], rows)
+                    total += len(rows)
+            finally:
+                iterator.close()
+
+        total = self.connection.run(self.collection_name, _rebuild)
+        self.lexical.save()
+        print(f"词法索引重建完成，共 {total} 条")
+        return total
+
+    def _add_lexical(self, ids, chunks):
+        if self.lexical is not None:
+            self.lexical.add_documents(ids, chunks)
+            self.lexical.save()
+
+    def _delete_lexical(self, source_files):
+        if self.lexical is not None:
+            self.lexical.delete_source(source_files)
+            self.lexical.save()
+
     def delete_collection(self):
-        connections.connect(host=MILVUS_HOST)
-        Collection(name=self.collection_name).drop()
+        self.connection.run(self.collection_name, lambda collection: collection.drop(), load=False)
+        self.connection.invalidate(self.collection_name)
+        if self.lexical is not None:
+            self.lexical.clear()
 
 
 def main():
@@ -372,7 +899,7 @@ def main():
     manager.insert_chunk(test_chunk)
 
     print("\n=== 搜索结果 ===")
-    results = manager.search("这个段落讲了什么？")
+    results, _ = manager.search("这个段落讲了什么？")
     for res in results:
         print(f"[内容] {res['content']}")
         print(f"[标题] {res['title']}")
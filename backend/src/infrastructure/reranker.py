@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.infrastructure.embedding_cache import normalize_text
+from src.infrastructure.embedding_registry import EMBEDDING_DEVICE
+
+RERANK_MODEL_PATH = os.getenv("RERANK_MODEL_PATH", "./models/bge-reranker-base")
+RERANK_DEVICE = os.getenv("RERANK_DEVICE", EMBEDDING_DEVICE)
+# 请求未指定rerank时的默认值
+RERANK_DEFAULT = os.getenv("RERANK_DEFAULT", "0") == "1"
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "50"))
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "800"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_CACHE_MAX_ENTRIES = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", "100000"))
+
+
+def _chunk_text(result):
+    title = result.get("title") or ""
+    content = result.get("content") or ""
+    return f"{title}\n{content}" if title else content
+
+
+class CrossEncoderReranker:
+    """
+    交叉编码器重排：对 (查询, chunk) 成对打分并按分数重新排序
+    - 只对前max_candidates个结果打分，分批推理，超过时间预算后剩余候选保持原顺序
+    - 时间预算只计推理时间，模型加载不计入；服务启动时可用warm_up提前加载
+    - 打分结果按 (查询哈希, chunk id) 缓存；chunk id 在重新入库时会变化，缓存无需失效
+    """
+    def __init__(self, model_name=RERANK_MODEL_PATH, device=RERANK_DEVICE, batch_size=RERANK_BATCH_SIZE,
+                 max_length=RERANK_MAX_LENGTH, cache_max_entries=RERANK_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_max_entries = cache_max_entries
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    start = time.time()
+                    self._model = CrossEncoder(self.model_name, device=self.device, max_length=self.max_length)
+                    print(f"Loaded rerank model {self.model_name} on {self.device} in {time.time() - start:.1f}s")
+        return self._model
+
+    def warm_up(self):
+        """加载模型并执行一次打分，避免首个重排请求承担初始化开销"""
+        self.model.predict([("预热", "预热")])
+        return self
+
+    @staticmethod
+    def _query_key(query):
+        return hashlib.sha1(normalize_text(query).encode("utf-8")).hexdigest()
+
+    def _cache_get(self, keys):
+        with self._cache_lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            return found
+
+    def _cache_put(self, items):
+        with self._cache_lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query, results, max_candidates=RERANK_MAX_CANDIDATES, time_budget_ms=RERANK_TIME_BUDGET_MS):
+        """
+        返回 (重排后的结果列表, 是否完整)：已打分的候选按rerank_score从高到低排在前面，
+        超时未打分的候选和超出max_candidates的结果保持原顺序排在后面；有候选因超时未打分时"是否完整"为False，
+        调用方不应缓存这样的结果。返回的候选是带rerank_score的副本，不修改传入的结果
+        """
+        if not query or not results:
+            return results, True
+        candidates, rest = results[:max_candidates], results[max_candidates:]
+
+        query_key = self._query_key(query)
+        keys = [(query_key, result["id"]) for result in candidates]
+        scores = self._cache_get(keys)
+        pending = [i for i, key in enumerate(keys) if key not in scores]
+
+        # 先完成模型加载再开始计时，时间预算只约束推理
+        model = self.model if pending else None
+        deadline = time.monotonic() + time_budget_ms / 1000
+        scored = 0
+        for start in range(0, len(pending), self.batch_size):
+            if time.monotonic() >= deadline:
+                print(f"重排超过时间预算 {time_budget_ms}ms，{len(pending) - start} 个候选未打分")
+                break
+            batch = pending[start:start + self.batch_size]
+            predictions = model.predict(
+                [(query, _chunk_text(candidates[i])) for i in batch], batch_size=self.batch_size
+            )
+            new_scores = [(keys[i], float(score)) for i, score in zip(batch, predictions)]
+            self._cache_put(new_scores)
+            scores.update(new_scores)
+            scored += len(batch)
+
+        ranked, unranked = [], []
+        for key, result in zip(keys, candidates):
+            if key in scores:
+                ranked.append(dict(result, rerank_score=scores[key]))
+            else:
+                unranked.append(result)
+        ranked.sort(key=lambda result: result["rerank_score"], reverse=True)
+        print(f"重排 {len(candidates)} 个候选，缓存命中 {len(candidates) - len(pending)}，新打分 {scored}")
+        return ranked + unranked + rest, not unranked
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
+
+
+def warm_up_reranker():
+    return get_reranker().warm_up()
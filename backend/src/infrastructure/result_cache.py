@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2048"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+# 非空时启用磁盘二级缓存，多个进程可共享同一个文件；集合版本号也保存在其中
+QUERY_CACHE_DISK_PATH = os.getenv("QUERY_CACHE_DISK_PATH", "")
+QUERY_CACHE_DISK_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_DISK_MAX_ENTRIES", "50000"))
+
+
+class QueryResultCache:
+    """
+    检索结果缓存：
+    - 键中包含collection版本号，入库/删除时递增版本号，旧条目自然失效
+    - 内存中按LRU和TTL淘汰，并限制总字节数；条目以JSON字符串保存，每次命中都解析出新对象，
+      调用方修改返回结果（如重排写入rerank_score）不会影响缓存
+    - 可选SQLite磁盘存储，内存未命中时回查
+    """
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, max_bytes=QUERY_CACHE_MAX_BYTES,
+                 ttl=QUERY_CACHE_TTL_SECONDS, disk_path=QUERY_CACHE_DISK_PATH,
+                 disk_max_entries=QUERY_CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if disk_path:
+            cache_dir = os.path.dirname(disk_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+
+    def version(self, collection_name):
+        """collection当前版本号；启用磁盘存储时从磁盘读取，以感知其他进程的写入"""
+        with self._lock:
+            if self._conn is None:
+                return self._versions.get(collection_name, 0)
+            row = self._conn.execute(
+                "SELECT version FROM versions WHERE collection = ?", (collection_name,)
+            ).fetchone()
+            return row[0] if row else 0
+
+    def bump_version(self, collection_name):
+        """collection数据变化后调用，使该collection的全部缓存结果失效"""
+        with self._lock:
+            if self._conn is None:
+                self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+                return self._versions[collection_name]
+            self._conn.execute(
+                "INSERT INTO versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1", (collection_name,)
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT version FROM versions WHERE collection = ?", (collection_name,)
+            ).fetchone()[0]
+
+    @staticmethod
+    def make_key(**parts):
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """命中返回结果列表的独立副本，未命中返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, encoded = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(encoded)
+                self._remove(key)
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    self._put_memory(key, row[0], row[1])
+                    self.hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._put_memory(key, encoded, expires_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, encoded, expires_at, time.time())
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _put_memory(self, key, encoded, expires_at):
+        if len(encoded) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, encoded)
+        self._bytes += len(encoded)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, encoded = self._entries.pop(key)
+        self._bytes -= len(encoded)
+
+    def _evict_disk(self):
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count <= self.disk_max_entries:
+            return
+        # 一次淘汰到上限的90%，避免每次写入都触发淘汰
+        to_delete = count - int(self.disk_max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY last_access ASC LIMIT ?)", (to_delete,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM results")
+                self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_result_cache() -> QueryResultCache:
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryResultCache()
+        return _query_cache
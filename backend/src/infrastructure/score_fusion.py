@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+
+# 多关键词、多字段检索结果的融合方式：
+# max 每个id取最高加权分数；weighted_sum 加权分数求和；rrf 按各次检索中的排名做加权倒数排名融合
+FUSION_STRATEGY = os.getenv("SEARCH_FUSION_STRATEGY", "max")
+FUSION_STRATEGIES = ("max", "weighted_sum", "rrf")
+RRF_K = int(os.getenv("SEARCH_FUSION_RRF_K", "60"))
+
+
+def _first_of_groups(*keys):
+    """keys已排好序时，返回每组第一行的布尔掩码"""
+    first = np.ones(len(keys[0]), dtype=bool)
+    if len(first) > 1:
+        changed = np.zeros(len(first) - 1, dtype=bool)
+        for key in keys:
+            changed |= key[1:] != key[:-1]
+        first[1:] = changed
+    return first
+
+
+def top_k_indices(scores, k):
+    """按分数从高到低返回前k个下标，先argpartition再只对k个候选排序"""
+    if k is None or k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ScoreFusion:
+    """
+    检索结果融合：所有检索命中以数组保存（id、字段序号、关键词序号、原始分数、在该次检索中的排名），
+    加权、按id分组和top-k选择都是数组运算。分数越高越相关
+    """
+    def __init__(self, fields, field_weights, keywords):
+        self.fields = list(fields)
+        self.keywords = list(keywords)
+        self.weights = np.asarray([field_weights[field] for field in self.fields], dtype=np.float32)
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._ids, self._field_idx, self._keyword_idx, self._distances, self._ranks = [], [], [], [], []
+        # 非两阶段检索时需要从命中实体中取payload
+        self._hits = []
+        self._merged = None
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._ids)
+
+    def add(self, keyword, field, hits):
+        """
+        加入一次检索（一个关键词在一个字段上）的命中列表，hits按相关度从高到低排列
+        keyword不在构造时的关键词列表中时追加，渐进式检索可在融合过程中加入新的关键词
+        """
+        hits = list(hits)
+        if not hits:
+            return
+        if keyword not in self._keyword_index:
+            self._keyword_index[keyword] = len(self.keywords)
+            self.keywords.append(keyword)
+        n = len(hits)
+        self._ids.append(np.fromiter((hit.id for hit in hits), dtype=np.int64, count=n))
+        self._distances.append(np.fromiter((hit.distance for hit in hits), dtype=np.float32, count=n))
+        self._field_idx.append(np.full(n, self._field_index[field], dtype=np.int16))
+        self._keyword_idx.append(np.full(n, self._keyword_index[keyword], dtype=np.int32))
+        self._ranks.append(np.arange(n, dtype=np.int32))
+        self._hits.extend(hits)
+        self._merged = None
+
+    def _arrays(self):
+        if self._merged is None:
+            self._merged = (
+                np.concatenate(self._ids), np.concatenate(self._field_idx), np.concatenate(self._keyword_idx),
+                np.concatenate(self._distances), np.concatenate(self._ranks)
+            )
+        return self._merged
+
+    def fuse(self, strategy=FUSION_STRATEGY, top_k=None, per_keyword_top_n=None, rrf_k=RRF_K):
+        """
+        按id融合并排序
+        per_keyword_top_n: 先对每个关键词按id去重后只保留其前N个结果再融合
+        top_k: 只返回融合后分数最高的k个id
+        返回 [(id, 融合分数, 代表命中的下标)]，代表命中为该id加权分数最高的一次命中
+        """
+        if strategy not in FUSION_STRATEGIES:
+            raise ValueError(f"不支持的融合方式: {strategy}，可选: {', '.join(FUSION_STRATEGIES)}")
+        if not self._ids:
+            return []
+
+        ids, field_idx, keyword_idx, distances, ranks = self._arrays()
+        rows = np.arange(len(ids))
+        weighted = distances * self.weights[field_idx]
+
+        if per_keyword_top_n:
+            # 每个(关键词, id)只保留加权分数最高的一行，再取每个关键词的前N行
+            order = np.lexsort((-weighted, ids, keyword_idx))
+            order = order[_first_of_groups(ids[order], keyword_idx[order])]
+            order = order[np.lexsort((-weighted[order], keyword_idx[order]))]
+            group_keys = keyword_idx[order]
+            starts = np.flatnonzero(_first_of_groups(group_keys))
+            rank_in_group = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(order))))
+            rows = order[rank_in_group < per_keyword_top_n]
+
+        unique_ids, inverse = np.unique(ids[rows], return_inverse=True)
+        # 每个id的代表命中：加权分数最高的一行
+        order = np.lexsort((-weighted[rows], inverse))
+        best_rows = rows[order[_first_of_groups(inverse[order])]]
+
+        if strategy == "max":
+            scores = weighted[best_rows]
+        elif strategy == "weighted_sum":
+            scores = np.bincount(inverse, weights=weighted[rows], minlength=len(unique_ids))
+        else:
+            contribution = self.weights[field_idx[rows]] / (rrf_k + ranks[rows] + 1.0)
+            scores = np.bincount(inverse, weights=contribution, minlength=len(unique_ids))
+
+        selected = top_k_indices(np.asarray(scores, dtype=np.float64), top_k)
+        return [(int(unique_ids[i]), float(scores[i]), int(best_rows[i])) for i in selected]
+
+    def describe(self, row):
+        """代表命中的 (命中对象, 字段, 关键词)"""
+        _, field_idx, keyword_idx, _, _ = self._arrays()
+        return self._hits[row], self.fields[field_idx[row]], self.keywords[keyword_idx[row]]
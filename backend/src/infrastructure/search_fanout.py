@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SEARCH_FANOUT_WORKERS = int(os.getenv("SEARCH_FANOUT_WORKERS", "32"))
+SEARCH_QUERY_CONCURRENCY = int(os.getenv("SEARCH_QUERY_CONCURRENCY", "8"))
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "10"))
+
+
+class SearchDeadlineExceeded(Exception):
+    """检索在截止时间前未完成，已被放弃"""
+
+
+class SearchFanout:
+    """
+    检索扇出执行器：所有查询共享一个有界线程池，
+    单个查询内同时在途的检索数不超过concurrency，超过deadline后放弃剩余检索
+    """
+    def __init__(self, max_workers=SEARCH_FANOUT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="milvus-search")
+
+    def run(self, tasks, concurrency=SEARCH_QUERY_CONCURRENCY, deadline=SEARCH_DEADLINE_SECONDS):
+        """
+        tasks: [(key, callable)]
+        按完成顺序产出 (key, result, error)，调用方可边收边合并
+        超过截止时间后，未完成和未开始的检索以 SearchDeadlineExceeded 作为error产出，调用方据此判断结果是否完整
+        """
+        tasks = iter(tasks)
+        pending = {}
+        deadline_at = time.monotonic() + deadline
+
+        def submit_next():
+            try:
+                key, fn = next(tasks)
+            except StopIteration:
+                return False
+            pending[self._executor.submit(fn)] = key
+            return True
+
+        for _ in range(concurrency):
+            if not submit_next():
+                break
+
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                for future in pending:
+                    future.cancel()
+                skipped = list(pending.values()) + [key for key, _ in tasks]
+                print(f"检索超过截止时间 {deadline}s，放弃 {len(skipped)} 个未完成的检索")
+                error = SearchDeadlineExceeded(f"检索超过截止时间 {deadline}s")
+                for key in skipped:
+                    yield key, None, error
+                return
+
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                submit_next()
+                try:
+                    yield key, future.result(), None
+                except Exception as e:
+                    yield key, None, e
+
+
+_fanout = None
+_fanout_lock = threading.Lock()
+
+
+def get_search_fanout() -> SearchFanout:
+    global _fanout
+    with _fanout_lock:
+        if _fanout is None:
+            _fanout = SearchFanout()
+        return _fanout
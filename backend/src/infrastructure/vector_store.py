@@ -0,0 +1,16 @@
+import os
+
+# milvus: 远程Milvus服务；local: 嵌入式本地向量库（开发、CI、边缘部署）
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "milvus")
+
+
+def create_vector_store(collection_name, backend=VECTOR_STORE_BACKEND, **kwargs):
+    """按配置创建向量库，两种实现对外接口一致"""
+    if backend == "milvus":
+        from src.infrastructure.milvus_db import MilvusDbManager
+        return MilvusDbManager(collection_name, **kwargs)
+    if backend == "local":
+        # 本地向量库按目录共享实例，并发入库不会分配重复主键
+        from src.infrastructure.local_vector_store import get_local_vector_store
+        return get_local_vector_store(collection_name, **kwargs)
+    raise ValueError(f"不支持的向量库类型: {backend}")
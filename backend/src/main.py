@@ -1,7 +1,7 @@
 from backend.app import save_chunks_to_milvus
-from backend.src.infrastructure.milvus_db import MilvusDbManager
-from backend.src.service.question_generator import generate_questions_for_chunk
-from backend.src.service.split_md_into_chunks import MarkdownChunker
+from src.infrastructure.milvus_db import MilvusDbManager
+from src.service.question_generator import generate_questions_for_chunk
+from src.service.split_md_into_chunks import MarkdownChunker
 
 file_name = "JGJ289-2012_建筑外墙外保温防火隔离带技术规程"
 with open(
@@ -1,5 +1,5 @@
 import json
-from backend.src.infrastructure.envoke_llm import LLMAPIFactory
+from src.infrastructure.envoke_llm import LLMAPIFactory
 
 class ChatService:
     def __init__(self):
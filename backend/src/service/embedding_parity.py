@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from src.infrastructure.embedding_registry import EMBEDDING_MODEL_PATH, EMBEDDING_DEVICE, get_embedding_model
+
+DEFAULT_SAMPLE_TEXTS = [
+    "木头保温杯",
+    "有哪些保温砂浆适合非潮湿环境下的楼板隔热",
+    "建筑外墙外保温防火隔离带",
+    "石膏保温砂浆适用于民用建筑室内非潮湿墙体、楼板和顶棚保温隔热工程",
+    "JGJ289-2012",
+]
+
+
+def load_sample_texts(processed_dir="processed_pdfs", max_texts=200):
+    """从已处理的PDF信息中抽取chunk文本作为对比样本"""
+    texts = []
+    if os.path.exists(processed_dir):
+        for filename in sorted(os.listdir(processed_dir)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            for chunk in info.get('chunks', []):
+                texts.extend(chunk.get(field) for field in ["content", "question1", "question2", "tags"])
+    texts = [text for text in texts if text]
+    return texts[:max_texts] or DEFAULT_SAMPLE_TEXTS
+
+
+def check_backend_parity(texts, backend="onnx-int8", model_name=EMBEDDING_MODEL_PATH, device=EMBEDDING_DEVICE,
+                         batch_size=32):
+    """
+    对比指定后端与torch后端的向量余弦相似度及编码耗时
+    """
+    reference_model = get_embedding_model(model_name, device, "torch")
+    candidate_model = get_embedding_model(model_name, device, backend)
+
+    start = time.time()
+    reference = reference_model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    reference_seconds = time.time() - start
+
+    start = time.time()
+    candidate = candidate_model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    candidate_seconds = time.time() - start
+
+    cosine = np.sum(np.asarray(reference) * np.asarray(candidate), axis=1)
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        "cosine_p01": float(np.percentile(cosine, 1)),
+        "torch_seconds": reference_seconds,
+        "backend_seconds": candidate_seconds,
+        "speedup": reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    backend = sys.argv[1] if len(sys.argv) > 1 else "onnx-int8"
+    report = check_backend_parity(load_sample_texts(), backend=backend)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
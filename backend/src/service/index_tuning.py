@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from src.infrastructure.index_profiles import INDEX_PROFILES, estimate_index_bytes
+from src.infrastructure.milvus_db import MilvusDbManager
+
+TUNING_COLLECTION_PREFIX = "index_tuning_"
+# 默认只比较这些字段，content向量最多、对内存影响最大
+TUNING_FIELDS = ["content_vector", "tags_vector"]
+
+
+def load_chunks(processed_dir="processed_pdfs"):
+    """读取已处理的全部chunk，生成的问题作为查询文本"""
+    chunks, queries = [], []
+    if os.path.exists(processed_dir):
+        for filename in sorted(os.listdir(processed_dir)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            for chunk in info.get('chunks', []):
+                if not chunk.get('content'):
+                    continue
+                chunks.append(chunk)
+                queries.extend(q for q in [chunk.get('question1'), chunk.get('question2')] if q)
+    return chunks, queries
+
+
+def brute_force_top_k(query_vectors, document_vectors, k):
+    """精确检索结果，按行号返回每个查询的top-k集合"""
+    scores = query_vectors @ document_vectors.T
+    k = min(k, document_vectors.shape[0])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in idx]
+
+
+def _percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 2)
+
+
+def evaluate_profile(profile_name, rows, query_vectors, baseline, k, fields):
+    """
+    用指定索引配置新建临时collection，写入相同数据后逐条查询，
+    统计各字段的recall@k与p50/p99延迟；结束后删除临时collection
+    """
+    manager = MilvusDbManager(collection_name=f"{TUNING_COLLECTION_PREFIX}{profile_name}")
+    manager.partition_mode = "none"
+    manager.field_index_profiles = {field: profile_name for field in manager.field_index_profiles}
+    if manager.client.has_collection(manager.collection_name):
+        manager.delete_collection()
+    manager.initialize()
+
+    report = []
+    try:
+        ids = []
+        for i in range(0, len(rows), 1000):
+            ids.extend(manager._insert_rows(rows[i:i + 1000]))
+        manager._flush()
+        # 行号 -> 主键，用于和暴力检索结果对齐
+        row_ids = np.asarray(ids)
+
+        for field in fields:
+            recalls, latencies = [], []
+            for query_vector, expected in zip(query_vectors, baseline[field]):
+                started = time.perf_counter()
+                hits = manager._ann_search(field, [manager._to_storage(query_vector)], k, [])[0]
+                latencies.append(time.perf_counter() - started)
+                found = {hit.id for hit in hits}
+                recalls.append(len(found & set(row_ids[list(expected)].tolist())) / len(expected))
+            report.append({
+                "profile": profile_name,
+                "field": field,
+                f"recall@{k}": round(float(np.mean(recalls)), 4),
+                "p50_ms": _percentile_ms(latencies, 50),
+                "p99_ms": _percentile_ms(latencies, 99),
+                "estimated_index_mb": round(estimate_index_bytes(profile_name, len(rows), manager.dim) / 2 ** 20, 2),
+            })
+    finally:
+        manager.delete_collection()
+    return report
+
+
+def build_report(chunks, queries, profiles=None, k=10, fields=TUNING_FIELDS):
+    manager = MilvusDbManager(collection_name=f"{TUNING_COLLECTION_PREFIX}encoder")
+    rows = manager.build_insert_data_batch(chunks)
+    # encode_batch 已按存储维度截断并归一化
+    query_vectors = np.asarray(manager.encoder.encode_batch(queries), dtype=np.float32)
+
+    baseline = {}
+    for field in fields:
+        document_vectors = np.asarray([row[field] for row in rows], dtype=np.float32)
+        document_vectors /= np.maximum(np.linalg.norm(document_vectors, axis=1, keepdims=True), 1e-12)
+        baseline[field] = brute_force_top_k(query_vectors, document_vectors, k)
+
+    report = []
+    for profile_name in profiles or INDEX_PROFILES:
+        print(f"评估索引配置 {profile_name} ...")
+        try:
+            report.extend(evaluate_profile(profile_name, rows, query_vectors, baseline, k, fields))
+        except Exception as e:
+            print(f"索引配置 {profile_name} 评估失败: {e}")
+    return report
+
+
+if __name__ == '__main__':
+    chunks, queries = load_chunks()
+    if not chunks or not queries:
+        print("processed_pdfs 中没有可用的chunk，无法生成报告")
+        sys.exit(1)
+    print(f"chunk {len(chunks)} 条，查询 {len(queries)} 条")
+    for row in build_report(chunks, queries, profiles=sys.argv[1:] or None):
+        print(json.dumps(row, ensure_ascii=False))
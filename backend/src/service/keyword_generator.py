@@ -2,19 +2,37 @@ import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
-from backend.src.infrastructure.envoke_llm import LLMAPIFactory
-from backend.src.utils.generate_question_utils import extract_json_block
-from backend.src.utils.llm_utils import load_template_and_fill
+from src.infrastructure.envoke_llm import LLMAPIFactory
+from src.infrastructure.keyword_cache import KEYWORD_CACHE_ENABLED, get_keyword_cache, template_hash
+from src.utils.generate_question_utils import extract_json_block
+from src.utils.llm_utils import resolve_model_config
+
+KEYWORD_TEMPLATE_PATH = "prompt/generate_keyword_for_query.tmpl"
 
 
 def generate_keyword_for_query(model_name, **query):
+    with open(KEYWORD_TEMPLATE_PATH, "r", encoding="utf-8") as f:
+        template = f.read()
+
+    cache_key = None
+    if KEYWORD_CACHE_ENABLED:
+        # 同一键值下的模型被替换后结果不同，键中同时包含模型类型
+        model_config = resolve_model_config(model_name)
+        model_key = f"{model_config['key']}:{model_config['model_type']}"
+        cache_key = get_keyword_cache().make_key(model_key, template_hash(template), query.get("query", ""))
+        cached = get_keyword_cache().get(cache_key)
+        if cached is not None:
+            print("关键词扩展命中缓存")
+            return cached
+
     retrial_llm = LLMAPIFactory.create_api(model_name = model_name)
-    prompt = load_template_and_fill(
-        template_path="prompt/generate_keyword_for_query.tmpl",
-        **query
-    )
+    prompt = template.format(**query)
     llm_ans = retrial_llm.block_chat(prompt)
-    return extract_json_block(llm_ans)
+    keywords = extract_json_block(llm_ans)
+    # 解析失败的结果不缓存，下次重新调用LLM
+    if cache_key is not None and keywords:
+        get_keyword_cache().put(cache_key, keywords)
+    return keywords
 
 
 if __name__ == '__main__':
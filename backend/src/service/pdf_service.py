@@ -3,15 +3,30 @@ import os
 import shutil
 import uuid
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
 from src.service.split_md_into_chunks import MarkdownChunker
-from src.infrastructure.milvus_db import MilvusDbManager
-from src.service.question_generator import generate_questions_for_chunk
+from src.infrastructure.vector_store import create_vector_store
+from src.infrastructure.result_cache import get_query_result_cache
+from src.infrastructure.dedup_index import DEDUP_ENABLED, get_dedup_index
+from src.infrastructure.llm_rate_limiter import RateLimitWaitCancelled, get_model_limiter
+from src.service.question_generator import generate_questions_for_chunk, generate_questions_for_chunks, pack_batches
 from src.utils.vector_utils import prepare_chunk_for_insert
 from src.service.convet_pdf2md_mineru import convert_pdf_to_markdown
 
+COLLECTION_NAME = "specs_architecture_v1"
+# 生成问题和tags的并发线程数，实际并发还受每个模型的并发和速率限制
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "16"))
+# 多个chunk合并到一个prompt生成，批量结果中解析失败的chunk再单独生成
+ENRICH_BATCH_ENABLED = os.getenv("ENRICH_BATCH_ENABLED", "1") == "1"
+EMPTY_CHUNK_QUESTIONS = {'question1': '', 'question2': '', 'question3': '', 'tags': ''}
+
+
+def _is_duplicate(chunk):
+    return chunk.get('duplicate_of') is not None or chunk.get('duplicate_of_chunk') is not None
+
 class PDFService:
     def __init__(self, base_dir,llm_model_name):
         self.base_dir = base_dir
@@ -159,23 +174,13 @@ class PDFService:
             mdc = MarkdownChunker(md_content)
             chunks = mdc.run()
             
-            # 为每个chunk生成问题和tags
-            for i, chunk in enumerate(chunks):
-                if stop_event and stop_event.is_set():
-                    self._update_processing_status(file_id, 'cancelled', '处理已取消')
-                    return
-                
-                try:
-                    questions_tag_dict = generate_questions_for_chunk(chunk,self.llm_model_name)
-                    chunk.update(questions_tag_dict)
-                except Exception as e:
-                    print(f"为chunk {i+1}生成问题失败: {e}")
-                    chunk.update({
-                        'question1': '',
-                        'question2': '',
-                        'question3': '',
-                        'tags': ''
-                    })
+            # 与已入库内容及本文档内更早的chunk查重，重复chunk只链接到规范chunk
+            if DEDUP_ENABLED:
+                duplicates = get_dedup_index(COLLECTION_NAME).mark_duplicates(chunks)
+                print(f"{pdf_filename} 共 {len(chunks)} 个chunk，其中近似重复 {duplicates} 个")
+            
+            # 为每个chunk并发生成问题和tags
+            self._enrich_chunks(chunks, stop_event, file_id)
             
             if stop_event and stop_event.is_set():
                 self._update_processing_status(file_id, 'cancelled', '处理已取消')
@@ -183,7 +188,7 @@ class PDFService:
             
             # 步骤5: 存储到数据库
             self._update_processing_status(file_id, 'processing', f'存储到数据库 ({len(chunks)} chunks)...', 5, 5)
-            self._save_chunks_to_milvus(chunks, pdf_filename, "specs_architecture_v1")
+            self._save_chunks_to_milvus(chunks, pdf_filename, COLLECTION_NAME)
             
             # 完成处理
             processed_info = {
@@ -242,10 +247,81 @@ class PDFService:
         except Exception as e:
             print(f"更新处理状态失�? {e}")
     
+    def _generate_chunk_questions(self, chunk, i, stop_event=None):
+        """为单个chunk生成问题和tags，返回待合并到chunk的字段，失败时返回空值"""
+        if stop_event and stop_event.is_set():
+            return None
+        try:
+            questions_tag_dict = get_model_limiter(self.llm_model_name).call(
+                lambda: generate_questions_for_chunk(chunk, self.llm_model_name), stop_event
+            )
+            if not isinstance(questions_tag_dict, dict):
+                raise ValueError(f"无法解析模型输出: {questions_tag_dict!r}")
+            return questions_tag_dict
+        except RateLimitWaitCancelled:
+            return None
+        except Exception as e:
+            print(f"为chunk {i+1}生成问题失败: {e}")
+            return dict(EMPTY_CHUNK_QUESTIONS)
+
+    def _generate_batch_questions(self, chunks, indices, stop_event=None):
+        """为一组chunk合并生成问题和tags，返回 {下标: 待合并的字段}；批量结果中缺失的chunk单独重试"""
+        results = {}
+        if len(indices) > 1 and not (stop_event and stop_event.is_set()):
+            try:
+                batch = get_model_limiter(self.llm_model_name).call(
+                    lambda: generate_questions_for_chunks([chunks[i] for i in indices], self.llm_model_name),
+                    stop_event
+                )
+                results = {indices[j]: dict(EMPTY_CHUNK_QUESTIONS, **fields) for j, fields in batch.items()}
+                if len(results) < len(indices):
+                    print(f"批量生成问题 {len(indices)} 个chunk中 {len(indices) - len(results)} 个解析失败，逐个重试")
+            except RateLimitWaitCancelled:
+                return {}
+            except Exception as e:
+                print(f"批量生成问题失败，逐个重试: {e}")
+        for i in indices:
+            if i not in results:
+                results[i] = self._generate_chunk_questions(chunks[i], i, stop_event)
+        return results
+
+    def _enrich_chunks(self, chunks, stop_event=None, file_id=None):
+        """
+        并发为非重复chunk生成问题和tags，全部完成后按下标顺序合并回chunks
+        启用批量模式时按token预算将多个chunk合并到一个请求
+        收到取消信号时不再发起新请求，已返回的结果也不合并
+        """
+        pending = [i for i, chunk in enumerate(chunks) if not _is_duplicate(chunk)]
+        if not pending:
+            return
+        if ENRICH_BATCH_ENABLED:
+            groups = [[pending[j] for j in batch] for batch in pack_batches([chunks[i] for i in pending])]
+        else:
+            groups = [[i] for i in pending]
+        results = {}
+        workers = max(1, min(ENRICH_CONCURRENCY, len(groups)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk-enrich") as executor:
+            futures = [executor.submit(self._generate_batch_questions, chunks, group, stop_event) for group in groups]
+            for future in as_completed(futures):
+                results.update(future.result())
+                if stop_event and stop_event.is_set():
+                    for other in futures:
+                        other.cancel()
+                    return
+                if file_id:
+                    self._update_processing_status(
+                        file_id, 'processing', f'生成问题和tags ({len(results)}/{len(pending)})', 4, 5
+                    )
+        for i in pending:
+            chunks[i].update(results[i])
+
     def _save_chunks_to_milvus(self, chunks, source_filename, collection_name):
-        """保存chunks到Milvus数据库"""
+        """
+        保存chunks到Milvus数据库
+        被标记为近似重复的chunk不写入，入库后将其duplicate_of解析为规范chunk的主键
+        """
         try:
-            manager = MilvusDbManager(collection_name=collection_name)
+            manager = create_vector_store(collection_name=collection_name)
             manager.initialize()
             
             source_base_info = {
@@ -253,16 +329,64 @@ class PDFService:
                 "source_file": source_filename,
             }
             
-            for chunk in chunks:
-                data = prepare_chunk_for_insert(chunk, source_base_info)
-                manager.insert_chunk(data)
+            canonical = [chunk for chunk in chunks if not _is_duplicate(chunk)]
+            stats = manager.bulk_insert([prepare_chunk_for_insert(chunk, source_base_info) for chunk in canonical])
+            
+            if DEDUP_ENABLED:
+                self._link_duplicates(chunks, canonical, stats['ids'], source_base_info, collection_name)
+            # 数据及重复链接已变化，使该collection的检索结果缓存失效
+            get_query_result_cache().bump_version(collection_name)
             
-            print(f"成功存储 {len(chunks)} 个chunks到Milvus")
+            print(f"成功存储 {stats['inserted']} 个chunks到Milvus ({stats['rows_per_second']:.1f} rows/s)，"
+                  f"跳过近似重复 {len(chunks) - len(canonical)} 个")
             
         except Exception as e:
             print(f"存储到Milvus失败: {e}")
             raise
     
+    def _link_duplicates(self, chunks, canonical, ids, source_info, collection_name):
+        """登记规范chunk；跨文档的重复chunk按本文档的来源文件和年份链接到规范chunk，使按其过滤的检索能找到"""
+        source_filename = source_info['source_file']
+        dedup = get_dedup_index(collection_name)
+        dedup.register(ids, canonical, source_filename)
+        # chunks中规范chunk的下标 -> 主键，canonical与ids顺序一致
+        remaining_ids = iter(ids)
+        ids_by_index = {i: next(remaining_ids) for i, chunk in enumerate(chunks) if not _is_duplicate(chunk)}
+        for chunk in chunks:
+            earlier = chunk.pop('duplicate_of_chunk', None)
+            if earlier is not None:
+                chunk['duplicate_of'] = ids_by_index[earlier]
+            elif chunk.get('duplicate_of') is not None:
+                dedup.link(chunk['duplicate_of'], source_filename, source_info['year'])
+        dedup.save()
+
+    def _rehome_duplicates(self, orphans):
+        """
+        被删除文档中的规范chunk仍被其他文档引用时，为引用方重新查重、生成问题并入库
+        orphans: {引用方source_file: 被删除的规范chunk主键集合}
+        """
+        for filename in os.listdir(self.processed_dir):
+            if not filename.endswith('.json'):
+                continue
+            info_file = os.path.join(self.processed_dir, filename)
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+                orphaned_ids = orphans.get(info.get('filename'))
+                if not orphaned_ids:
+                    continue
+                
+                chunks = [chunk for chunk in info.get('chunks', []) if chunk.get('duplicate_of') in orphaned_ids]
+                get_dedup_index(COLLECTION_NAME).mark_duplicates(chunks)
+                self._enrich_chunks([chunk for chunk in chunks if not chunk.get('tags')])
+                self._save_chunks_to_milvus(chunks, info['filename'], COLLECTION_NAME)
+                
+                with open(info_file, 'w', encoding='utf-8') as f:
+                    json.dump(info, f, ensure_ascii=False, indent=2)
+                print(f"{info['filename']} 中 {len(chunks)} 个引用已删除内容的重复chunk已重新入库")
+            except Exception as e:
+                print(f"重新入库重复chunk失败 {filename}: {e}")
+
     def get_pdf_list(self):
         """获取已处理的PDF文件列表"""
         pdf_files = []
@@ -362,13 +486,23 @@ class PDFService:
             shutil.rmtree(temp_dir)
         
         # 删除数据库数�?
+        # 入库时source_file为带扩展名的文件名，兼容早期按不带扩展名入库的数据
+        filename_without_ext = os.path.splitext(original_name)[0]
         try:
-            manager = MilvusDbManager(collection_name="specs_architecture_v1")
-            filename_without_ext = os.path.splitext(original_name)[0]
-            delete_expr = f'source_file == "{filename_without_ext}"'
-            manager.delete_by_expr(delete_expr)
+            manager = create_vector_store(collection_name=COLLECTION_NAME)
+            manager.delete_source([pdf_filename, filename_without_ext])
         except Exception as e:
             print(f"删除Milvus数据失败: {e}")
+        # 删除可能部分成功，无论如何都使检索结果缓存失效
+        get_query_result_cache().bump_version(COLLECTION_NAME)
+        
+        # 其他文档中链接到被删除内容的重复chunk需要重新入库
+        if DEDUP_ENABLED:
+            dedup = get_dedup_index(COLLECTION_NAME)
+            orphans = dedup.delete_source([pdf_filename, filename_without_ext])
+            dedup.save()
+            if orphans:
+                threading.Thread(target=self._rehome_duplicates, args=(orphans,), daemon=True).start()
         
         # 删除处理信息文件
         info_file = os.path.join(self.processed_dir, f"{file_id}.json")
@@ -1,4 +1,6 @@
+import json
 import os
+import re
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
@@ -6,6 +8,14 @@ from src.infrastructure.envoke_llm import LLMAPIFactory
 from src.utils.generate_question_utils import extract_json_block
 from src.utils.llm_utils import load_template_and_fill
 
+BATCH_TEMPLATE_PATH = "prompt/generate_batch_content_related_questions.tmpl"
+# 多个chunk合并到一个prompt时，段落部分的估算token上限和chunk数上限
+ENRICH_BATCH_TOKEN_BUDGET = int(os.getenv("ENRICH_BATCH_TOKEN_BUDGET", "3000"))
+ENRICH_BATCH_MAX_CHUNKS = int(os.getenv("ENRICH_BATCH_MAX_CHUNKS", "8"))
+# 每个chunk的输出约占的token数，与输入一起计入预算
+_OUTPUT_TOKENS_PER_CHUNK = 80
+_CJK_RE = re.compile(r"[一-鿿　-〿＀-￯]")
+
 
 def generate_questions_for_chunk(chunk,model_name):
 
@@ -16,3 +26,107 @@ def generate_questions_for_chunk(chunk,model_name):
     )
     llm_ans = retrial_llm.block_chat(prompt)
     return extract_json_block(llm_ans)
+
+
+def estimate_tokens(text):
+    """粗略估算token数：中日文字符按1个，其余字符约4个计1个"""
+    text = text or ""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _format_chunk(index, chunk):
+    return (f"【段落 {index}】\n正文是：\n{chunk.get('content', '')}\n"
+            f"该段落对应的小章节为：{chunk.get('title', '')}\n"
+            f"该段落对应的大章节为：{chunk.get('parent_title', '')}")
+
+
+def pack_batches(chunks, token_budget=ENRICH_BATCH_TOKEN_BUDGET, max_chunks=ENRICH_BATCH_MAX_CHUNKS):
+    """
+    按token预算把chunk下标分组，保持原有顺序
+    单个chunk超出预算时单独成组
+    """
+    batches, current, used = [], [], 0
+    for i, chunk in enumerate(chunks):
+        cost = estimate_tokens(_format_chunk(i, chunk)) + _OUTPUT_TOKENS_PER_CHUNK
+        if current and (used + cost > token_budget or len(current) >= max_chunks):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _json_objects(text):
+    """扫描文本中所有顶层的 {...} 片段并逐个解析，跳过无法解析的片段"""
+    objects, depth, start, in_string, escaped = [], 0, None, False, False
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                try:
+                    objects.append(json.loads(text[start:pos + 1]))
+                except ValueError:
+                    pass
+    return objects
+
+
+def parse_batch_answer(text, count):
+    """
+    解析批量生成的输出，返回 {段落编号: 字段字典}
+    整体解析失败（输出被截断、夹带说明文字等）时逐个对象解析，只保留编号有效且包含问题字段的对象
+    """
+    try:
+        parsed = extract_json_block(text)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict):
+        if "question1" in parsed:
+            parsed = [parsed]
+        else:
+            # 兼容 {"0": {...}, "1": {...}} 形式
+            parsed = [dict(value, index=key) for key, value in parsed.items() if isinstance(value, dict)]
+    if not isinstance(parsed, list):
+        parsed = _json_objects(text or "")
+
+    results = {}
+    for item in parsed:
+        if not isinstance(item, dict) or "question1" not in item:
+            continue
+        try:
+            index = int(item.pop("index"))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < count and index not in results:
+            results[index] = item
+    return results
+
+
+def generate_questions_for_chunks(chunks, model_name):
+    """
+    一次调用为多个chunk生成问题和tags，返回 {chunks中的下标: 字段字典}
+    没有出现在结果中的chunk由调用方单独重试
+    """
+    retrial_llm = LLMAPIFactory.create_api(model_name = model_name)
+    prompt = load_template_and_fill(
+        template_path=BATCH_TEMPLATE_PATH,
+        chunks="\n\n".join(_format_chunk(i, chunk) for i, chunk in enumerate(chunks)),
+        count=len(chunks)
+    )
+    llm_ans = retrial_llm.block_chat(prompt)
+    return parse_batch_answer(llm_ans, len(chunks))
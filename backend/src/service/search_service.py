@@ -1,25 +1,134 @@
-from src.infrastructure.milvus_db import MilvusDbManager
+from src.infrastructure.vector_store import create_vector_store
+from src.infrastructure.embedding_cache import normalize_text
+from src.infrastructure.result_cache import QUERY_CACHE_ENABLED, get_query_result_cache
+from src.infrastructure.reranker import RERANK_DEFAULT, RERANK_MAX_CANDIDATES, get_reranker
 from src.service.split_md_into_chunks import match_explanation_pairs
 from src.service.keyword_generator import generate_keyword_for_query
 import os
 import json
 
+COLLECTION_NAME = "specs_architecture_v1"
+
+
+def _normalize_keywords(keywords):
+    return sorted({normalize_text(keyword) for keyword in keywords or [] if keyword and keyword.strip()})
+
+
 class SearchService:
     def __init__(self, processed_dir):
         self.processed_dir = processed_dir
+        self.result_cache = get_query_result_cache() if QUERY_CACHE_ENABLED else None
+
+    def _cached(self, compute, **params):
+        """
+        按请求参数和collection版本号缓存检索结果；入库/删除会递增版本号，使旧结果失效
+        compute返回 (结果, 是否完整)，检索超时或部分关键词失败、重排超时等不完整的结果不写入缓存
+        """
+        if self.result_cache is None:
+            return compute()[0]
+        key = self._cache_key(**params)
+        results = self.result_cache.get(key)
+        if results is not None:
+            return results
+        results, complete = compute()
+        if complete:
+            self.result_cache.put(key, results)
+        return results
+
+    def _cache_key(self, **params):
+        return self.result_cache.make_key(version=self.result_cache.version(COLLECTION_NAME), **params)
+
+    @staticmethod
+    def _filter_params(filter_type, top_n, threshold, source_files, years, search_profile, rerank):
+        return {
+            "filter_type": filter_type,
+            "top_n": top_n if filter_type == 'topN' else None,
+            "threshold": threshold if filter_type == 'threshold' else None,
+            "source_files": sorted(source_files or []),
+            "years": sorted(str(year) for year in years or []),
+            "search_profile": search_profile,
+            "rerank": rerank,
+        }
+
+    @staticmethod
+    def _rerank_pool(filter_type, top_n, rerank):
+        """
+        返回 (每个关键词的检索条数, 融合后保留的候选数)
+        topN模式启用重排时多取候选：每个关键词取max(top_n, RERANK_MAX_CANDIDATES)条，融合后保留同样多的候选交给重排，
+        使排在top_n之后的候选也有机会被重排提上来；其他情况不截断
+        """
+        if rerank and filter_type == 'topN':
+            pool = max(top_n, RERANK_MAX_CANDIDATES)
+            return pool, pool
+        return top_n, None
+
+    @staticmethod
+    def _finalize(query, results, rerank, top_n=None, complete=True):
+        """
+        过滤掉content为空的结果，按需用交叉编码器重排，重排后截断为前top_n个
+        complete为检索阶段结果是否完整；返回 (结果, 检索与重排是否都完整)
+        """
+        results = [result for result in results if result.get('content') and result.get('content').strip()]
+        if not rerank:
+            return results, complete
+        results, reranked = get_reranker().rerank(query, results)
+        return results[:top_n], complete and reranked
     
-    def search(self, query, model_name=None, limit=10):
+    def search(self, query, model_name=None, limit=10, source_files=None, years=None, search_profile=None,
+               rerank=None):
         """搜索接口"""
         if not query:
             raise ValueError('查询参数不能为空')
-        
-        manager = MilvusDbManager(collection_name="specs_architecture_v1")
-        results = manager.search(query,model_name, limit=limit)
-        
-        # 过滤掉content为空的结果
-        filtered_results = [result for result in results if result.get('content') and result.get('content').strip()]
-        
-        return filtered_results
+        rerank = RERANK_DEFAULT if rerank is None else bool(rerank)
+
+        def compute():
+            manager = create_vector_store(collection_name=COLLECTION_NAME)
+            pool, top_k = self._rerank_pool('topN', limit, rerank)
+            results, complete = manager.search(query,model_name, limit=pool, source_files=source_files, years=years,
+                                               search_profile=search_profile, top_k=top_k)
+            return self._finalize(query, results, rerank, top_n=limit, complete=complete)
+
+        return self._cached(
+            compute, kind="search", query=normalize_text(query), model_name=model_name,
+            **self._filter_params('topN', limit, None, source_files, years, search_profile, rerank)
+        )
+
+    def search_progressive(self, query, model_name=None, limit=10, source_files=None, years=None,
+                           search_profile=None, rerank=None):
+        """
+        渐进式搜索，依次产出 (阶段, 结果)：
+        initial 原始查询的结果，不等待关键词扩展；expanded 加入扩展关键词后的结果；
+        启用重排时前两个阶段产出候选中的前limit个，最后产出 reranked
+        最后产出的结果与search一致并写入同一缓存（检索或重排不完整的结果不写入），缓存命中时只产出 cached
+        """
+        if not query:
+            raise ValueError('查询参数不能为空')
+        rerank = RERANK_DEFAULT if rerank is None else bool(rerank)
+
+        key = None
+        if self.result_cache is not None:
+            key = self._cache_key(
+                kind="search", query=normalize_text(query), model_name=model_name,
+                **self._filter_params('topN', limit, None, source_files, years, search_profile, rerank)
+            )
+            results = self.result_cache.get(key)
+            if results is not None:
+                yield "cached", results
+                return
+
+        manager = create_vector_store(collection_name=COLLECTION_NAME)
+        pool, top_k = self._rerank_pool('topN', limit, rerank)
+        results, complete = [], True
+        for stage, results, complete in manager.search_progressive(
+                query, model_name, limit=pool, source_files=source_files, years=years,
+                search_profile=search_profile, top_k=top_k):
+            results, _ = self._finalize(query, results, False)
+            yield stage, results[:limit] if rerank else results
+        if rerank:
+            results, complete = self._finalize(query, results, True, top_n=limit, complete=complete)
+            yield "reranked", results
+        if key is not None and complete:
+            self.result_cache.put(key, results)
     
     def extract_keywords(self, query, model_name=None):
         """提取查询关键词的拆分结果"""
@@ -41,34 +150,53 @@ class SearchService:
                 "combinational_keywords": []
             }
     
-    def search_by_keywords(self, selected_keywords, filter_type='topN', top_n=10, threshold=0.7):
+    def search_by_keywords(self, selected_keywords, filter_type='topN', top_n=10, threshold=0.7,
+                           source_files=None, years=None, search_profile=None, rerank=None):
         """基于选定关键词进行检索，只使用tags_vector"""
         if not selected_keywords:
             raise ValueError('请选择至少一个关键词')
+        rerank = RERANK_DEFAULT if rerank is None else bool(rerank)
 
-        print("执行带参数的关键词检索")
-        manager = MilvusDbManager(collection_name="specs_architecture_v1")
-        results = manager.search_by_keywords_tags_only(selected_keywords, filter_type, top_n, threshold)
-        
-        # 过滤掉content为空的结果
-        filtered_results = [result for result in results if result.get('content') and result.get('content').strip()]
-        
-        return filtered_results
+        def compute():
+            print("执行带参数的关键词检索")
+            manager = create_vector_store(collection_name=COLLECTION_NAME)
+            pool, top_k = self._rerank_pool(filter_type, top_n, rerank)
+            results, complete = manager.search_by_keywords_tags_only(
+                selected_keywords, filter_type, pool, threshold, source_files=source_files, years=years,
+                search_profile=search_profile, top_k=top_k
+            )
+            return self._finalize(
+                " ".join(selected_keywords), results, rerank, top_n=top_n if top_k else None, complete=complete
+            )
+
+        return self._cached(
+            compute, kind="keywords", keywords=_normalize_keywords(selected_keywords),
+            **self._filter_params(filter_type, top_n, threshold, source_files, years, search_profile, rerank)
+        )
     
-    def search_with_settings(self, query, model_name, keywords=None, filter_type='topN', top_n=10, threshold=0.7):
+    def search_with_settings(self, query, model_name, keywords=None, filter_type='topN', top_n=10, threshold=0.7,
+                             source_files=None, years=None, search_profile=None, rerank=None):
         """带设置的搜索，支持混合检索时指定关键词"""
         try:
-            print("执行带参数的混合检索")
-            manager = MilvusDbManager(collection_name="specs_architecture_v1")
-            if keywords:
-                results = manager.search_with_keywords(query, keywords, filter_type, top_n, threshold)
-            else:
+            if not keywords:
                 raise ValueError('请选择至少一个关键词')
-            
-            # 过滤掉content为空的结果
-            filtered_results = [result for result in results if result.get('content') and result.get('content').strip()]
-            
-            return filtered_results
+            rerank = RERANK_DEFAULT if rerank is None else bool(rerank)
+
+            def compute():
+                print("执行带参数的混合检索")
+                manager = create_vector_store(collection_name=COLLECTION_NAME)
+                pool, top_k = self._rerank_pool(filter_type, top_n, rerank)
+                results, complete = manager.search_with_keywords(
+                    query, keywords, filter_type, pool, threshold, source_files=source_files, years=years,
+                    search_profile=search_profile, top_k=top_k
+                )
+                return self._finalize(query, results, rerank, top_n=top_n if top_k else None, complete=complete)
+
+            return self._cached(
+                compute, kind="settings", query=normalize_text(query), keywords=_normalize_keywords(keywords),
+                model_name=model_name,
+                **self._filter_params(filter_type, top_n, threshold, source_files, years, search_profile, rerank)
+            )
         except Exception as e:
             print(f"搜索失败: {e}")
             raise e
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from src.infrastructure.embedding_registry import get_embedding_model
+from src.infrastructure.milvus_db import DEFAULT_QWEN_DIM, EMBEDDING_TEXT_FIELDS
+
+STORAGE_DIMS = [256, 512, 768, 1024]
+STORAGE_DTYPES = {"float32": 4, "float16": 2}
+# HNSW 第0层每个节点约 2*M 个int32邻居
+HNSW_M = 16
+
+
+def load_corpus(processed_dir="processed_pdfs"):
+    """返回 (查询文本列表, 文档文本列表)：生成的问题作为查询，content作为文档"""
+    queries, documents = [], []
+    if os.path.exists(processed_dir):
+        for filename in sorted(os.listdir(processed_dir)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            for chunk in info.get('chunks', []):
+                if chunk.get('content'):
+                    documents.append(chunk['content'])
+                queries.extend(q for q in [chunk.get('question1'), chunk.get('question2')] if q)
+    return queries, documents
+
+
+def reduce_vectors(vectors, dim, dtype):
+    """按存储模式截断、归一化并量化，再转回float32用于计算"""
+    reduced = vectors[:, :dim]
+    reduced = reduced / np.maximum(np.linalg.norm(reduced, axis=1, keepdims=True), 1e-12)
+    return reduced.astype(dtype).astype(np.float32)
+
+
+def top_k(queries, documents, k):
+    scores = queries @ documents.T
+    k = min(k, documents.shape[0])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row) for row in idx]
+
+
+def build_report(queries, documents, k=10):
+    model = get_embedding_model()
+    query_vectors = np.asarray(model.encode(queries, normalize_embeddings=True), dtype=np.float32)
+    document_vectors = np.asarray(model.encode(documents, normalize_embeddings=True), dtype=np.float32)
+    baseline = top_k(query_vectors, document_vectors, k)
+
+    report = []
+    for dim in STORAGE_DIMS:
+        if dim > query_vectors.shape[1]:
+            continue
+        for dtype, dtype_bytes in STORAGE_DTYPES.items():
+            results = top_k(reduce_vectors(query_vectors, dim, dtype), reduce_vectors(document_vectors, dim, dtype), k)
+            recall = np.mean([len(a & b) / len(b) for a, b in zip(results, baseline)])
+            raw_bytes = dim * dtype_bytes * len(EMBEDDING_TEXT_FIELDS)
+            graph_bytes = 2 * HNSW_M * 4 * len(EMBEDDING_TEXT_FIELDS)
+            report.append({
+                "dim": dim,
+                "dtype": dtype,
+                f"recall@{k}": round(float(recall), 4),
+                "vector_bytes_per_chunk": raw_bytes,
+                "with_hnsw_bytes_per_chunk": raw_bytes + graph_bytes,
+                "memory_ratio": round(raw_bytes / (DEFAULT_QWEN_DIM * 4 * len(EMBEDDING_TEXT_FIELDS)), 3),
+            })
+    return report
+
+
+if __name__ == '__main__':
+    queries, documents = load_corpus()
+    if not queries or not documents:
+        print("processed_pdfs 中没有可用的chunk，无法生成报告")
+        sys.exit(1)
+    print(f"查询 {len(queries)} 条，文档 {len(documents)} 条")
+    for row in build_report(queries, documents):
+        print(json.dumps(row, ensure_ascii=False))
@@ -1,6 +1,12 @@
+import threading
+
 import yaml
 import os
 
+# 解析后的配置按 (路径, 修改时间, 大小) 缓存，文件被改写后自动重新读取
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
 
 def load_config(path="config/llm_config.yaml"):
     """
@@ -8,11 +14,29 @@ def load_config(path="config/llm_config.yaml"):
     """
     if not os.path.exists(path):
         return {}
-    
+
+    stat = os.stat(path)
+    cache_key = os.path.abspath(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _config_cache_lock:
+        cached = _config_cache.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
     with open(path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
-    
-    return config or {}
+        config = yaml.safe_load(f) or {}
+
+    with _config_cache_lock:
+        _config_cache[cache_key] = (signature, config)
+    return config
+
+def invalidate_config_cache(path=None):
+    """配置文件被改写后调用；path为空时清空全部缓存"""
+    with _config_cache_lock:
+        if path is None:
+            _config_cache.clear()
+        else:
+            _config_cache.pop(os.path.abspath(path), None)
 
 def get_first_model_key(path="config/llm_config.yaml"):
     """
@@ -71,6 +95,11 @@ def get_all_models(path="config/llm_config.yaml", active_key=None):
 
 def get_current_model_config(model_name=None):
     """获取当前活跃的模型配置"""
+    model_config = resolve_model_config(model_name)
+    return model_config['api_key'], model_config['base_url'], model_config['model_type']
+
+def resolve_model_config(model_name=None):
+    """获取指定或当前活跃的模型配置，返回包含模型键值的字典"""
     config_path = os.path.join(os.getcwd(), 'config', 'llm_config.yaml')
 
     # 如果指定了模型名称，使用指定的模型
@@ -78,7 +107,7 @@ def get_current_model_config(model_name=None):
         model_config = get_model_config_by_key(model_name, config_path)
         if not model_config:
             raise ValueError(f'模型配置 {model_name} 不存在')
-        return model_config['api_key'], model_config['base_url'], model_config['model_type']
+        return model_config
     
     # 如果没指定模型，回退到配置文件方式
     active_model_key = get_active_model_key(config_path)
@@ -91,7 +120,7 @@ def get_current_model_config(model_name=None):
     if not model_config:
         raise ValueError(f'模型配置 {active_model_key} 不存在')
 
-    return model_config['api_key'], model_config['base_url'], model_config['model_type']
+    return model_config
 
 def collect_stream(generator):
     """
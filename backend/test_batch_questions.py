@@ -0,0 +1,69 @@
+"""
+批量问题生成：按token预算分组，以及对截断、夹带说明文字等不规范输出的解析
+"""
+import json
+
+from src.service.question_generator import (
+    _OUTPUT_TOKENS_PER_CHUNK, _format_chunk, estimate_tokens, pack_batches, parse_batch_answer
+)
+
+
+def item(index, **extra):
+    return {"index": index, "question1": f"问题{index}", "question2": "", "question3": "", "tags": "保温", **extra}
+
+
+def fields(index):
+    result = item(index)
+    result.pop("index")
+    return result
+
+
+def test_parse_clean_array_with_surrounding_text():
+    text = "以下是结果：\n```json\n" + json.dumps([item(0), item(1)], ensure_ascii=False) + "\n```\n完毕"
+    assert parse_batch_answer(text, 2) == {0: fields(0), 1: fields(1)}
+
+
+def test_parse_dict_keyed_by_index_and_single_object():
+    keyed = {str(i): {k: v for k, v in item(i).items() if k != "index"} for i in range(2)}
+    assert parse_batch_answer(json.dumps(keyed, ensure_ascii=False), 2) == {0: fields(0), 1: fields(1)}
+    assert parse_batch_answer(json.dumps(item(1), ensure_ascii=False), 2) == {1: fields(1)}
+
+
+def test_parse_truncated_output_keeps_complete_objects():
+    text = json.dumps([item(0), item(1), item(2)], ensure_ascii=False)
+    truncated = text[:text.index('"index": 2') + 20]
+    assert parse_batch_answer(truncated, 3) == {0: fields(0), 1: fields(1)}
+
+
+def test_parse_drops_invalid_duplicate_and_out_of_range_items():
+    items = [item(0), item(0, tags="重复"), item(5), {"index": 1, "tags": "缺少问题"}, {"question1": "缺少编号"}, item("x")]
+    assert parse_batch_answer(json.dumps(items, ensure_ascii=False), 3) == {0: fields(0)}
+
+
+def test_parse_garbage_returns_nothing():
+    assert parse_batch_answer("抱歉，无法生成问题。", 2) == {}
+    assert parse_batch_answer('{"index": 0, "question1": "未闭合', 2) == {}
+    assert parse_batch_answer("", 2) == {}
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("保温砂浆") == 4
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens(None) == 0
+
+
+def test_pack_batches_respects_token_budget_and_order():
+    chunks = [{"content": "保温" * 100} for _ in range(5)]
+    cost = estimate_tokens(_format_chunk(0, chunks[0])) + _OUTPUT_TOKENS_PER_CHUNK
+    # 预算够放两个chunk，不够放三个
+    batches = pack_batches(chunks, token_budget=cost * 5 // 2, max_chunks=10)
+    assert batches == [[0, 1], [2, 3], [4]]
+    assert [i for batch in batches for i in batch] == list(range(5))
+
+
+def test_pack_batches_respects_max_chunks_and_isolates_oversized_chunks():
+    small = {"content": "短"}
+    assert pack_batches([small] * 5, token_budget=10000, max_chunks=2) == [[0, 1], [2, 3], [4]]
+
+    huge = {"content": "保温" * 5000}
+    assert pack_batches([small, huge, small], token_budget=1000, max_chunks=8) == [[0], [1], [2]]
@@ -0,0 +1,178 @@
+"""
+NearDuplicateIndex：SimHash距离、分段分桶查找、批内与跨文档标记重复、删除来源与持久化；
+按引用方来源文件/年份过滤的检索能找到链接的规范chunk
+"""
+import json
+
+from conftest import make_chunks
+from src.infrastructure.dedup_index import (
+    SIMHASH_BANDS, SIMHASH_MAX_DISTANCE, NearDuplicateIndex, _BAND_BITS, get_dedup_index, key_tokens, simhash
+)
+
+TEXT = (
+    "外墙外保温系统应能适应基层的正常变形而不产生裂缝或空鼓，应能长期承受自重而不产生有害的变形，"
+    "应能承受风荷载的作用而不产生破坏，应能耐受室外气候的长期反复作用而不产生破坏，在罕遇地震发生时不应从基层上脱落。"
+)
+EDITED = TEXT.replace("裂缝", "裂纹")
+CLAUSE = (
+    "外墙外保温系统应能适应基层的正常变形而不产生裂缝或空鼓，应能长期承受自重而不产生有害的变形，保温层厚度不应小于300mm，"
+    "应能承受风荷载的作用而不产生破坏，应能耐受室外气候的长期反复作用而不产生破坏，在罕遇地震发生时不应从基层上脱落。"
+)
+OTHER = (
+    "屋面防水工程应根据建筑物的类别、重要程度、使用功能要求确定防水等级，并应按相应等级进行防水设防，"
+    "对防水有特殊要求的建筑屋面应进行专项防水设计。"
+)
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def flip_bits_in_bands(fingerprint, count):
+    """在count个不同分段中各翻转一位"""
+    for band in range(count):
+        fingerprint ^= 1 << (band * _BAND_BITS)
+    return fingerprint
+
+
+def test_simhash_distance_separates_near_and_unrelated_text():
+    assert simhash(TEXT) == simhash(" ".join(TEXT))
+    assert distance(simhash(TEXT), simhash(EDITED)) <= SIMHASH_MAX_DISTANCE
+    assert distance(simhash(TEXT), simhash(OTHER)) > 2 * SIMHASH_MAX_DISTANCE
+    assert simhash("第3.2.1条") is None
+
+
+def test_find_uses_bands_up_to_max_distance(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    base = simhash(TEXT)
+    index._add_entry(7, base, "a.pdf")
+
+    # 距离等于阈值时至少有一段完全相同，能在桶中找到
+    assert index.find(flip_bits_in_bands(base, SIMHASH_MAX_DISTANCE)) == 7
+    # 每段都不同的指纹不会成为候选
+    assert index.find(flip_bits_in_bands(base, SIMHASH_BANDS)) is None
+    assert index.find(simhash(OTHER)) is None
+    assert index.find(None) is None
+
+
+def test_find_prefers_closest_entry(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    base = simhash(TEXT)
+    index._add_entry(1, flip_bits_in_bands(base, 3), "a.pdf")
+    index._add_entry(2, flip_bits_in_bands(base, 1), "b.pdf")
+    assert index.find(base) == 2
+
+
+def test_mark_duplicates_within_batch_and_against_index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    index.register([100], [{"content": OTHER}], "old.pdf")
+
+    chunks = [{"content": TEXT}, {"content": "短内容"}, {"content": EDITED}, {"content": OTHER, "duplicate_of": 5}]
+    assert index.mark_duplicates(chunks) == 2
+    assert "duplicate_of" not in chunks[0] and "duplicate_of_chunk" not in chunks[0]
+    assert "duplicate_of_chunk" not in chunks[1]
+    assert chunks[2]["duplicate_of_chunk"] == 0
+    assert chunks[3]["duplicate_of"] == 100
+
+
+def test_value_or_negation_change_is_not_duplicate(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    index.register([1], [{"content": CLAUSE}], "a.pdf")
+
+    changed = [
+        CLAUSE.replace("300mm", "500mm"),
+        CLAUSE.replace("不应小于", "不应大于"),
+        CLAUSE.replace("应能长期", "不应长期"),
+    ]
+    for text in changed:
+        # SimHash本身无法区分，由关键词序列否决
+        assert distance(simhash(CLAUSE), simhash(text)) <= SIMHASH_MAX_DISTANCE
+        assert key_tokens(text) != key_tokens(CLAUSE)
+
+    chunks = [{"content": text} for text in changed] + [{"content": CLAUSE.replace("裂缝", "裂纹")}]
+    assert index.mark_duplicates(chunks) == 1
+    assert all("duplicate_of" not in chunk and "duplicate_of_chunk" not in chunk for chunk in chunks[:3])
+    assert chunks[3]["duplicate_of"] == 1
+
+    # 同一文档中只差一个数值的两条也都保留
+    batch = [{"content": CLAUSE}, {"content": changed[0]}]
+    assert NearDuplicateIndex(None).mark_duplicates(batch) == 0
+
+
+def test_delete_source_returns_orphaned_referrers(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    index.register([1, 2], [{"content": TEXT}, {"content": OTHER}], "a.pdf")
+    index.link(1, "b.pdf")
+    index.link(1, "a.pdf")
+    index.link(2, "c.pdf")
+
+    orphans = index.delete_source(["a.pdf", "c.pdf"])
+    assert orphans == {"b.pdf": {1}}
+    assert len(index) == 0
+    assert index.find(simhash(TEXT)) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "d.json")
+    index = NearDuplicateIndex(path)
+    index.register([1, 2], [{"content": TEXT}, {"content": OTHER}], "a.pdf")
+    index.link(2, "b.pdf", "2020")
+    index.save()
+
+    loaded = NearDuplicateIndex(path)
+    assert len(loaded) == 2
+    assert loaded.find(simhash(EDITED), key_tokens(EDITED)) == 1
+    assert loaded.linked(years=[2020]) == {2: "a.pdf"}
+    assert loaded.delete_source(["a.pdf"]) == {"b.pdf": {2}}
+
+    loaded.clear()
+    assert len(NearDuplicateIndex(path)) == 0
+
+
+def test_legacy_entries_without_tokens_are_not_confirmed(tmp_path):
+    path = tmp_path / "d.json"
+    path.write_text(json.dumps([[1, simhash(TEXT), "a.pdf", ["b.pdf"]]]), encoding="utf-8")
+
+    index = NearDuplicateIndex(str(path))
+    assert index.find(simhash(TEXT)) == 1
+    assert index.find(simhash(TEXT), key_tokens(TEXT)) is None
+    assert index.linked(["b.pdf"]) == {1: "a.pdf"}
+    assert index.delete_source(["a.pdf"]) == {"b.pdf": {1}}
+
+
+def test_linked_matches_referrer_source_and_year(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.json"))
+    index.register([1, 2], [{"content": TEXT}, {"content": OTHER}], "a.pdf")
+    index.link(1, "b.pdf", "2020")
+    index.link(2, "c.pdf", "2021")
+
+    assert index.linked() == {}
+    assert index.linked(["b.pdf"]) == {1: "a.pdf"}
+    assert index.linked(["b.pdf", "c.pdf"], years=["2021"]) == {2: "a.pdf"}
+    assert index.linked(years=[2020, 2021]) == {1: "a.pdf", 2: "a.pdf"}
+    assert index.linked(["a.pdf"]) == {}
+
+    index.delete_source(["b.pdf"])
+    assert index.linked(["b.pdf"]) == {}
+    assert index.linked(["c.pdf"]) == {2: "a.pdf"}
+
+
+def test_search_filtered_by_referrer_finds_linked_canonical(local_store):
+    store = local_store()
+    chunks = make_chunks(3, "a.pdf")
+    for chunk, text in zip(chunks, [TEXT, CLAUSE, OTHER]):
+        chunk["content"] = text
+    ids = store.bulk_insert(chunks)["ids"]
+    # b.pdf 中与第1条重复的chunk未写入，只链接到a.pdf的规范chunk
+    dedup = get_dedup_index("test")
+    dedup.register(ids, chunks, "a.pdf")
+    dedup.link(ids[1], "b.pdf", "2020")
+
+    def search_ids(**filters):
+        results, _ = store.search_with_keywords(CLAUSE, ["问题1"], top_n=5, **filters)
+        return {result["id"] for result in results}
+
+    assert search_ids(source_files=["b.pdf"]) == {ids[1]}
+    assert search_ids(years=[2020]) == {ids[1]}
+    assert search_ids(source_files=["b.pdf"], years=[2012]) == set()
+    assert search_ids(source_files=["a.pdf", "b.pdf"]) == set(ids)
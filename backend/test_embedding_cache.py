@@ -0,0 +1,72 @@
+"""
+EmbeddingCache：条目数在内存中维护，越过上限才淘汰；命中的访问时间批量写回
+"""
+import numpy as np
+
+from src.infrastructure import embedding_cache
+from src.infrastructure.embedding_cache import EmbeddingCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache.time, "time", clock)
+    cache = EmbeddingCache("model", 4, path=str(tmp_path / "embeddings.sqlite"), **kwargs)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    return cache, clock, statements
+
+
+def vectors(n, start=0):
+    return [np.full(4, i, dtype=np.float32) for i in range(start, start + n)]
+
+
+def test_put_and_get_do_not_count_rows_or_write_per_hit(tmp_path, monkeypatch):
+    cache, _, statements = make_cache(tmp_path, monkeypatch, max_entries=100, touch_batch=5)
+    texts = [f"文本{i}" for i in range(5)]
+    cache.put_many(texts, vectors(5))
+    cache.put_many(texts[:2], vectors(2))
+
+    hits = cache.get_many(texts[:4] + ["未缓存"])
+    assert sorted(hits) == [0, 1, 2, 3]
+    assert hits[2].tolist() == [2.0] * 4
+    assert not any("COUNT(*)" in sql or sql.startswith("UPDATE") for sql in statements)
+    assert cache.stats() == {"hits": 4, "misses": 1, "hit_rate": 0.8, "entries": 5, "max_entries": 100}
+
+    # 积累到touch_batch个命中键后批量写回（trace对executemany的每一行各记录一次）
+    cache.get_many(["文本4"])
+    assert sum(sql.startswith("UPDATE") for sql in statements) == 5
+    assert statements[-1] == "COMMIT"
+
+
+def test_eviction_keeps_recently_accessed_entries(tmp_path, monkeypatch):
+    cache, clock, _ = make_cache(tmp_path, monkeypatch, max_entries=10, touch_batch=1000)
+    cache.put_many([f"旧{i}" for i in range(10)], vectors(10))
+    clock.now += 1
+    cache.get_many(["旧0", "旧1"])
+
+    clock.now += 1
+    cache.put_many(["新"], vectors(1))
+
+    # 越过上限后淘汰到90%，访问时间在淘汰前写回
+    assert cache.stats()["entries"] == 9
+    assert sorted(cache.get_many(["旧0", "旧1", "旧2", "新"])) == [0, 1, 3]
+    cache.close()
+    assert EmbeddingCache("model", 4, path=str(tmp_path / "embeddings.sqlite")).stats()["entries"] == 9
+
+
+def test_stats_are_logged_periodically(tmp_path, monkeypatch, capsys):
+    cache, clock, _ = make_cache(tmp_path, monkeypatch, stats_interval=60)
+    cache.get_many(["文本"])
+    assert "Embedding cache" not in capsys.readouterr().out
+
+    clock.now += 61
+    cache.get_many(["文本"])
+    assert "0 hits, 2 misses" in capsys.readouterr().out
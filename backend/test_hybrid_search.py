@@ -0,0 +1,90 @@
+"""
+hybrid检索模式的分数方向与阈值语义：分数越高越相关，阈值模式保留加权分数不低于阈值的结果
+使用假的Collection句柄，不需要Milvus服务
+"""
+
+from src.infrastructure.milvus_db import MilvusDbManager
+
+
+class FakeHit:
+    def __init__(self, id, distance):
+        self.id = id
+        self.distance = distance
+        self.entity = {"content": f"内容{id}"}
+
+
+class FakeCollection:
+    def __init__(self, hits):
+        self.hits = hits
+        self.search_params = []
+
+    def search(self, data, anns_field, param, limit, output_fields, expr=None, partition_names=None):
+        self.search_params.append(param)
+        radius = param.get("params", {}).get("radius")
+        offset = param.get("offset", 0)
+        hits = [hit for hit in self.hits if radius is None or hit.distance > radius]
+        return [hits[offset:offset + limit] for _ in data]
+
+    def hybrid_search(self, reqs, rerank, limit, output_fields, partition_names=None):
+        return [self.hits[:limit] for _ in reqs[0].data]
+
+
+class FakeConnection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def run(self, collection_name, func):
+        return func(self.collection)
+
+
+def make_manager(hits):
+    manager = MilvusDbManager.__new__(MilvusDbManager)
+    manager.collection_name = "test"
+    manager.connection = FakeConnection(FakeCollection(hits))
+    manager.two_phase = False
+    manager.fusion_strategy = "max"
+    manager.per_keyword_top_n = 0
+    return manager
+
+
+HITS = [FakeHit(1, 0.9), FakeHit(2, 0.6), FakeHit(3, 0.3)]
+PARAMS = {"metric_type": "COSINE", "params": {}}
+
+
+def test_single_field_topn_sorted_by_similarity_descending():
+    manager = make_manager(HITS)
+    results = manager._search_hybrid(
+        ["保温"], [[0.0]], {"tags_vector": 1.0}, 10, "topN", 0.7, {}, {"tags_vector": PARAMS}
+    )
+    assert [r["id"] for r in results] == [1, 2, 3]
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_single_field_threshold_keeps_weighted_scores_above_threshold():
+    manager = make_manager(HITS)
+    results = manager._search_hybrid(
+        ["保温"], [[0.0]], {"tags_vector": 2.0}, 10, "threshold", 1.0, {}, {"tags_vector": PARAMS}
+    )
+    # radius = 阈值 / 权重 = 0.5
+    assert manager.connection.collection.search_params[0]["params"]["radius"] == 0.5
+    assert [r["id"] for r in results] == [1, 2]
+    assert all(r["score"] >= 1.0 for r in results)
+
+
+def test_single_field_threshold_unreachable_returns_nothing():
+    manager = make_manager(HITS)
+    results = manager._search_hybrid(
+        ["保温"], [[0.0]], {"tags_vector": 0.5}, 10, "threshold", 0.7, {}, {"tags_vector": PARAMS}
+    )
+    assert results == []
+
+
+def test_multi_field_threshold_drops_scores_below_threshold():
+    manager = make_manager(HITS)
+    weights = {"tags_vector": 1.8, "content_vector": 1.5}
+    results = manager._search_hybrid(
+        ["保温", "砂浆"], [[0.0], [1.0]], weights, 10, "threshold", 0.5, {},
+        {field: PARAMS for field in weights}
+    )
+    assert [r["id"] for r in results] == [1, 2]
+    assert all(r["score"] >= 0.5 for r in results)
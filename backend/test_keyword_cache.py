@@ -0,0 +1,75 @@
+"""
+KeywordExpansionCache：查询归一化、模板哈希、TTL过期与按最近访问时间淘汰
+"""
+from src.infrastructure import keyword_cache
+from src.infrastructure.keyword_cache import KeywordExpansionCache, normalize_query, template_hash
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(keyword_cache.time, "time", clock)
+    return KeywordExpansionCache(str(tmp_path / "keywords.sqlite"), **kwargs), clock
+
+
+def test_equivalent_queries_share_a_key():
+    assert normalize_query("  外墙  保温？") == normalize_query("外墙 保温")
+    assert normalize_query("ＧＢ５００１６！") == "gb50016"
+    key = KeywordExpansionCache.make_key("model", template_hash("模板"), "外墙 保温。")
+    assert key == KeywordExpansionCache.make_key("model", template_hash("模板"), "外墙　保温")
+    assert key != KeywordExpansionCache.make_key("model", template_hash("新模板"), "外墙 保温")
+    assert key != KeywordExpansionCache.make_key("other", template_hash("模板"), "外墙 保温")
+
+
+def test_get_returns_stored_value_and_counts_hits(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    value = {"material_keywords": ["岩棉"], "functional_keywords": []}
+    assert cache.get("k") is None
+    cache.put("k", value)
+    assert cache.get("k") == value
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl=60)
+    cache.put("k", ["岩棉"])
+    clock.now += 59
+    assert cache.get("k") == ["岩棉"]
+    clock.now += 1
+    assert cache.get("k") is None
+
+    # 写入时顺带清理过期条目
+    cache.put("other", ["砂浆"])
+    assert cache.stats()["entries"] == 1
+
+
+def test_eviction_drops_least_recently_accessed(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=10)
+    for i in range(10):
+        cache.put(f"k{i}", [i])
+        clock.now += 1
+    assert cache.get("k0") == [0]
+    clock.now += 1
+
+    # 超出上限后淘汰到上限的90%
+    cache.put("k10", [10])
+    assert cache.stats()["entries"] == 9
+    assert cache.get("k0") == [0]
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert cache.get("k10") == [10]
+
+
+def test_entries_persist_across_instances(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("k", ["岩棉"])
+    assert KeywordExpansionCache(cache.path).get("k") == ["岩棉"]
+    cache.clear()
+    assert cache.get("k") is None
@@ -0,0 +1,103 @@
+"""
+LexicalIndex：分词、差值编码倒排表、BM25排序、删除与压缩、持久化
+"""
+import numpy as np
+
+from conftest import make_chunks
+from src.infrastructure.lexical_index import LexicalIndex, tokenize
+
+
+def chunk(content, source_file="a.pdf", year="2012", **fields):
+    return {"content": content, "source_file": source_file, "year": year, **fields}
+
+
+def test_tokenize_keeps_standard_and_clause_numbers():
+    tokens = tokenize("按 GB 50016-2014 第5.2.3条执行")
+    assert "gb50016-2014" in tokens and "gb50016" in tokens
+    assert "5.2.3" in tokens
+    assert "执行" in tokens
+
+
+def test_bm25_ranks_more_specific_documents_higher(tmp_path):
+    index = LexicalIndex(str(tmp_path / "i.npz"))
+    index.add_documents([10, 11, 12], [
+        chunk("岩棉板 岩棉板 外墙保温"),
+        chunk("岩棉板用于屋面，另有大量与岩棉无关的描述文字用于拉长文档长度" * 3),
+        chunk("石膏砂浆"),
+    ])
+    results = index.search("岩棉板", limit=10)
+    assert [chunk_id for chunk_id, _ in results] == [10, 11]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_postings_are_delta_encoded_across_batches(tmp_path):
+    index = LexicalIndex(str(tmp_path / "i.npz"))
+    index.add_documents([1, 2], [chunk("保温砂浆"), chunk("无关")])
+    index.add_documents([3, 4], [chunk("无关"), chunk("保温砂浆")])
+    deltas, tfs = index._postings["保温"]
+    assert deltas.dtype == np.uint32 and tfs.dtype == np.uint16
+    assert list(np.cumsum(deltas)) == [0, 3]
+    assert {chunk_id for chunk_id, _ in index.search("保温砂浆")} == {1, 4}
+
+
+def test_filters_delete_and_compact(tmp_path):
+    index = LexicalIndex(str(tmp_path / "i.npz"))
+    index.add_documents([1, 2, 3], [
+        chunk("保温砂浆", "a.pdf", "2012"), chunk("保温砂浆", "b.pdf", "2015"), chunk("保温砂浆", "c.pdf", "2015"),
+    ])
+    assert {i for i, _ in index.search("保温砂浆", source_files=["b.pdf"])} == {2}
+    assert {i for i, _ in index.search("保温砂浆", years=[2015])} == {2, 3}
+
+    index.delete_source(["a.pdf", "b.pdf"])
+    # 删除占比超过阈值后压缩，文档重新编号
+    assert len(index._doc_ids) == 1
+    assert [i for i, _ in index.search("保温砂浆")] == [3]
+    index.add_documents([4], [chunk("保温砂浆", "d.pdf")])
+    assert {i for i, _ in index.search("保温砂浆")} == {3, 4}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "i.npz")
+    index = LexicalIndex(path)
+    index.add_documents([5, 6], [chunk("JGJ289-2012 建筑外墙防水"), chunk("屋面防水卷材", title="防水")])
+    index.save()
+
+    loaded = LexicalIndex(path)
+    assert loaded.search("防水") == index.search("防水")
+    assert loaded.search("jgj289") == [(5, index.search("jgj289")[0][1])]
+    loaded.add_documents([7], [chunk("防水涂料")])
+    assert {i for i, _ in loaded.search("防水")} == {5, 6, 7}
+
+
+def test_search_hits_normalized_to_top_hit(tmp_path):
+    index = LexicalIndex(str(tmp_path / "i.npz"))
+    index.add_documents([1, 2], [chunk("保温 保温 保温"), chunk("保温 砂浆 其他 内容")])
+    hits = index.search_hits("保温")
+    assert hits[0].distance == 1.0
+    assert 0 < hits[1].distance < 1.0
+
+
+def test_tags_only_search_excludes_lexical_content_matches(local_store):
+    store = local_store()
+    chunks = make_chunks(20)
+    chunks[3]["content"] = "玻璃棉板只出现在正文中"
+    store.bulk_insert(chunks)
+
+    results, _ = store.search_by_keywords_tags_only(["玻璃棉板"], top_n=5)
+    assert results and all(result["field"] == "tags_vector" for result in results)
+
+    mixed, _ = store.search_with_keywords("玻璃棉板", [], top_n=5)
+    assert mixed[0]["id"] == 3 and mixed[0]["field"] == "lexical"
+
+
+def test_insert_chunk_updates_lexical_index(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(5))
+    chunk = make_chunks(1, source_file="b.pdf", start=5)[0]
+    chunk["content"] = "憎水膨胀珍珠岩板的导热系数"
+
+    ids = store.insert_chunk(chunk)
+
+    assert [chunk_id for chunk_id, _ in store.lexical.search("憎水膨胀珍珠岩")] == ids
+    results, _ = store.search_with_keywords("憎水膨胀珍珠岩", [], top_n=3)
+    assert results[0]["id"] == ids[0] and results[0]["field"] == "lexical"
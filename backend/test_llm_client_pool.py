@@ -0,0 +1,27 @@
+"""
+LLMClientPool：各模块经同一导入路径共用一个客户端池，模型配置变化后的失效对所有调用方生效；
+失效的客户端只从池中移除，不关闭其他线程可能正在使用的连接
+"""
+from src.infrastructure import envoke_llm
+from src.service import chat_service, keyword_generator, question_generator
+
+
+def test_llm_callers_share_one_client_pool_module():
+    # 以 backend.src 导入会得到另一份模块对象和另一个客户端池，配置变化后的失效无法覆盖
+    assert question_generator.LLMAPIFactory is envoke_llm.LLMAPIFactory
+    assert keyword_generator.LLMAPIFactory is envoke_llm.LLMAPIFactory
+    assert chat_service.LLMAPIFactory is envoke_llm.LLMAPIFactory
+
+
+def test_stale_clients_are_dropped_but_not_closed():
+    pool = envoke_llm.LLMClientPool()
+    old = pool.get("model", "http://old.invalid/v1", "key")
+    assert pool.get("model", "http://old.invalid/v1", "key") is old
+
+    # 配置修改后取到新客户端，旧客户端仍可完成进行中的请求
+    new = pool.get("model", "http://new.invalid/v1", "key")
+    assert new is not old and len(pool) == 1
+    assert not old._client.is_closed
+
+    assert pool.invalidate("model") == 1
+    assert len(pool) == 0 and not new._client.is_closed
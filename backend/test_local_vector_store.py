@@ -0,0 +1,101 @@
+"""
+LocalVectorStore：同一目录的并发写入不分配重复主键、不覆盖已写入的向量；未flush退出后重新打开可恢复
+"""
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import make_chunks
+from src.infrastructure import local_vector_store
+from src.infrastructure.local_vector_store import LocalVectorStore, get_local_vector_store
+from src.infrastructure.vector_store import create_vector_store
+
+
+def _content_vector(store, row_id):
+    return np.asarray(store._vectors["content_vector"][row_id])
+
+
+def test_two_instances_on_same_directory_do_not_reuse_ids(local_store, tmp_path):
+    store_a = local_store()
+    store_a.bulk_insert(make_chunks(3, "a.pdf"))
+    before = _content_vector(store_a, 1).copy()
+
+    store_b = LocalVectorStore("test", root_dir=str(tmp_path / "store"))
+    store_b._ensure_open()
+    ids_a = store_a.bulk_insert(make_chunks(3, "a.pdf", start=3))["ids"]
+    ids_b = store_b.bulk_insert(make_chunks(3, "b.pdf", start=6))["ids"]
+
+    assert len(set(ids_a) | set(ids_b)) == 6
+    assert not set(ids_a) & set(ids_b)
+
+    reopened = LocalVectorStore("test", root_dir=str(tmp_path / "store"))
+    reopened._ensure_open()
+    assert np.allclose(_content_vector(reopened, 1), before)
+    count = reopened._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+    assert count == 9
+
+
+def test_failed_insert_does_not_touch_vectors(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(2))
+    before = _content_vector(store, 1).copy()
+    # 模拟计数落后于SQLite：分配的主键会以SQLite为准，不会覆盖第1行
+    store._count = 1
+    ids = store.bulk_insert(make_chunks(1, start=5))["ids"]
+    assert ids == [2]
+    assert np.allclose(_content_vector(store, 1), before)
+
+
+def test_create_vector_store_shares_one_instance_per_directory(tmp_path, monkeypatch, isolated_indexes, fake_embeddings):
+    monkeypatch.setattr(local_vector_store, "_stores", {})
+    root_dir = str(tmp_path / "shared")
+    store = create_vector_store("test", backend="local", root_dir=root_dir)
+    assert create_vector_store("test", backend="local", root_dir=root_dir) is store
+    assert get_local_vector_store("other", root_dir=root_dir) is not store
+
+
+def test_concurrent_ingest_through_factory(tmp_path, monkeypatch, isolated_indexes, fake_embeddings):
+    monkeypatch.setattr(local_vector_store, "_stores", {})
+    root_dir = str(tmp_path / "concurrent")
+    results, errors = [], []
+
+    def ingest(source_file):
+        try:
+            store = create_vector_store("test", backend="local", root_dir=root_dir)
+            store.initialize()
+            results.append(store.bulk_insert(make_chunks(20, source_file), batch_size=5)["ids"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(f"{i}.pdf",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    all_ids = [chunk_id for ids in results for chunk_id in ids]
+    assert len(all_ids) == 80 and len(set(all_ids)) == 80
+
+
+def test_reopen_recovers_rows_written_after_last_flush(local_store, tmp_path):
+    pytest.importorskip("hnswlib")
+    store = local_store(index_type="hnsw")
+    store.bulk_insert(make_chunks(10))
+    # 写入后未flush即退出：超过初始容量的文件已扩容，meta与HNSW图仍停留在上次flush
+    chunks = make_chunks(local_vector_store.INITIAL_CAPACITY + 10, "b.pdf", start=10)
+    ids = store._insert_rows(store.build_insert_data_batch(chunks))
+
+    reopened = LocalVectorStore("test", root_dir=str(tmp_path / "store"), index_type="hnsw")
+    reopened._ensure_open()
+
+    assert reopened._count == ids[-1] + 1
+    assert reopened._capacity >= reopened._count
+    query = store.encoder.encode_batch([chunks[-1]["content"]])
+    hits = reopened._ann_search("content_vector", query, 1, [])[0]
+    assert hits[0].id == ids[-1]
+    # 补入后已落盘，再次打开无需重复补入
+    with open(reopened._meta_path(), encoding="utf-8") as f:
+        assert json.load(f)["count"] == reopened._count
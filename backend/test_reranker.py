@@ -0,0 +1,149 @@
+"""
+CrossEncoderReranker：时间预算不含模型加载、超时结果标记为不完整且不写入查询缓存、不修改传入的结果
+使用假的CrossEncoder，不需要下载模型
+"""
+import time
+
+from src.infrastructure.reranker import RERANK_MAX_CANDIDATES, CrossEncoderReranker
+from src.infrastructure.result_cache import QueryResultCache
+from src.service import search_service
+from src.service.search_service import SearchService
+
+
+class FakeCrossEncoder:
+    """按文本中"保温"出现的次数打分"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [text.count("保温") for _, text in pairs]
+
+
+class SlowLoadingReranker(CrossEncoderReranker):
+    """首次访问模型时模拟较慢的加载"""
+    load_seconds = 0.05
+
+    @property
+    def model(self):
+        if self._model is None:
+            time.sleep(self.load_seconds)
+            self._model = FakeCrossEncoder()
+        return self._model
+
+
+class TightBudgetReranker(CrossEncoderReranker):
+    """服务层使用默认时间预算，这里固定为很小的预算以触发超时"""
+    def rerank(self, query, results, max_candidates=50, time_budget_ms=10):
+        return super().rerank(query, results, max_candidates, time_budget_ms)
+
+
+def make_results():
+    return [
+        {"id": 1, "content": "砂浆"},
+        {"id": 2, "content": "保温 保温 保温"},
+        {"id": 3, "content": "保温"},
+    ]
+
+
+def make_reranker(model=None, batch_size=16, cls=CrossEncoderReranker):
+    reranker = cls(batch_size=batch_size)
+    reranker._model = model or FakeCrossEncoder()
+    return reranker
+
+
+def test_rerank_sorts_copies_and_leaves_input_untouched():
+    results = make_results()
+    ranked, complete = make_reranker().rerank("保温", results)
+    assert complete
+    assert [result["id"] for result in ranked] == [2, 3, 1]
+    assert [result["rerank_score"] for result in ranked] == [3.0, 1.0, 0.0]
+    assert results == make_results()
+
+
+def test_scores_are_cached_per_query_and_id():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model)
+    reranker.rerank("保温", make_results())
+    ranked, complete = reranker.rerank("保温", make_results())
+    assert complete and model.calls == 1
+    assert [result["id"] for result in ranked] == [2, 3, 1]
+
+
+def test_exhausted_budget_returns_partial_flag():
+    reranker = make_reranker(FakeCrossEncoder(delay=0.02), batch_size=1)
+    ranked, complete = reranker.rerank("保温", make_results(), time_budget_ms=10)
+    assert not complete
+    # 第一个候选已打分，其余保持原顺序排在后面
+    assert [result["id"] for result in ranked] == [1, 2, 3]
+    assert "rerank_score" in ranked[0] and "rerank_score" not in ranked[1]
+
+
+def test_model_loading_is_not_charged_to_budget():
+    reranker = SlowLoadingReranker()
+    ranked, complete = reranker.rerank("保温", make_results(), time_budget_ms=20)
+    assert complete
+    assert [result["id"] for result in ranked] == [2, 3, 1]
+
+
+class FakeStore:
+    def __init__(self, results=None):
+        self.results = results or make_results()
+        self.calls = []
+
+    def search(self, query, model_name, limit=10, top_k=None, **kwargs):
+        self.calls.append((limit, top_k))
+        return self.results[:top_k], True
+
+    def search_progressive(self, query, model_name, limit=10, top_k=None, **kwargs):
+        self.calls.append((limit, top_k))
+        yield "initial", self.results[:top_k], True
+
+
+def make_service(monkeypatch, reranker, store=None):
+    store = store or FakeStore()
+    monkeypatch.setattr(search_service, "create_vector_store", lambda collection_name: store)
+    monkeypatch.setattr(search_service, "get_reranker", lambda: reranker)
+    service = SearchService(processed_dir="")
+    service.result_cache = QueryResultCache(disk_path="")
+    return service
+
+
+def test_partial_rerank_results_are_not_cached(monkeypatch):
+    reranker = make_reranker(FakeCrossEncoder(delay=0.02), batch_size=1, cls=TightBudgetReranker)
+    service = make_service(monkeypatch, reranker)
+    service.search("保温", rerank=True)
+    assert service.result_cache.stats()["entries"] == 0
+
+    stages = list(service.search_progressive("保温", rerank=True))
+    assert [stage for stage, _ in stages] == ["initial", "reranked"]
+    assert service.result_cache.stats()["entries"] == 0
+
+
+def test_complete_rerank_results_are_cached(monkeypatch):
+    service = make_service(monkeypatch, make_reranker())
+    stages = list(service.search_progressive("保温", rerank=True))
+    initial, reranked = stages[0][1], stages[1][1]
+    # 已产出的initial结果不会被重排修改
+    assert all("rerank_score" not in result for result in initial)
+    assert [result["id"] for result in reranked] == [2, 3, 1]
+
+    assert service.search("保温", rerank=True) == reranked
+
+
+def test_rerank_promotes_candidates_below_limit(monkeypatch):
+    # 融合分数排在第40位的候选与查询最相关
+    results = [{"id": i, "content": "保温" * 5 if i == 40 else f"内容{i}"} for i in range(100)]
+    store = FakeStore(results)
+    service = make_service(monkeypatch, make_reranker(), store)
+
+    reranked = service.search("保温", limit=5, rerank=True)
+    pool = max(5, RERANK_MAX_CANDIDATES)
+    assert store.calls == [(pool, pool)]
+    assert len(reranked) == 5 and reranked[0]["id"] == 40
+
+    stages = list(service.search_progressive("保温", limit=5, rerank=False))
+    assert store.calls[-1] == (5, None)
+    assert len(stages[0][1]) == 100
@@ -0,0 +1,93 @@
+"""
+QueryResultCache：结果隔离、TTL、LRU与字节数淘汰、磁盘存储与版本号
+"""
+from src.infrastructure import result_cache
+from src.infrastructure.result_cache import QueryResultCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def results(n=2):
+    return [{"id": i, "content": f"内容{i}", "score": 1.0 - i / 10} for i in range(n)]
+
+
+def test_cached_results_are_isolated_from_callers():
+    cache = QueryResultCache(disk_path="")
+    value = results()
+    cache.put("k", value)
+    value[0]["content"] = "put之后修改"
+
+    first = cache.get("k")
+    first[0]["rerank_score"] = 3.2
+    first.append({"id": 9})
+
+    second = cache.get("k")
+    assert second == results()
+    assert "rerank_score" not in second[0]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "time", clock)
+    cache = QueryResultCache(ttl=10, disk_path="")
+    cache.put("k", results())
+    clock.now += 9
+    assert cache.get("k") is not None
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entry_count():
+    cache = QueryResultCache(max_entries=2, disk_path="")
+    cache.put("a", results())
+    cache.put("b", results())
+    cache.get("a")
+    cache.put("c", results())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_eviction_by_total_size():
+    size = len(result_cache.json.dumps(results(), ensure_ascii=False))
+    cache = QueryResultCache(max_bytes=size * 2, disk_path="")
+    for key in "abc":
+        cache.put(key, results())
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= size * 2
+    assert cache.get("a") is None
+
+
+def test_disk_store_survives_memory_clear_and_shares_versions(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = QueryResultCache(disk_path=path)
+    cache.put("k", results())
+    cache._entries.clear()
+    cache._bytes = 0
+    assert cache.get("k") == results()
+
+    other = QueryResultCache(disk_path=path)
+    assert other.version("c") == 0
+    cache.bump_version("c")
+    assert other.version("c") == 1
+
+
+def test_disk_eviction_keeps_most_recent(tmp_path):
+    cache = QueryResultCache(disk_path=str(tmp_path / "cache.sqlite"), disk_max_entries=10)
+    for i in range(15):
+        cache.put(f"k{i}", results(1))
+    count = cache._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    assert count <= 10
+
+
+def test_version_bump_changes_keys():
+    cache = QueryResultCache(disk_path="")
+    before = cache.make_key(version=cache.version("c"), query="q")
+    cache.bump_version("c")
+    assert cache.make_key(version=cache.version("c"), query="q") != before
@@ -0,0 +1,80 @@
+"""
+ScoreFusion 各融合方式、per_keyword_top_n 与 top_k
+"""
+import numpy as np
+import pytest
+
+from src.infrastructure.score_fusion import ScoreFusion, top_k_indices
+
+
+class Hit:
+    def __init__(self, id, distance):
+        self.id = id
+        self.distance = distance
+        self.entity = {}
+
+
+def hits(*pairs):
+    return [Hit(id, distance) for id, distance in pairs]
+
+
+@pytest.fixture
+def fusion():
+    fusion = ScoreFusion(["tags", "content"], {"tags": 2.0, "content": 1.0}, ["k1", "k2"])
+    fusion.add("k1", "tags", hits((1, 0.5), (2, 0.4)))
+    fusion.add("k1", "content", hits((2, 0.9), (3, 0.8)))
+    fusion.add("k2", "content", hits((3, 0.7), (1, 0.1)))
+    return fusion
+
+
+def test_max_keeps_best_weighted_hit(fusion):
+    results = fusion.fuse("max")
+    assert [(id, round(score, 4)) for id, score, _ in results] == [(1, 1.0), (2, 0.9), (3, 0.8)]
+    hit, field, keyword = fusion.describe(results[0][2])
+    assert (hit.id, field, keyword) == (1, "tags", "k1")
+
+
+def test_weighted_sum_adds_all_weighted_hits(fusion):
+    scores = {id: round(score, 4) for id, score, _ in fusion.fuse("weighted_sum")}
+    assert scores == {1: 1.1, 2: 1.7, 3: 1.5}
+
+
+def test_rrf_uses_ranks_and_field_weights(fusion):
+    scores = {id: score for id, score, _ in fusion.fuse("rrf", rrf_k=60)}
+    assert scores[1] == pytest.approx(2.0 / 61 + 1.0 / 62)
+    assert scores[2] == pytest.approx(2.0 / 62 + 1.0 / 61)
+    assert scores[3] == pytest.approx(1.0 / 62 + 1.0 / 61)
+    assert max(scores, key=scores.get) == 1
+
+
+def test_top_k_truncates_after_fusion(fusion):
+    assert [id for id, _, _ in fusion.fuse("max", top_k=2)] == [1, 2]
+
+
+def test_per_keyword_top_n_limits_each_keyword_before_fusion(fusion):
+    # k1 的前1名是id 1（2.0*0.5=1.0 > 0.9），k2 的前1名是id 3
+    results = fusion.fuse("weighted_sum", per_keyword_top_n=1)
+    assert {id: round(score, 4) for id, score, _ in results} == {1: 1.0, 3: 0.7}
+
+
+def test_add_accepts_keywords_not_known_at_construction():
+    fusion = ScoreFusion(["tags"], {"tags": 1.0}, ["k1"])
+    fusion.add("k1", "tags", hits((1, 0.3)))
+    fusion.add("late", "tags", hits((2, 0.6)))
+    results = fusion.fuse("max")
+    assert [id for id, _, _ in results] == [2, 1]
+    assert fusion.describe(results[0][2])[2] == "late"
+
+
+def test_unknown_strategy_and_empty_fusion():
+    fusion = ScoreFusion(["tags"], {"tags": 1.0}, ["k"])
+    assert fusion.fuse("max") == []
+    with pytest.raises(ValueError):
+        fusion.fuse("median")
+
+
+def test_top_k_indices_matches_full_sort():
+    scores = np.random.default_rng(0).random(1000)
+    assert list(top_k_indices(scores, 10)) == list(np.argsort(-scores)[:10])
+    assert len(top_k_indices(scores, 0)) == 0
+    assert len(top_k_indices(scores, None)) == 1000
@@ -0,0 +1,69 @@
+"""
+检索扇出的截止时间与结果完整性：超时放弃或失败跳过的检索使结果标记为不完整，不完整的结果不写入查询缓存
+"""
+import threading
+
+from conftest import make_chunks
+from src.infrastructure.result_cache import QueryResultCache
+from src.infrastructure.search_fanout import SearchDeadlineExceeded, SearchFanout
+from src.service import search_service
+from src.service.search_service import SearchService
+
+
+def test_fanout_reports_abandoned_tasks_after_deadline():
+    release = threading.Event()
+    tasks = [("fast", lambda: 1)] + [(f"slow{i}", release.wait) for i in range(3)]
+
+    outcomes = {key: (result, error) for key, result, error in SearchFanout(max_workers=4).run(
+        tasks, concurrency=2, deadline=0.05
+    )}
+    release.set()
+
+    assert outcomes["fast"] == (1, None)
+    # 在途的slow0和尚未开始的slow1、slow2都以超时产出
+    assert set(outcomes) == {"fast", "slow0", "slow1", "slow2"}
+    assert all(isinstance(outcomes[f"slow{i}"][1], SearchDeadlineExceeded) for i in range(3))
+
+
+class FailingFanout(SearchFanout):
+    """让content_vector上的检索失败或超时"""
+    def __init__(self, error):
+        super().__init__(max_workers=4)
+        self.error = error
+
+    def run(self, tasks, **kwargs):
+        for (keyword, field), result, error in super().run(tasks, **kwargs):
+            if field == "content_vector":
+                result, error = None, self.error
+            yield (keyword, field), result, error
+
+
+def test_skipped_searches_mark_results_incomplete(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(20))
+
+    results, complete = store.search_with_keywords("保温砂浆", ["问题3"], top_n=5)
+    assert results and complete
+
+    store.fanout = FailingFanout(RuntimeError("连接中断"))
+    results, complete = store.search_with_keywords("保温砂浆", ["问题3"], top_n=5)
+    assert results and not complete
+
+    store.fanout = FailingFanout(SearchDeadlineExceeded("超时"))
+    results, complete = store.search_by_keywords_tags_only(["保温"], filter_type="threshold", threshold=0.1)
+    assert complete
+    results, complete = store.search_with_keywords("保温砂浆", [], top_n=5)
+    assert results and not complete
+
+
+def test_incomplete_results_are_not_cached(monkeypatch):
+    class PartialStore:
+        def search_with_keywords(self, query, keywords, *args, **kwargs):
+            return [{"id": 1, "content": "保温"}], False
+
+    monkeypatch.setattr(search_service, "create_vector_store", lambda collection_name: PartialStore())
+    service = SearchService(processed_dir="")
+    service.result_cache = QueryResultCache(disk_path="")
+
+    assert service.search_with_settings("保温", None, ["砂浆"], rerank=False) == [{"id": 1, "content": "保温"}]
+    assert service.result_cache.stats()["entries"] == 0
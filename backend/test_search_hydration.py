@@ -0,0 +1,50 @@
+"""
+topN模式为每个关键词的前N个结果的并集，两阶段检索只为这些结果取回payload
+"""
+from conftest import make_chunks
+
+
+def test_topn_search_keeps_top_n_per_keyword(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(200), batch_size=100)
+    keywords = ["问题7", "第3条", "保温"]
+
+    results, complete = store.search_with_keywords("混凝土保温砂浆", keywords, top_n=5)
+
+    ids = {result["id"] for result in results}
+    assert complete
+    assert 5 < len(results) <= 5 * (len(keywords) + 1)
+    # 每个关键词单独检索时的前N个结果都在并集中
+    for keyword in ["混凝土保温砂浆"] + keywords:
+        single, _ = store.search_with_keywords(keyword, [], top_n=5)
+        assert len(single) == 5
+        assert {result["id"] for result in single} <= ids
+    assert all(result["content"] for result in results)
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_two_phase_hydrates_only_returned_results(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(200), batch_size=100)
+    store.two_phase = True
+    loaded = []
+    original = store._load_payloads
+
+    def spy(ids):
+        ids = list(ids)
+        loaded.append(ids)
+        return original(ids)
+    store._load_payloads = spy
+
+    results, _ = store.search_with_keywords("混凝土保温砂浆", ["问题7", "第3条"], top_n=4)
+
+    assert len(loaded) == 1 and sorted(loaded[0]) == sorted(result["id"] for result in results)
+    assert 4 <= len(results) <= 12
+
+
+def test_threshold_search_is_not_truncated(local_store):
+    store = local_store()
+    store.bulk_insert(make_chunks(50), batch_size=50)
+    results, _ = store.search_by_keywords_tags_only(["保温"], filter_type="threshold", threshold=0.5, top_n=3)
+    # 阈值模式由阈值截断，tags为“保温”的25个chunk全部返回
+    assert len(results) == 25
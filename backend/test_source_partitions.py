@@ -0,0 +1,133 @@
+"""
+source分区模式：来源文件按哈希分到固定数量的分区，写入后主键与输入行一一对应；
+分区列表按collection缓存，按来源过滤时仍带source_file条件；删除时处理全部来源文件
+使用假的MilvusClient，不需要Milvus服务
+"""
+from src.infrastructure.dedup_index import get_dedup_index
+from src.infrastructure.milvus_connection import MilvusConnectionManager
+from src.infrastructure.milvus_db import (
+    MILVUS_SOURCE_PARTITIONS, MilvusDbManager, _legacy_partition_name, _partition_name
+)
+
+
+class FakeClient:
+    def __init__(self, partitions=()):
+        self.partitions = set(partitions)
+        self.next_id = 100
+        self.inserted = []
+        self.dropped = []
+        self.list_calls = 0
+
+    def has_partition(self, collection_name, partition_name):
+        return partition_name in self.partitions
+
+    def create_partition(self, collection_name, partition_name):
+        self.partitions.add(partition_name)
+
+    def list_partitions(self, collection_name):
+        self.list_calls += 1
+        return sorted(self.partitions)
+
+    def insert(self, collection_name, data, partition_name=None):
+        ids = list(range(self.next_id, self.next_id + len(data)))
+        self.next_id += len(data)
+        self.inserted.extend(zip(ids, [(row["content"], partition_name) for row in data]))
+        return {"ids": ids}
+
+    def release_partitions(self, collection_name, partition_names):
+        pass
+
+    def drop_partition(self, collection_name, partition_name):
+        self.partitions.discard(partition_name)
+        self.dropped.append(partition_name)
+
+
+def make_manager(client):
+    connection = MilvusConnectionManager()
+    connection._client = client
+    manager = MilvusDbManager.__new__(MilvusDbManager)
+    manager.collection_name = "test"
+    manager.connection = connection
+    manager.partition_mode = "source"
+    manager.lexical = None
+    return manager
+
+
+def test_insert_rows_returns_ids_in_input_order():
+    client = FakeClient()
+    manager = make_manager(client)
+    rows = [{"content": f"c{i}", "source_file": ["a.pdf", "b.pdf", "c.pdf"][i % 3]} for i in range(9)]
+
+    ids = manager._insert_rows(rows)
+
+    by_id = dict(client.inserted)
+    assert [by_id[chunk_id][0] for chunk_id in ids] == [row["content"] for row in rows]
+    assert all(by_id[chunk_id][1] == _partition_name(row["source_file"]) for chunk_id, row in zip(ids, rows))
+
+
+def test_partition_count_is_bounded_by_config():
+    client = FakeClient()
+    manager = make_manager(client)
+    manager._insert_rows([{"content": "c", "source_file": f"doc{i}.pdf"} for i in range(MILVUS_SOURCE_PARTITIONS * 4)])
+    assert len(client.partitions) <= MILVUS_SOURCE_PARTITIONS
+
+
+def test_search_filter_uses_cached_partitions_and_source_expr():
+    client = FakeClient()
+    manager = make_manager(client)
+    manager._insert_rows([{"content": "c", "source_file": "a.pdf"}])
+    manager._build_search_filter(["a.pdf"])
+    calls = client.list_calls
+
+    for _ in range(3):
+        search_filter = manager._build_search_filter(["a.pdf"], years=[2012])
+    assert client.list_calls == calls
+    assert search_filter == {
+        "partition_names": [_partition_name("a.pdf")],
+        "expr": 'source_file in ["a.pdf"] and year in ["2012"]',
+    }
+
+    # 其他进程新建的分区：缓存中缺少时重新读取一次
+    client.partitions.add(_partition_name("new.pdf"))
+    assert manager._build_search_filter(["new.pdf"])["partition_names"] == [_partition_name("new.pdf")]
+    assert client.list_calls == calls + 1
+
+
+def test_search_filter_includes_legacy_partitions_and_skips_missing_sources():
+    client = FakeClient([_legacy_partition_name("old.pdf")])
+    manager = make_manager(client)
+    assert manager._build_search_filter(["old.pdf"])["partition_names"] == [_legacy_partition_name("old.pdf")]
+    assert manager._build_search_filter(["missing.pdf"]) is None
+
+
+def test_search_filter_includes_duplicates_linked_by_filtered_source(isolated_indexes):
+    client = FakeClient()
+    manager = make_manager(client)
+    manager._insert_rows([{"content": "c", "source_file": "a.pdf"}])
+    dedup = get_dedup_index("test")
+    dedup._add_entry(100, 0, "a.pdf")
+    dedup.link(100, "b.pdf", "2020")
+
+    # b.pdf 的chunk全部是a.pdf中内容的重复，本身没有分区
+    assert manager._build_search_filter(["b.pdf"]) == {
+        "partition_names": [_partition_name("a.pdf")],
+        "expr": '(source_file in ["b.pdf"]) or id in [100]',
+    }
+    # 年份不符时不含链接的规范chunk，b.pdf也没有可检索的分区
+    assert manager._build_search_filter(["b.pdf"], years=[2012]) is None
+    assert manager._build_search_filter(["c.pdf"]) is None
+
+
+def test_delete_source_handles_every_source_file():
+    client = FakeClient([_legacy_partition_name("legacy.pdf")])
+    manager = make_manager(client)
+    manager._insert_rows([{"content": "c", "source_file": "a.pdf"}, {"content": "c", "source_file": "b.pdf"}])
+    deleted_exprs = []
+    manager.delete_by_expr = lambda expr: deleted_exprs.append(expr) or True
+
+    assert manager.delete_source(["a.pdf", "b.pdf", "legacy.pdf"])
+
+    # 共用的分区不drop，旧版独占分区直接drop
+    assert client.dropped == [_legacy_partition_name("legacy.pdf")]
+    assert deleted_exprs == ['source_file in ["a.pdf", "b.pdf", "legacy.pdf"]']
+    assert _legacy_partition_name("legacy.pdf") not in manager.connection.list_partitions("test")